@@ -0,0 +1,41 @@
+"""
+Run the posthooks of a configuration with snps.posthook.
+
+Called in the SIL folder of the configuration with the same arguments as
+Coding/pyInterface/pytPosthookCall.py: script folder (unused, the snps package
+is imported from the folder of this script), configuration xml, main SIL and
+the SFU strings of the modules in init order.
+
+With the environment variable 'posthookParallel' = "1" the posthooks run in
+worker processes. On Windows they are started with "spawn" and import this
+script again, so everything below is protected by the __main__ guard.
+"""
+
+import sys
+
+from snps.posthook import posthook
+from supportFcn.dispFileLog import installBufferedLogHandlers
+
+
+def main(lArgs):
+    installBufferedLogHandlers()
+
+    # parse input arguments, the first one is the script folder of pytPosthookCall.py
+    configuration_xml_file = lArgs[1]
+    main_sil_name = lArgs[2]
+
+    # instantly return if no additional argument
+    if len(lArgs) - 3 < 1:
+        return 0
+
+    # create init order model dictionary, the last argument is not an SFU (as for pytPosthookCall.py)
+    dInitOrderModels = {}
+    for initOrder, sSfuStr in enumerate(lArgs[3:len(lArgs) - 1], 1):
+        dInitOrderModels[initOrder] = sSfuStr
+
+    posthook(configuration_xml_file, main_sil_name, dInitOrderModels)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
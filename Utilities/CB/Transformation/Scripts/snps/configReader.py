@@ -0,0 +1,173 @@
+"""
+Streaming reader of configuration xmls.
+
+The configuration xml is read with iterparse in one pass: every ModuleSetup is
+turned into a record of plain dictionaries (module attributes, DataSets,
+SupportSets) and every signal declaration (Signal, Constant, OpenPort) into a
+ConfigSignal, then the elements are cleared, so the parsed tree is never held
+in memory as a whole. The result of a file is shared by generate_ini,
+posthook and RangeCheck as long as its size and modification time are unchanged.
+
+"""
+
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+import xml.etree.ElementTree as ET
+
+nConfigCacheSize = 8
+
+# ModuleSetup of the configuration: attributes of the ModuleSetup element and lists of attribute
+# dictionaries of its Module, DataSet and SupportSet elements, in document order
+ModuleSetupRecord = namedtuple("ModuleSetupRecord", ["name", "attributes", "modules", "dataSets", "supportSets"])
+# Signal declaration of the configuration, kind is the tag name (Signal, Constant or OpenPort)
+ConfigSignal = namedtuple("ConfigSignal", ["name", "kind"])
+# Content of a configuration xml, masterSolver is the attribute dictionary of the MasterSolver element or None
+Configuration = namedtuple("Configuration", ["attributes", "moduleSetups", "signals", "masterSolver"])
+
+setSignalTags = {"Signal", "Constant", "OpenPort"}
+
+
+def _localName(sTag):
+    return sTag.rsplit("}", 1)[-1] if isinstance(sTag, str) else ""
+
+
+def getModuleSetupRecord(oModuleSetup):
+    """
+    Return the ModuleSetupRecord of a ModuleSetup element.
+    """
+    dChildren = {"Module": [], "DataSet": [], "SupportSet": []}
+    for oElem in oModuleSetup.iter():
+        sTag = _localName(oElem.tag)
+        if sTag in dChildren:
+            dChildren[sTag].append(dict(oElem.attrib))
+    return ModuleSetupRecord(oModuleSetup.get("name"), dict(oModuleSetup.attrib),
+                             dChildren["Module"], dChildren["DataSet"], dChildren["SupportSet"])
+
+
+def iterConfiguration(sConfigXml):
+    """
+    Stream the records of a configuration xml.
+
+    Parameters:
+        sConfigXml(string):     Path of the configuration xml.
+
+    Example:
+        for sKind, oRecord in iterConfiguration(sConfigurationXml):
+            if sKind == "ModuleSetup":
+                ...
+
+    Return:
+        Generator of tuples (kind, record) in document order:
+        ("Configuration", attribute dictionary of the root element),
+        ("ModuleSetup", ModuleSetupRecord), ("MasterSolver", attribute dictionary),
+        ("Signal", ConfigSignal).
+
+    Error:
+        Errors of reading or parsing the file are raised.
+    """
+    # open elements from the root to the current one
+    lOpen = []
+    nModuleSetupDepth = None
+    for sEvent, oElem in ET.iterparse(sConfigXml, events=("start", "end")):
+        if sEvent == "start":
+            lOpen.append(oElem)
+            if len(lOpen) == 1:
+                yield "Configuration", dict(oElem.attrib)
+            elif nModuleSetupDepth is None and _localName(oElem.tag) == "ModuleSetup":
+                nModuleSetupDepth = len(lOpen)
+            continue
+        sTag = _localName(oElem.tag)
+        if len(lOpen) == nModuleSetupDepth:
+            nModuleSetupDepth = None
+            yield "ModuleSetup", getModuleSetupRecord(oElem)
+        elif sTag == "MasterSolver":
+            yield "MasterSolver", dict(oElem.attrib)
+        elif sTag in setSignalTags and oElem.get("name") is not None:
+            yield "Signal", ConfigSignal(oElem.get("name"), sTag)
+        lOpen.pop()
+        if lOpen and nModuleSetupDepth is None:
+            # processed element, drop it from its parent (it is the last child)
+            oElem.clear()
+            if len(lOpen[-1]) and lOpen[-1][-1] is oElem:
+                del lOpen[-1][-1]
+
+
+def readConfigurationElement(oRootElem):
+    """
+    Return the Configuration of an already parsed configuration xml (root element).
+    """
+    lModuleSetups = []
+    lSignals = []
+    dMasterSolver = None
+    for oElem in oRootElem.iter():
+        sTag = _localName(oElem.tag)
+        if sTag == "ModuleSetup":
+            lModuleSetups.append(getModuleSetupRecord(oElem))
+        elif sTag == "MasterSolver":
+            dMasterSolver = dMasterSolver if dMasterSolver is not None else dict(oElem.attrib)
+        elif sTag in setSignalTags and oElem.get("name") is not None:
+            lSignals.append(ConfigSignal(oElem.get("name"), sTag))
+    return Configuration(dict(oRootElem.attrib), lModuleSetups, lSignals, dMasterSolver)
+
+
+def readConfigurationFile(sConfigXml):
+    """
+    Read a configuration xml in one streaming pass (see iterConfiguration).
+    """
+    dAttributes = {}
+    lModuleSetups = []
+    lSignals = []
+    dMasterSolver = None
+    for sKind, oRecord in iterConfiguration(sConfigXml):
+        if sKind == "ModuleSetup":
+            lModuleSetups.append(oRecord)
+        elif sKind == "Signal":
+            lSignals.append(oRecord)
+        elif sKind == "MasterSolver":
+            dMasterSolver = dMasterSolver if dMasterSolver is not None else oRecord
+        else:
+            dAttributes = oRecord
+    return Configuration(dAttributes, lModuleSetups, lSignals, dMasterSolver)
+
+
+dConfigurations = OrderedDict()
+oConfigurationsLock = threading.Lock()
+
+
+def readConfiguration(config):
+    """
+    Return the content of a configuration xml, read at most once per modification time.
+
+    Parameters:
+        config(string or Element):  Path of the configuration xml or its parsed root element.
+
+    Example:
+        oConfiguration = readConfiguration(sConfigurationXml)
+        for oModuleSetup in oConfiguration.moduleSetups:
+            sModelSet = oModuleSetup.modules[0]["modelSet"]
+
+    Return:
+        Configuration tuple. It is shared and must not be modified.
+
+    Error:
+        Errors of reading or parsing the file are raised.
+    """
+    if not isinstance(config, str):
+        return readConfigurationElement(config)
+    sKey = os.path.abspath(config)
+    oStat = os.stat(sKey)
+    tStamp = (oStat.st_mtime, oStat.st_size)
+    with oConfigurationsLock:
+        tEntry = dConfigurations.get(sKey)
+        if tEntry is not None and tEntry[0] == tStamp:
+            dConfigurations.move_to_end(sKey)
+            return tEntry[1]
+    oConfiguration = readConfigurationFile(sKey)
+    with oConfigurationsLock:
+        dConfigurations[sKey] = (tStamp, oConfiguration)
+        dConfigurations.move_to_end(sKey)
+        while len(dConfigurations) > nConfigCacheSize:
+            dConfigurations.popitem(last=False)
+    return oConfiguration
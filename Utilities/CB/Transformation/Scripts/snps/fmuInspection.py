@@ -0,0 +1,305 @@
+"""
+Inspection of FMU archives.
+
+The central directory and the modelDescription.xml of an FMU are read once per
+run and the result (member list, binary architecture, FMI version and kind) is
+shared by all transformation stages. The signal table of an FMU (name,
+causality, type, start, min, max of every model variable) is streamed out of
+modelDescription.xml on first request. Optionally the results are stored in a
+cache file (environment variable 'fmuInspectionCacheFile') and reused by later
+runs as long as path, size and modification time of the FMU are unchanged.
+
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import zipfile
+from collections import namedtuple
+
+import xml.etree.ElementTree as ET
+
+oDispFileLogLogger = logging.getLogger("disp_file_log")
+
+nCacheVersion = 2
+dFmuCaches = {}
+oCachesLock = threading.Lock()
+
+# Model variable of an FMU, attributes not given in the modelDescription.xml are ""
+FmuSignal = namedtuple("FmuSignal", ["name", "causality", "type", "start", "min", "max"])
+
+# variable type elements of FMI 1.0/2.0 (children of ScalarVariable) and FMI 3.0 (children of ModelVariables)
+setFmi2Types = {"Real", "Integer", "Boolean", "String", "Enumeration"}
+setFmi3Types = {"Float32", "Float64", "Int8", "UInt8", "Int16", "UInt16", "Int32", "UInt32", "Int64", "UInt64",
+                "Boolean", "String", "Binary", "Enumeration", "Clock"}
+
+
+def getArchitecture(lMembers):
+    """
+    Return the architecture of the first "win" folder below "binaries" (outer folders
+    first, then by name): "64", "32", "unknown" if it names neither or "" if there is none.
+    """
+    setDirs = set()
+    for sMember in lMembers:
+        lParts = sMember.replace("\\", "/").split("/")
+        if len(lParts) > 2 and lParts[0] == "binaries":
+            for nDepth in range(2, len(lParts)):
+                setDirs.add("/".join(lParts[1:nDepth]))
+    for sDir in sorted(setDirs, key=lambda sDir: (sDir.count("/"), sDir)):
+        sDir = sDir.split("/")[-1]
+        if "win" in sDir:
+            if "64" in sDir:
+                return "64"
+            elif "32" in sDir:
+                return "32"
+            return "unknown"
+    return ""
+
+
+def inspectFmu(sFmuFile):
+    """
+    Read member list and modelDescription.xml of an FMU.
+
+    Parameters:
+        sFmuFile(string):   Path of the FMU.
+
+    Example:
+        dInfo = inspectFmu("D:\\DIVe\\Content\\ctrl\\mcm\\sil\\Module\\std\\fmu20\\mcm.fmu")
+
+    Return:
+        Dictionary with the keys "members", "win32", "win64", "architecture", "fmiVersion",
+        "kinds" (list of "CS" and "ME") and "modelIdentifier".
+
+    Error:
+        Errors of reading the archive are raised, a missing or invalid modelDescription.xml
+        leaves fmiVersion, kinds and modelIdentifier empty.
+    """
+    with zipfile.ZipFile(sFmuFile, 'r') as oFmu:
+        lMembers = oFmu.namelist()
+        dInfo = {"members": lMembers,
+                 "win32": any("binaries/win32" in sMember for sMember in lMembers),
+                 "win64": any("binaries/win64" in sMember for sMember in lMembers),
+                 "architecture": getArchitecture(lMembers),
+                 "fmiVersion": "",
+                 "kinds": [],
+                 "modelIdentifier": ""}
+        try:
+            with oFmu.open("modelDescription.xml") as oFile:
+                oRoot = ET.parse(oFile).getroot()
+        except (KeyError, ET.ParseError) as e:
+            oDispFileLogLogger.debug("\tmodelDescription.xml of " + sFmuFile + " could not be read: " + str(e))
+            return dInfo
+    dInfo["fmiVersion"] = oRoot.get("fmiVersion", "")
+    for sTag, sKind in (("CoSimulation", "CS"), ("ModelExchange", "ME")):
+        oElement = oRoot.find(sTag)
+        if oElement is not None:
+            dInfo["kinds"].append(sKind)
+            dInfo["modelIdentifier"] = dInfo["modelIdentifier"] or oElement.get("modelIdentifier", "")
+    if dInfo["fmiVersion"].startswith("1"):
+        # FMI 1.0: co-simulation FMUs have an Implementation element
+        dInfo["kinds"] = ["CS"] if oRoot.find("Implementation") is not None else ["ME"]
+        dInfo["modelIdentifier"] = oRoot.get("modelIdentifier", "")
+    return dInfo
+
+
+def _localName(sTag):
+    return sTag.rsplit("}", 1)[-1]
+
+
+def readFmuSignals(sFmuFile):
+    """
+    Stream the model variables out of the modelDescription.xml of an FMU without extracting it.
+
+    Parameters:
+        sFmuFile(string):   Path of the FMU.
+
+    Example:
+        lSignals = readFmuSignals(sFmuFileName)
+
+    Return:
+        List of FmuSignal tuples in the order of the modelDescription.xml.
+
+    Error:
+        Errors of reading the archive or parsing the modelDescription.xml are raised.
+    """
+    lSignals = []
+    nModelVariablesDepth = None
+    nDepth = 0
+    with zipfile.ZipFile(sFmuFile, 'r') as oFmu, oFmu.open("modelDescription.xml") as oFile:
+        for sEvent, oElement in ET.iterparse(oFile, events=("start", "end")):
+            if sEvent == "start":
+                nDepth += 1
+                if nModelVariablesDepth is None and _localName(oElement.tag) == "ModelVariables":
+                    nModelVariablesDepth = nDepth
+                continue
+            nDepth -= 1
+            if nModelVariablesDepth is None:
+                continue
+            if nDepth < nModelVariablesDepth:
+                # end of ModelVariables, nothing else is needed
+                break
+            if nDepth != nModelVariablesDepth:
+                continue
+            sTag = _localName(oElement.tag)
+            if sTag == "ScalarVariable":
+                oTypeElement = next((oChild for oChild in oElement if _localName(oChild.tag) in setFmi2Types), None)
+                dTypeAttributes = oTypeElement.attrib if oTypeElement is not None else {}
+                sType = _localName(oTypeElement.tag) if oTypeElement is not None else ""
+            elif sTag in setFmi3Types:
+                dTypeAttributes = oElement.attrib
+                sType = sTag
+            else:
+                oElement.clear()
+                continue
+            lSignals.append(FmuSignal(oElement.get("name", ""), oElement.get("causality", "local"), sType,
+                                      dTypeAttributes.get("start", ""), dTypeAttributes.get("min", ""), dTypeAttributes.get("max", "")))
+            oElement.clear()
+    return lSignals
+
+
+class FmuInspectionCache():
+    """
+    Inspection results of FMUs, keyed by absolute path and validated by size and modification time.
+
+    Keyword Arguments:
+        sCacheFile(string):     Path of the cache file, None to keep the results in memory only.
+
+    Example:
+        oCache = FmuInspectionCache()
+        bWin64 = oCache.getInfo(sFmuFileName)["win64"]
+    """
+
+    def __init__(self, sCacheFile=None):
+        self.sCacheFile = sCacheFile
+        # absolute path -> [size, mtime, inspection result]
+        self.dFmus = {}
+        # absolute path -> [size, mtime, signal table]
+        self.dSignals = {}
+        self.bDirty = False
+        self.oLock = threading.Lock()
+        if sCacheFile:
+            self.load()
+
+    def load(self):
+        try:
+            with open(self.sCacheFile, "r") as oFile:
+                dCache = json.load(oFile)
+            if dCache.get("version") == nCacheVersion:
+                self.dFmus = dCache["fmus"]
+                self.dSignals = {sKey: [lEntry[0], lEntry[1], [FmuSignal(*lSignal) for lSignal in lEntry[2]]]
+                                 for sKey, lEntry in dCache["signals"].items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            self.dFmus = {}
+            self.dSignals = {}
+
+    def save(self):
+        if not self.sCacheFile or not self.bDirty:
+            return
+        with self.oLock:
+            dCache = {"version": nCacheVersion, "fmus": dict(self.dFmus), "signals": dict(self.dSignals)}
+        sTmpFile = self.sCacheFile + ".tmp"
+        try:
+            with open(sTmpFile, "w") as oFile:
+                json.dump(dCache, oFile)
+            os.replace(sTmpFile, self.sCacheFile)
+            self.bDirty = False
+        except OSError as e:
+            oDispFileLogLogger.debug("\tFMU inspection cache could not be written: " + str(e))
+
+    def getInfo(self, sFmuFile):
+        """
+        Return the inspection result of an FMU (see inspectFmu), read only if the FMU changed.
+        """
+        sKey = os.path.abspath(sFmuFile)
+        oStat = os.stat(sKey)
+        lEntry = self.dFmus.get(sKey)
+        if lEntry is not None and lEntry[0] == oStat.st_size and lEntry[1] == oStat.st_mtime:
+            return lEntry[2]
+        dInfo = inspectFmu(sKey)
+        with self.oLock:
+            self.dFmus[sKey] = [oStat.st_size, oStat.st_mtime, dInfo]
+            self.bDirty = True
+        return dInfo
+
+    def getSignals(self, sFmuFile):
+        """
+        Return the signal table of an FMU (see readFmuSignals), read only if the FMU changed.
+        """
+        sKey = os.path.abspath(sFmuFile)
+        oStat = os.stat(sKey)
+        lEntry = self.dSignals.get(sKey)
+        if lEntry is not None and lEntry[0] == oStat.st_size and lEntry[1] == oStat.st_mtime:
+            return lEntry[2]
+        lSignals = readFmuSignals(sKey)
+        with self.oLock:
+            self.dSignals[sKey] = [oStat.st_size, oStat.st_mtime, lSignals]
+            self.bDirty = True
+        return lSignals
+
+
+def getFmuInspectionCache(sCacheFile=None):
+    """
+    Return the shared FMU inspection cache, created on first use.
+
+    Keyword Arguments:
+        sCacheFile(string):     Path of the cache file. Defaults to the environment
+                                variable 'fmuInspectionCacheFile' if set.
+
+    Return:
+        FmuInspectionCache object.
+    """
+    if sCacheFile is None:
+        sCacheFile = os.environ.get('fmuInspectionCacheFile', None)
+    with oCachesLock:
+        if sCacheFile not in dFmuCaches:
+            dFmuCaches[sCacheFile] = FmuInspectionCache(sCacheFile)
+        return dFmuCaches[sCacheFile]
+
+
+def getFmuInfo(sFmuFile):
+    """
+    Return the inspection result of an FMU from the shared cache.
+
+    Parameters:
+        sFmuFile(string):   Path of the FMU.
+
+    Example:
+        if getFmuInfo(sFmuFileName)["win64"]:
+            ...
+
+    Return:
+        Dictionary as returned by inspectFmu. It is shared and must not be modified.
+    """
+    return getFmuInspectionCache().getInfo(sFmuFile)
+
+
+def getFmuSignals(sFmuFile, lCausalities=None):
+    """
+    Return the signal table of an FMU from the shared cache.
+
+    Parameters:
+        sFmuFile(string):   Path of the FMU.
+
+    Keyword Arguments:
+        lCausalities(list): Causalities to return, e.g. ["input", "output"]. None returns all signals.
+
+    Example:
+        lOutputs = [oSignal.name for oSignal in getFmuSignals(sFmuFileName, ["output"])]
+
+    Return:
+        List of FmuSignal tuples.
+    """
+    lSignals = getFmuInspectionCache().getSignals(sFmuFile)
+    if lCausalities is None:
+        return list(lSignals)
+    return [oSignal for oSignal in lSignals if oSignal.causality in lCausalities]
+
+
+def saveFmuInspectionCaches():
+    for oCache in list(dFmuCaches.values()):
+        oCache.save()
+
+
+atexit.register(saveFmuInspectionCaches)
@@ -1,18 +1,90 @@
 # -*- coding: utf-8 -*-
 import logging
 import os
-import xml.etree.ElementTree as ET
-import zipfile, re
-import supportFcn.checkFileLength as checkFileLength
 import sys
-import pdb
 import traceback
 from snps import (patchFmuUserConfig,islandTransformation)
-from utilsFunctions.utils import checkPathLength
+from snps.sfuCreation import (MODEL_FMU, MODEL_FMU_CS, MODEL_GT, MODEL_OPEN, MODEL_SFCN, MODEL_SILVER_DLL,
+                              getModelKind, isSfcnHandledAsOpen)
+from snps.configReader import readConfiguration
+from snps.pathPlan import checkPathPlan, getSfuIniFileName, planGenerateIni
+from utilsFunctions.utils import parseXmlFileCached
+from utilsFunctions.contentIndex import getContentIndex
+from utilsFunctions.buildCache import getBuildCache, getFileStats, getFingerprint
+from utilsFunctions.tracing import traced
 
 oDispFileLogLogger = logging.getLogger("disp_file_log")
 oPrintToLogLogger = logging.getLogger("print_to_log")
 
+def appendIniText(dIniBuffer, sIniFilePath, sText):
+    """
+    Append text to the in-memory content of an INI file.
+
+    Parameters:
+        dIniBuffer(dict):       INI file path -> list of text chunks, in creation order.
+        sIniFilePath(string):   Path of the INI file.
+        sText(string):          Text to append.
+    """
+    dIniBuffer.setdefault(sIniFilePath, []).append(sText)
+
+def getModuleSetupFingerprint(module_setup, sPathDiveDbContent, *lInputs):
+    """
+    Return the build cache fingerprint of the INI files of a ModuleSetup.
+
+    It covers the ModuleSetup, Module and DataSet attributes (including the versionIds)
+    and the size and modification time of the module xml and the model set folder of
+    every module in the Content.
+
+    Parameters:
+        module_setup(ModuleSetupRecord): ModuleSetup as read by configReader.readConfiguration.
+        sPathDiveDbContent(string): Path of the DIVe Content folder.
+
+    Keyword Arguments:
+        Further inputs of the INI files (e.g. GT-SUITE version).
+    """
+    pathSep = "\\"
+    lContentFiles = []
+    for module in module_setup.modules:
+        sModuleFolder = pathSep.join([sPathDiveDbContent,module.get('context'),module.get('species'),module.get('family'),
+                                      module.get('type'),"Module",module.get('variant')])
+        lContentFiles.append(sModuleFolder + pathSep + module.get('variant') + ".xml")
+        lContentFiles.append(sModuleFolder + pathSep + module.get("modelSet"))
+    return getFingerprint(sorted(module_setup.attributes.items()),
+                          [sorted(dModule.items()) for dModule in module_setup.modules],
+                          [sorted(dDataSet.items()) for dDataSet in module_setup.dataSets],
+                          getFileStats(*lContentFiles), *lInputs)
+
+def flushIniBuffer(dIniBuffer, oBuildCache=None, dFingerprints=None):
+    """
+    Write every buffered INI file exactly once.
+
+    Each file is written to a temporary file next to it and moved into place,
+    so an INI file is either complete or left untouched.
+
+    Parameters:
+        dIniBuffer(dict):       INI file path -> list of text chunks.
+
+    Keyword Arguments:
+        oBuildCache(BuildCache): Build cache of the SIL, INI files with unchanged content are not rewritten.
+        dFingerprints(dict):    INI file path -> fingerprint of its inputs, stored in the build cache
+                                instead of the fingerprint of its content.
+    """
+    for sIniFilePath, lText in dIniBuffer.items():
+        sText = "".join(lText)
+        if oBuildCache is not None:
+            sFingerprint = (dFingerprints or {}).get(sIniFilePath)
+            if sFingerprint is None:
+                sFingerprint = getFingerprint(sText)
+                if oBuildCache.isUpToDate("generateIni", [sIniFilePath], sFingerprint):
+                    continue
+        sTmpFilePath = sIniFilePath + ".tmp"
+        with open(sTmpFilePath, "w") as hIniFile:
+            hIniFile.write(sText)
+        os.replace(sTmpFilePath, sIniFilePath)
+        if oBuildCache is not None:
+            oBuildCache.update([sIniFilePath], sFingerprint)
+
+@traced(dAttributeArgs={"config": "sConfigName"})
 def generate_ini(dSfcnModelandStatus,configRootElem,sPathDiveDbContent,SilFileLoc,sRbuFolder,sConfigName,sGtSuiteVer,nCheckForSignals, bIslandFlag, sMatlabRoot):
     """
         This function creates following file
@@ -20,6 +92,9 @@ def generate_ini(dSfcnModelandStatus,configRootElem,sPathDiveDbContent,SilFileLo
             final SIL file
         2. CFG file which is used for SFU file generation
 
+        configRootElem is the root element of the configuration xml or its path,
+        a path is read in one streaming pass (see configReader).
+
         author: Nagaraj Ramachandra, EE, MBRDI
         mail: nagaraj.ramachandra@damler.com
     """
@@ -38,8 +113,11 @@ def generate_ini(dSfcnModelandStatus,configRootElem,sPathDiveDbContent,SilFileLo
         sDiveContentPathRelToSilToolkit = os.path.relpath(sPathDiveDbContent)
         os.chdir(sCurDir)
 
+        oConfiguration = readConfiguration(configRootElem)
+        # all paths are checked before anything is written
+        checkPathPlan(planGenerateIni(oConfiguration, sPathDiveDbContent, SilFileLoc, sConfigName, sCurDir))
+
         silverIniFilePath =pathSep.join([sCurDir,"..\..\..\..\SiLs",sConfigName])
-        checkPathLength(os.path.realpath(silverIniFilePath))
         if not os.path.isdir(silverIniFilePath):
             os.makedirs(silverIniFilePath)
         
@@ -51,9 +129,6 @@ def generate_ini(dSfcnModelandStatus,configRootElem,sPathDiveDbContent,SilFileLo
         sFinalSilLoc = SilFileLoc+"\\Master"
         sFinalSilIniLoc = SilFileLoc + "\\SFUs\\initParams\\"
         sContentIsland = sFinalSilLoc + "\\" + islandTransformation.get_island_content_name()
-        checkPathLength(sFinalSilLoc)
-        checkPathLength(sFinalSilIniLoc)
-        checkPathLength(sContentIsland)
         #if path to store Ini file does not exist.
         if not os.path.isdir(sFinalSilLoc):
             os.mkdir(sFinalSilLoc)
@@ -61,61 +136,70 @@ def generate_ini(dSfcnModelandStatus,configRootElem,sPathDiveDbContent,SilFileLo
             os.mkdir(sFinalSilIniLoc)
         # content path relative to Master
         contentPathRelToMaster = "${DIVe_ContentPath}"
+        # INI file path -> content, written once after all modules are processed
+        dIniBuffer = {}
         
         if (nCheckForSignals == 0):
             sSFUIniFilePath = sFinalSilIniLoc + "SFU_LOGGING.ini"
-            checkPathLength(sSFUIniFilePath)
-            hSFUIniFile = open(sSFUIniFilePath, "a")
-            hSFUIniFile.writelines("# LOGGING")
-            hSFUIniFile.writelines("\nRBU_DIVe_configuration="+sConfigName)
-            hSFUIniFile.close()
+            appendIniText(dIniBuffer, sSFUIniFilePath, "# LOGGING")
+            appendIniText(dIniBuffer, sSFUIniFilePath, "\nRBU_DIVe_configuration="+sConfigName)
         
         sSFUIniFilePath = sFinalSilIniLoc + "SFU_POST.ini"
-        checkPathLength(sSFUIniFilePath)
-        hSFUIniFile = open(sSFUIniFilePath, "a")
-        hSFUIniFile.writelines("# POSTPROCESSING")
-        hSFUIniFile.writelines("\nSFU_Matlab64Exe=${DIVe_Matlab64Exe}")
-        hSFUIniFile.close()
+        appendIniText(dIniBuffer, sSFUIniFilePath, "# POSTPROCESSING")
+        appendIniText(dIniBuffer, sSFUIniFilePath, "\nSFU_Matlab64Exe=${DIVe_Matlab64Exe}")
             
         sSFUIniFilePath = sFinalSilIniLoc + "SFU_SUPPORT.ini"
-        checkPathLength(sSFUIniFilePath)
-        hSFUIniFile = open(sSFUIniFilePath, "a")
-        hSFUIniFile.writelines("# SUPPORT")
-        hSFUIniFile.writelines("\nDIVeInitIOPaths=")
-        hSFUIniFile.writelines("\nSFU_Matlab64Exe=${DIVe_Matlab64Exe}")
-        hSFUIniFile.close()
+        appendIniText(dIniBuffer, sSFUIniFilePath, "# SUPPORT")
+        appendIniText(dIniBuffer, sSFUIniFilePath, "\nDIVeInitIOPaths=")
+        appendIniText(dIniBuffer, sSFUIniFilePath, "\nSFU_Matlab64Exe=${DIVe_Matlab64Exe}")
         
-        # First parse the configuration files for the modules specified
-        root_config = configRootElem #ET.parse(configuration_xml).getroot()
+        oContentIndex = getContentIndex(sPathDiveDbContent)
         # Get Master Solver step size from the config XML
-        nMasterSolver = root_config.findall(".//{*}MasterSolver")[0].get("maxCosimStepsize")
+        nMasterSolver = oConfiguration.masterSolver.get("maxCosimStepsize")
         
+        # INI files of module setups with unchanged inputs are neither generated nor written,
+        # only used for INI files generated by a single module setup
+        oBuildCache = getBuildCache(SilFileLoc)
+        dIniFingerprints = {}
+        dIniFileSetups = {}
+        for module_setup in oConfiguration.moduleSetups:
+            for sIniFileName in set(getSfuIniFileName(module.get('context'),module.get('species'),module.get('family'),module.get('type'),
+                                                      module.get('variant'),module.get("modelSet")) for module in module_setup.modules):
+                dIniFileSetups[sIniFileName] = dIniFileSetups.get(sIniFileName, 0) + 1
+
         #change to Sil file destination
         os.chdir(sFinalSilLoc)
         
         # for every module setup generate sil lines in SIL file
-        for module_setup in root_config.findall(
-                ".//{*}ModuleSetup"):
+        for module_setup in oConfiguration.moduleSetups:
             context_name = ''
             species_name = ''
             family_name = ''
             type_name = ''
             model_var = ''
             bSfcnAsOpen = False
-            sModelname = module_setup.get('name')
+            sModelname = module_setup.name
             oDispFileLogLogger.debug("Processing {}".format(sModelname))
-            for module in module_setup.findall(
-                    ".//{*}Module"):
+            lInitIODataSets = [dDataSet for dDataSet in module_setup.dataSets if dDataSet.get('className') == 'initIO']
+            if oBuildCache is not None:
+                lIniFileNames = [getSfuIniFileName(module.get('context'),module.get('species'),module.get('family'),module.get('type'),
+                                                   module.get('variant'),module.get("modelSet")) for module in module_setup.modules]
+                if lIniFileNames and all(dIniFileSetups[sIniFileName] == 1 for sIniFileName in lIniFileNames):
+                    lIniFiles = [sFinalSilIniLoc + sIniFileName for sIniFileName in lIniFileNames]
+                    sFingerprint = getModuleSetupFingerprint(module_setup, sPathDiveDbContent, sModelname in dSfcnModelandStatus and dSfcnModelandStatus[sModelname],
+                                                             sGtSuiteVer, contentPathRelToMaster)
+                    if oBuildCache.isUpToDate("generateIni", lIniFiles, sFingerprint):
+                        continue
+                    dIniFingerprints.update(dict.fromkeys(lIniFiles, sFingerprint))
+            for module in module_setup.modules:
                 context_name = module.get('context')
                 species_name = module.get('species')
                 family_name = module.get('family')
                 type_name = module.get('type')
                 model_var = module.get('variant')
                 model_set = module.get("modelSet")
-                sSFUIniFilePath = sFinalSilIniLoc + "SFU_"+context_name.upper()+"_"+species_name.upper()+"_"+family_name.upper()+"_"+type_name.upper()+"_"+model_var.upper()+"_"+model_set.upper() + ".ini"
-                checkPathLength(sSFUIniFilePath)
-                hSFUIniFile = open(sSFUIniFilePath, "a")
-                hSFUIniFile.write("# Comment: for %s\n\
+                sSFUIniFilePath = sFinalSilIniLoc + getSfuIniFileName(context_name,species_name,family_name,type_name,model_var,model_set)
+                appendIniText(dIniBuffer, sSFUIniFilePath, "# Comment: for %s\n\
     %s_PathContent=%s\n\
     %s_DIVeContext=%s\n\
     %s_DIVeSpecies=%s\n\
@@ -131,14 +215,14 @@ def generate_ini(dSfcnModelandStatus,configRootElem,sPathDiveDbContent,SilFileLo
         species_name.upper(),model_var,
         species_name.upper(),model_set))
         
-                bOpenSilver = False
-                if ((model_set == "silver_dll_w32") or (model_set == "silver_dll_w64")):
-                    bOpenSilver = True
+                # kind of model as for the SFU generation (sfuCreation.getSfuCreationJob)
+                model_kind = getModelKind(module)
+                bOpenSilver = model_kind == MODEL_SILVER_DLL
+                if bOpenSilver:
                     # resolve the path to module XML
                     moduleXML = pathSep.join([sPathDiveDbContent,context_name,species_name,family_name,type_name,"Module",model_var, model_var + ".xml"]) 
-                    checkPathLength(moduleXML)
                     try:
-                        root_module = ET.parse(moduleXML).getroot()
+                        root_module = parseXmlFileCached(moduleXML)
                     except:
                         oPrintToLogLogger.error("\nCould not locate module XML "+moduleXML)
                         continue
@@ -153,7 +237,7 @@ def generate_ini(dSfcnModelandStatus,configRootElem,sPathDiveDbContent,SilFileLo
                                 if ((modelFileEle.get("isMain")=="1") and (modelFileEle.get("name").endswith(".dll"))):
                                     sFilenameSilverDll = modelFileEle.get("name")[0:-4]
                             # write to ini file
-                            hSFUIniFile.write("%s_file_dll_w32=%s\n"%(species_name.upper(),(sFilenameSilverDll)))
+                            appendIniText(dIniBuffer, sSFUIniFilePath, "%s_file_dll_w32=%s\n"%(species_name.upper(),(sFilenameSilverDll)))
                         elif ((model_set == "silver_dll_w64") and (modelSetEle.get("type") == "silver_dll_w64")):
                             sFilenameSilverDll = species_name+"_"+family_name+"_"+type_name
                             # check for module name (name of dll):
@@ -161,83 +245,63 @@ def generate_ini(dSfcnModelandStatus,configRootElem,sPathDiveDbContent,SilFileLo
                                 if ((modelFileEle.get("isMain")=="1") and (modelFileEle.get("name").endswith(".dll"))):
                                     sFilenameSilverDll = modelFileEle.get("name")[0:-4]
                             # write to ini file
-                            hSFUIniFile.write("%s_file_dll_w64=%s\n"%(species_name.upper(),(sFilenameSilverDll)))
+                            appendIniText(dIniBuffer, sSFUIniFilePath, "%s_file_dll_w64=%s\n"%(species_name.upper(),(sFilenameSilverDll)))
                     ################################################################################################################
                         
                         
                 # If modelset is sfcn which has to be handled as open due to lack of parameter then proceed with next module
-                if "sfcn" in model_set and sModelname in dSfcnModelandStatus:
-                    if dSfcnModelandStatus[sModelname]:
-                        bSfcnAsOpen = True
+                if isSfcnHandledAsOpen(module, sModelname, dSfcnModelandStatus):
+                    bSfcnAsOpen = True
                         
                 #if modelSet is open then proceed to next module
-                if model_set == "open" and not bOpenSilver or bSfcnAsOpen:
-                    for dataSetElem in module_setup.findall(".//{*}DataSet[@className='initIO']"):
-                        # hIniFile.write("%s_DIVe_dataClass_initIO=%s\n"%(species_name.upper(),dataSetElem.get('variant')))
-                        hSFUIniFile.write("%s_DIVe_dataClass_initIO=%s\n"%(species_name.upper(),dataSetElem.get('variant')))
+                if model_kind == MODEL_OPEN or bSfcnAsOpen:
+                    for dataSetElem in lInitIODataSets:
+                        appendIniText(dIniBuffer, sSFUIniFilePath, "%s_DIVe_dataClass_initIO=%s\n"%(species_name.upper(),dataSetElem.get('variant')))
                     #------ no need of other INI parameters in case of open modelSet. So break out of the loop ----#
                     continue
                 
-                for dataSetElem in module_setup.findall(".//{*}DataSet[@className='initIO']"):
-                    hSFUIniFile.write("%s_DIVe_dataClass_initIO=%s\n"%(species_name.upper(),dataSetElem.get('variant')))
+                for dataSetElem in lInitIODataSets:
+                    appendIniText(dIniBuffer, sSFUIniFilePath, "%s_DIVe_dataClass_initIO=%s\n"%(species_name.upper(),dataSetElem.get('variant')))
 
             #-----------------If ModeSet is FMU -------------------------#
-            if model_set=="fmu10" or model_set=="fmu20":
+            if model_kind in (MODEL_FMU, MODEL_FMU_CS):
                 sFmuPath = pathSep.join([sPathDiveDbContent,context_name,species_name,family_name,
                                     type_name,"Module",model_var,model_set])
-                sFmuFileName = ""
-                checkPathLength(sFmuPath)
-                for (sDirPath,sDirName,sFileNames) in os.walk(sFmuPath):
-                    for eachFile in sFileNames:
-                        if eachFile.endswith("fmu"):
-                            sFmuFileNamePath = pathSep.join([sFmuPath,eachFile])
-                            sFmuFileName=eachFile
-                            break
-                try:
-                    sFmuFileNameRelative = os.path.relpath(sFmuFileName)
-                    if sFmuFileName.find("fmu")!=-1:                                                        # this should also distinguish between 32 bit and 64 bit...
-                        if context_name == "ctrl" and family_name == "sil":
-                            hSFUIniFile.write("%s_file_fmu20=%s\n"%(species_name.upper(),(sFmuFileName)))
-                        else:
-                            hSFUIniFile.write("%s_file_fmu20cs=%s\n"%(species_name.upper(),(sFmuFileName)))
-                        
-                        
-                except:
-                    oPrintToLogLogger.error("\nCannot find specified path "+os.path.abspath(sFmuFileNameRelative))
+                sFmuFileName = os.path.basename(oContentIndex.getMainModelFile(context_name,species_name,family_name,
+                                    type_name,model_var,model_set,["fmu"]))
+                if sFmuFileName:                                                        # this should also distinguish between 32 bit and 64 bit...
+                    if model_kind == MODEL_FMU:
+                        appendIniText(dIniBuffer, sSFUIniFilePath, "%s_file_fmu20=%s\n"%(species_name.upper(),(sFmuFileName)))
+                    else:
+                        appendIniText(dIniBuffer, sSFUIniFilePath, "%s_file_fmu20cs=%s\n"%(species_name.upper(),(sFmuFileName)))
+                else:
+                    oPrintToLogLogger.error("\nCannot find fmu file in "+os.path.abspath(sFmuPath))
             #-----------end of condition for FMU modelset-----------------#
                 
             #----------------if model set is s-function-------------------#
-            if model_set!="open" and model_set!="fmu10" and model_set!="fmu20" and not bOpenSilver:  # rechtsa 06.12.2019
+            if model_kind in (MODEL_GT, MODEL_SFCN):  # rechtsa 06.12.2019
                 #if the module is GT suite engine module
-                if species_name == 'eng' and family_name == 'detail' and type_name == 'gtfrm':
-                    hSFUIniFile.write("ENG_DIVe_StepSize=0.005\n")
-                    hSFUIniFile.write("GtSuiteVer=" + sGtSuiteVer + "\n")
+                if model_kind == MODEL_GT:
+                    appendIniText(dIniBuffer, sSFUIniFilePath, "ENG_DIVe_StepSize=0.005\n")
+                    appendIniText(dIniBuffer, sSFUIniFilePath, "GtSuiteVer=" + sGtSuiteVer + "\n")
                 
                 else:
                     #get the sFunc file path
                     sFuncFilePath = pathSep.join([sPathDiveDbContent,context_name,species_name,family_name,
                                         type_name,"Module",model_var,model_set])
                     
-                    sFuncFileName = ""
-                    for (sDirPath,sDirName,sFileNames) in os.walk(sFuncFilePath):
-                        for eachFile in sFileNames:
-                            if eachFile.endswith("mexw32") or eachFile.endswith("mexw64"):
-                                sFuncFileNamePath = pathSep.join([sFuncFilePath,eachFile])
-                                sFuncFileName=eachFile
-                                break
-                    try:
-                        if sFuncFileName.find("mexw64")!=-1:
-                            hSFUIniFile.write("%s_file_mexw64=%s\n"%(species_name.upper(),(sFuncFileName)))
-                        else:
-                            hSFUIniFile.write("%s_file_mexw32=%s\n"%(species_name.upper(),(sFuncFileName)))                    
-                        
-                        sFuncFileName = os.path.relpath(sFuncFileNamePath)
-                        
-                        #pdb.set_trace()  
-                    except:
-                        oPrintToLogLogger.error("\nCannot find specified path "+sFuncFileNamePath)
+                    sFuncFileName = os.path.basename(oContentIndex.getMainModelFile(context_name,species_name,family_name,
+                                        type_name,model_var,model_set,["mexw32","mexw64"]))
+                    if sFuncFileName.find("mexw64")!=-1:
+                        appendIniText(dIniBuffer, sSFUIniFilePath, "%s_file_mexw64=%s\n"%(species_name.upper(),(sFuncFileName)))
+                    else:
+                        appendIniText(dIniBuffer, sSFUIniFilePath, "%s_file_mexw32=%s\n"%(species_name.upper(),(sFuncFileName)))
+                    # without s-function file the empty mexw32 entry is written as before, the error is
+                    # logged and the remaining modules are processed (the transformation used to abort here)
+                    if not sFuncFileName:
+                        oPrintToLogLogger.error("\nCannot find s-function file in "+os.path.abspath(sFuncFilePath))
             #----------------End of condition for s-function modules ------------
-                hSFUIniFile.close()
+        flushIniBuffer(dIniBuffer, oBuildCache, dIniFingerprints)
         os.chdir(sCurDir)
         return True
     except Exception as e:
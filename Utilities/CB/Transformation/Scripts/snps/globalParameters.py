@@ -1,35 +1,195 @@
+import logging
 import re
 import os
-def saveGlobalParams(pltm_sfu_par_file, pltm_sfu_par_file_target):
-    global_par_re             = r".*#\s*[gG][lL][oO][bB][aA][lL]"
-    from_global_par_re        = r".*#\s*[fF][rR][oO][mM][gG][lL][oO][bB][aA][lL]"
-    global_name_value_re      = r"(\w+)\s*=\s*([\_\w\$\{\}]+).*"
-    from_global_name_value_re = r"(\w+)\s*=\s*([\w\$\{\}\s]+).*#.*"
-    array_global_pars = []
-    
-
-    with open(pltm_sfu_par_file, "r") as fobj:
+import sys
+import time
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from supportFcn.dispFileLog import installBufferedLogHandlers
+from utilsFunctions.buildCache import forgetOutputs
+from utilsFunctions.tracing import traced
+
+oPrintToLogLogger = logging.getLogger("print_to_log")
+
+GLOBAL      = "global"
+FROM_GLOBAL = "fromGlobal"
+
+# Parameter found in a parameter file, kind is GLOBAL or FROM_GLOBAL, source the file it belongs to
+GlobalParam = namedtuple("GlobalParam", ["name", "value", "kind", "source"])
+
+# "#global" or "#fromGlobal" comment, group 1 is set for fromGlobal
+global_kind_re            = re.compile(r"#\s*([fF][rR][oO][mM])?[gG][lL][oO][bB][aA][lL]")
+global_only_re            = re.compile(r"#\s*[gG][lL][oO][bB][aA][lL]")
+global_name_value_re      = re.compile(r"(\w+)\s*=\s*([\_\w\$\{\}]+).*")
+from_global_name_value_re = re.compile(r"(\w+)\s*=\s*([\w\$\{\}\s]+).*#.*")
+
+# global parameter lines are recognized by their comment, independent of the parameter name
+global_line_re      = re.compile(r"#\s*[gG]")
+from_global_line_re = re.compile(r"#\s*[fF]")
+leading_name_re     = re.compile(r"\w+")
+
+
+def _readGlobalParams(par_file, target):
+    records = []
+    with open(par_file, "r") as fobj:
         for line in fobj:
-            match_global_par      = re.search(global_par_re, line)
-            match_from_global_par = re.search(from_global_par_re, line)
-            if match_global_par:
-                match_global_name_value      = re.search(global_name_value_re, line)
-                if match_global_name_value:
-                    global_name  = match_global_name_value.group(1)
-                    global_value = match_global_name_value.group(2)
-                    array_global_pars.append([ pltm_sfu_par_file_target, "needle", global_name, global_value])
+            if "#" not in line:
+                continue
+            match_kind = global_kind_re.search(line)
+            if not match_kind:
+                continue
+            # "#global" wins over an earlier "#fromGlobal" in the same line
+            if match_kind.group(1) is None or global_only_re.search(line, match_kind.end()):
+                match_name_value = global_name_value_re.search(line)
+                kind = GLOBAL
+            else:
+                match_name_value = from_global_name_value_re.search(line)
+                kind = FROM_GLOBAL
+            if match_name_value:
+                records.append(GlobalParam(match_name_value.group(1), match_name_value.group(2), kind, target))
+    return records
 
-                    
-            elif match_from_global_par:
-                match_from_global_name_value = re.search(from_global_name_value_re, line)
-                if match_from_global_name_value:
-                    global_name  = match_from_global_name_value.group(1)
-                    global_value = match_from_global_name_value.group(2)
-                    array_global_pars.append([pltm_sfu_par_file_target, "pillow", global_name, global_value])                    
 
-    return array_global_pars
+def iterGlobalParams(lParFiles, nMaxWorkers=None):
+    """
+    Extract the global and fromGlobal parameters of parameter files.
+
+    Parameters:
+        lParFiles(list):    Paths of the parameter files, or tuples (path, target) if the records
+                            shall name another file (e.g. the SFU ini the file is copied to) as source.
+
+    Keyword Arguments:
+        nMaxWorkers(int):   Number of threads reading the files in parallel, None to read them one by one.
+
+    Example:
+        for oPar in iterGlobalParams([(sPltmParFile, sSfuIniFile)]):
+            print(oPar.name, oPar.value, oPar.kind)
+
+    Return:
+        Generator of GlobalParam records in the order of files and lines.
+    """
+    lJobs = [(par_file, par_file) if isinstance(par_file, str) else tuple(par_file) for par_file in lParFiles]
+    if nMaxWorkers is None or nMaxWorkers <= 1 or len(lJobs) <= 1:
+        for par_file, target in lJobs:
+            yield from _readGlobalParams(par_file, target)
+        return
+    with ThreadPoolExecutor(max_workers=nMaxWorkers) as oExecutor:
+        for records in oExecutor.map(lambda tJob: _readGlobalParams(*tJob), lJobs):
+            yield from records
+
+
+def toGlobalParList(records):
+    """
+    Convert GlobalParam records to the [target, "needle"/"pillow", name, value] entries
+    used by patchGlobalsInIni and patchGlobalInFinalSil.
+    """
+    return [[par.source, "needle" if par.kind == GLOBAL else "pillow", par.name, par.value] for par in records]
+
+
+@traced()
+def saveGlobalParams(pltm_sfu_par_file, pltm_sfu_par_file_target):
+    return toGlobalParList(_readGlobalParams(pltm_sfu_par_file, pltm_sfu_par_file_target))
+
+class GlobalParamIndex():
+    """
+    Index of the global parameters returned by saveGlobalParams.
+
+    For every parameter name the first global ("needle") and the first fromGlobal
+    ("pillow") entry are stored with their position in the list, so a line only
+    has to be compared with the parameters whose name is a prefix of it.
+
+    Parameters:
+        array_global_pars(list):    Entries [target ini, "needle"/"pillow", name, value].
+
+    Example:
+        oIndex = GlobalParamIndex(array_global_pars)
+        sValue, sSource = oIndex.getGlobal("_DIVeContext")
+    """
+
+    def __init__(self, array_global_pars):
+        # name -> [(position, entry) of first needle, (position, entry) of first pillow]
+        self.dNames = {}
+        for i, par in enumerate(array_global_pars):
+            lFirst = self.dNames.setdefault(par[2], [None, None])
+            nKind = 0 if par[1] == "needle" else 1 if par[1] == "pillow" else None
+            if nKind is not None and lFirst[nKind] is None:
+                lFirst[nKind] = (i, par)
+
+    def getGlobal(self, name):
+        """
+        Return (value, source ini) of the global parameter name, None if there is no global.
+        """
+        lFirst = self.dNames.get(name)
+        if lFirst is None or lFirst[0] is None:
+            return None
+        return lFirst[0][1][3], lFirst[0][1][0]
+
+    def resolve(self, par):
+        """
+        Return the value of a fromGlobal parameter: the global value if set, else its local value.
+        """
+        tGlobal = self.getGlobal(par[2])
+        return par[3] if tGlobal is None else tGlobal[0]
+
+    def matchLine(self, line):
+        """
+        Return the first parameter in list order that the line is a global (needle)
+        or fromGlobal (pillow) definition of, None if there is none.
+        """
+        bGlobal = global_line_re.search(line) is not None
+        bFromGlobal = from_global_line_re.search(line) is not None
+        if not (bGlobal or bFromGlobal):
+            return None
+        match_name = leading_name_re.match(line)
+        if not match_name:
+            return None
+        token = match_name.group(0)
+        tBest = None
+        for k in range(1, len(token) + 1):
+            lFirst = self.dNames.get(token[:k])
+            if lFirst is None:
+                continue
+            for tCandidate in (lFirst[0] if bGlobal else None, lFirst[1] if bFromGlobal else None):
+                if tCandidate is not None and (tBest is None or tCandidate[0] < tBest[0]):
+                    tBest = tCandidate
+        return None if tBest is None else tBest[1]
+
+    def patchLines(self, lines):
+        new_lines = []
+        for line in lines:
+            par = self.matchLine(line)
+            if par is None:
+                # neither global nor fromGlobal: write original line to patched ini
+                new_lines.append(line)
+            elif par[1] == "pillow":
+                # fromGlobal takes the global value if set, else the local one (#fromGlobal is cut out)
+                new_lines.append(par[2] + " = " + self.resolve(par))
+            # global definitions are not written to the patched ini
+        return new_lines
+
 
+@traced()
 def patchGlobalsInIni(array_global_pars):
+    if not array_global_pars:
+        return
+    oIndex = GlobalParamIndex(array_global_pars)
+    list_ini = dict.fromkeys(par[0] for par in array_global_pars)
+
+    for ini in list_ini:
+        lines = []
+        if os.path.isfile(ini):
+            with open(ini, "r") as fobj:
+                lines = fobj.readlines()
+        os.remove(ini)
+        with open(ini, "w") as new_fobj:
+            new_fobj.writelines(oIndex.patchLines(lines))
+    # the build cache only knows the unpatched INI files
+    forgetOutputs(list(list_ini))
+
+
+def _patchGlobalsInIniNested(array_global_pars):
+    # former implementation with a nested search per line, kept as reference for the benchmark
     list_ini = {}
     for par in array_global_pars:
         if par[0] not in list_ini:
@@ -72,41 +232,107 @@ def patchGlobalsInIni(array_global_pars):
         with open(ini, "w") as new_fobj:
             new_fobj.writelines(new_lines)
 
-    
+
+@traced()
 def patchGlobalInFinalSil(array_global_pars, sConfigSilName):
     # replace "<parameters/>" with following lines to sConfigSilName.sil:
-    global_string = ""
-    global_string = global_string + "<parameters>\n"
+    oIndex = GlobalParamIndex(array_global_pars)
+    global_lines = ["<parameters>\n"]
     for par in array_global_pars:
         if par[1] == "needle":
-            global_string = global_string + "  <param>\n"
-            global_string = global_string + "    <name>"  + par[2] + "</name>\n"
-            global_string = global_string + "    <value>" + par[3] + "</value>\n"
-            global_string = global_string + "  </param>\n"
-    global_string = global_string + "</parameters>\n"
-        
+            global_lines.append("  <param>\n")
+            global_lines.append("    <name>"  + par[2] + "</name>\n")
+            global_lines.append("    <value>" + par[3] + "</value>\n")
+            global_lines.append("  </param>\n")
+    global_lines.append("</parameters>\n")
+    global_string = "".join(global_lines)
+
     with open(sConfigSilName + ".sil", 'r') as file :
-        file_orig = file.read()                    
-        # Patch in target string
-        file_patch = file_orig.replace("<parameters/>", global_string)
-        # Write the file out again
-        with open(sConfigSilName + ".sil", 'w') as file:
-            file.write(file_patch) 
-            
-    # log file to master to see which globalParameters exist, and where they originate from     
+        file_orig = file.read()
+    # Patch in target string
+    file_patch = file_orig.replace("<parameters/>", global_string)
+    # Write the file out again
+    with open(sConfigSilName + ".sil", 'w') as file:
+        file.write(file_patch)
+
+    # log file to master to see which globalParameters exist, and where they originate from
+    log_lines = []
+    for par in array_global_pars:
+        if par[1] == "pillow":
+            tGlobal = oIndex.getGlobal(par[2])
+            if tGlobal is not None:
+                log_lines.append(par[2] + " = " + tGlobal[0] + "; (" + par[0] + " inherits global from " + tGlobal[1] + ")\n")
+            else:
+                log_lines.append(par[2] + " = " + par[3] + "; (" + par[0] + ")\n")
+        elif par[1] == "needle":
+            log_lines.append(par[2] + " = " + par[3] + "; (" + par[0] + ")\n")
     with open("Master/globalParam.log", "w") as log_file:
-        for i, par in enumerate(array_global_pars):
-            fromGlobal_match = False
-            if par[1] == "pillow":
-                for par_2 in array_global_pars:
-                    if par_2[1] == "needle" and par[2] == par_2[2]:
-                        log_file.write(par[2] + " = " + par_2[3] + "; (" + par[0] + " inherits global from " + par_2[0] + ")\n")
-                        fromGlobal_match = True
-                        break
-                if not fromGlobal_match:
-                    log_file.write(par[2] + " = " + par[3] + "; (" + par[0] + ")\n")
-            elif par[1] == "needle":
-                log_file.write(par[2] + " = " + par[3] + "; (" + par[0] + ")\n")
-    
-            
-            
+        log_file.writelines(log_lines)
+
+
+def _writeBenchmarkInputs(sDir, nParams, nInis):
+    # every ini gets globals, fromGlobals (half of them set by a global of another ini) and plain lines
+    lParFiles = []
+    for n in range(nInis):
+        sIni = os.path.join(sDir, "sfu" + str(n) + ".ini")
+        with open(sIni, "w") as fobj:
+            for p in range(n, nParams, nInis):
+                if p % 4 == 0:
+                    fobj.write("gPar" + str(p) + " = " + str(p) + " # global\n")
+                elif p % 4 == 1:
+                    fobj.write("gPar" + str(p - 1 - 4 * (p % 8 == 1)) + " = 0 # fromGlobal\n")
+                else:
+                    fobj.write("localPar" + str(p) + " = " + str(p) + "\n")
+        lParFiles.append(sIni)
+    return lParFiles
+
+
+def _runBenchmark(fPatch, sDir, nParams, nInis):
+    lParFiles = _writeBenchmarkInputs(sDir, nParams, nInis)
+    array_global_pars = toGlobalParList(iterGlobalParams(lParFiles))
+    nStart = time.perf_counter()
+    fPatch(array_global_pars)
+    nDuration = time.perf_counter() - nStart
+    lResult = []
+    for sIni in lParFiles:
+        with open(sIni, "r") as fobj:
+            lResult.append(fobj.read())
+    return nDuration, lResult
+
+
+def benchmark(nParams=10000, nInis=20, nNestedParams=500):
+    """
+    Time patchGlobalsInIni on synthetic INI files and compare it with the former nested search.
+    The nested search grows much faster than quadratically with the number of parameters (several
+    seconds for 2000 parameters), so it only runs on the first nNestedParams parameters, where both
+    implementations have to patch the INI files identically. The durations are logged to print_to_log.
+
+    Keyword Arguments:
+        nParams(int):       Number of parameter lines of all INI files patched by patchGlobalsInIni.
+        nInis(int):         Number of INI files.
+        nNestedParams(int): Number of parameter lines both implementations are compared on.
+
+    Example:
+        python -m snps.globalParameters 10000 20 500
+
+    Return:
+        Tuple (duration indexed for nParams, duration indexed for nNestedParams,
+        duration nested for nNestedParams) in seconds.
+    """
+    with tempfile.TemporaryDirectory() as sDir:
+        nIndexed, _ = _runBenchmark(patchGlobalsInIni, sDir, nParams, nInis)
+    with tempfile.TemporaryDirectory() as sDir:
+        nIndexedSubset, lIndexed = _runBenchmark(patchGlobalsInIni, sDir, nNestedParams, nInis)
+        nNested, lNested = _runBenchmark(_patchGlobalsInIniNested, sDir, nNestedParams, nInis)
+    if lIndexed != lNested:
+        raise AssertionError("Patched INI files of both implementations differ")
+    oPrintToLogLogger.info("\tglobal parameters in %d INI files" % nInis)
+    oPrintToLogLogger.info("\tindexed: %.3f s for %d parameters" % (nIndexed, nParams))
+    oPrintToLogLogger.info("\tindexed: %.3f s for %d parameters" % (nIndexedSubset, nNestedParams))
+    oPrintToLogLogger.info("\tnested:  %.3f s for %d parameters" % (nNested, nNestedParams))
+    return nIndexed, nIndexedSubset, nNested
+
+
+if __name__ == '__main__':
+    installBufferedLogHandlers()
+    benchmark(*[int(sArg) for sArg in sys.argv[1:4]])
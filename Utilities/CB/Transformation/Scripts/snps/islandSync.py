@@ -0,0 +1,229 @@
+#    Incremental synchronisation of Content folders into the island (ContentLocal).
+#    Only files that are missing or differ from the island copy are copied, either
+#    judged by size and modification time ("mtime") or by size and content hash ("hash").
+#    Files that only exist in the island are left untouched.
+#    Files can be linked instead of copied (link mode "auto"): a reflink (copy-on-write clone, Linux
+#    file systems supporting FICLONE) where possible, else a hard link if Content and island share a
+#    volume, else a plain copy. Hard linked files share their data with the Content, so files the
+#    simulation may write (result/output folders, see getCopyOnlyFolders) are always copied.
+#    On Windows there is no reflink support, link mode "auto" creates hard links (NTFS, same volume)
+#    and falls back to a copy. Folders a simulation writes into besides the default ones have to be
+#    added to 'islandCopyOnlyFolders', else the simulation would modify the Content through the link.
+
+import hashlib
+import logging
+import os
+import shutil
+import threading
+from shutil import copy2
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+oPrintToLogLogger = logging.getLogger("print_to_log")
+
+LINK_MODES = ("copy", "auto")
+FICLONE = 0x40049409
+# folders written by simulations, files below them are copied in every link mode
+sCopyOnlyFoldersDefault = "results,result,output,outputs,log,logs"
+
+SYNC_MODES = ("mtime", "hash")
+nHashChunkSize = 1024 * 1024
+
+
+class SyncReport():
+    """
+    Number of files and bytes copied and skipped by syncTree.
+
+    Example:
+        oReport = SyncReport()
+        syncTree(sContentDir, sIslandDir, "mtime", oReport)
+        oReport.log()
+    """
+
+    def __init__(self):
+        self.nFilesCopied = 0
+        self.nBytesCopied = 0
+        self.nFilesSkipped = 0
+        self.nBytesSkipped = 0
+        self.dMethods = {}
+        self.oLock = threading.Lock()
+
+    def add(self, bCopied, nBytes, sMethod="copy"):
+        with self.oLock:
+            if bCopied:
+                self.dMethods[sMethod] = self.dMethods.get(sMethod, 0) + 1
+                self.nFilesCopied += 1
+                self.nBytesCopied += nBytes
+            else:
+                self.nFilesSkipped += 1
+                self.nBytesSkipped += nBytes
+
+    def log(self):
+        oPrintToLogLogger.info("\tIsland sync: %d files (%.1f MB) copied, %d files (%.1f MB) unchanged"
+                               % (self.nFilesCopied, self.nBytesCopied / 1e6, self.nFilesSkipped, self.nBytesSkipped / 1e6))
+        if self.dMethods:
+            oPrintToLogLogger.info("\tIsland files created by " + ", ".join(sMethod + ": " + str(nFiles) for sMethod, nFiles in sorted(self.dMethods.items())))
+
+
+def reflinkFile(sSrc, sDst):
+    """
+    Clone sSrc to sDst sharing the data blocks (copy-on-write). Raises OSError if not supported.
+    """
+    if fcntl is None:
+        raise OSError("Reflinks are not supported on this platform")
+    with open(sSrc, "rb") as oSrc, open(sDst, "wb") as oDst:
+        try:
+            fcntl.ioctl(oDst.fileno(), FICLONE, oSrc.fileno())
+        except OSError:
+            oDst.close()
+            os.remove(sDst)
+            raise
+    shutil.copystat(sSrc, sDst)
+
+
+def getCopyOnlyFolders():
+    """
+    Return the lower case names of the folders whose files are never linked, taken from the
+    environment variable 'islandCopyOnlyFolders' (comma separated), else results, output and log folders.
+    """
+    sFolders = os.environ.get('islandCopyOnlyFolders', None)
+    if sFolders is None:
+        sFolders = sCopyOnlyFoldersDefault
+    return {sFolder.strip().lower() for sFolder in sFolders.split(",") if sFolder.strip()}
+
+
+def isLinkAllowed(sSrc, setCopyOnlyFolders=None):
+    """
+    Return True if sSrc may be linked into the island, i.e. it is not below a copy-only folder.
+    """
+    if setCopyOnlyFolders is None:
+        setCopyOnlyFolders = getCopyOnlyFolders()
+    lFolders = os.path.normpath(sSrc).replace("\\", "/").split("/")[:-1]
+    return not any(sFolder.lower() in setCopyOnlyFolders for sFolder in lFolders)
+
+
+def linkFile(sSrc, sDst, sLinkMode="copy", oReport=None):
+    """
+    Create sDst as a copy of sSrc by the cheapest method of the link mode.
+
+    Parameters:
+        sSrc(string):   Source file.
+        sDst(string):   Destination file, replaced if it exists.
+
+    Keyword Arguments:
+        sLinkMode(string):      "copy" for a plain copy, "auto" to try reflink, hard link and copy in this order
+                                (plain copy for files in copy-only folders, see isLinkAllowed). On Windows
+                                the reflink fails and a hard link or copy is created.
+        oReport(SyncReport):    Report the file is added to.
+
+    Example:
+        copytree(sContentDir, sIslandDir, copy_function=lambda sSrc, sDst: linkFile(sSrc, sDst, "auto", oReport))
+
+    Return:
+        Method used ("reflink", "hardlink" or "copy").
+    """
+    if sLinkMode not in LINK_MODES:
+        raise ValueError("Unknown island link mode \"" + str(sLinkMode) + "\", expected one of " + ", ".join(LINK_MODES))
+    sMethod = "copy"
+    # never write through an existing (possibly hard linked) destination into the Content
+    if os.path.lexists(sDst):
+        os.remove(sDst)
+    if sLinkMode == "auto" and isLinkAllowed(sSrc):
+        try:
+            reflinkFile(sSrc, sDst)
+            sMethod = "reflink"
+        except OSError:
+            try:
+                os.link(sSrc, sDst)
+                sMethod = "hardlink"
+            except OSError:
+                pass
+    if sMethod == "copy":
+        copy2(sSrc, sDst)
+    if oReport is not None:
+        oReport.add(True, os.path.getsize(sSrc), sMethod)
+    return sMethod
+
+
+def getFileHash(sFile):
+    oHash = hashlib.sha256()
+    with open(sFile, "rb") as oFile:
+        for bChunk in iter(lambda: oFile.read(nHashChunkSize), b""):
+            oHash.update(bChunk)
+    return oHash.digest()
+
+
+def isFileUnchanged(sSrc, oSrcStat, sDst, sMode):
+    """
+    Return True if sDst is an up to date copy of sSrc.
+    """
+    try:
+        oDstStat = os.stat(sDst)
+    except OSError:
+        return False
+    if oDstStat.st_size != oSrcStat.st_size:
+        return False
+    if sMode == "hash":
+        return getFileHash(sSrc) == getFileHash(sDst)
+    # copy2 preserves the modification time of the source
+    return oDstStat.st_mtime_ns == oSrcStat.st_mtime_ns
+
+
+def syncTree(sSrc, sDst, sMode="mtime", oReport=None, sLinkMode="copy"):
+    """
+    Copy the directory tree sSrc to sDst, skipping files whose copy in sDst is up to date.
+
+    Parameters:
+        sSrc(string):   Source directory, e.g. a module folder in the Content.
+        sDst(string):   Destination directory in the island.
+
+    Keyword Arguments:
+        sMode(string):          "mtime" to compare size and modification time,
+                                "hash" to compare size and content.
+        oReport(SyncReport):    Report the copied and skipped files are added to.
+        sLinkMode(string):      "copy" or "auto", see linkFile.
+
+    Example:
+        syncTree("..\\..\\..\\Content\\ctrl\\mcm", "ContentLocal\\ctrl\\mcm", "mtime", oReport)
+
+    Return:
+        SyncReport object.
+
+    Error:
+        Errors of reading or copying files are raised to the caller.
+    """
+    if sMode not in SYNC_MODES:
+        raise ValueError("Unknown island sync mode \"" + str(sMode) + "\", expected one of " + ", ".join(SYNC_MODES))
+    if oReport is None:
+        oReport = SyncReport()
+    os.makedirs(sDst, exist_ok=True)
+    for oEntry in os.scandir(sSrc):
+        sDstPath = os.path.join(sDst, oEntry.name)
+        if oEntry.is_dir():
+            syncTree(oEntry.path, sDstPath, sMode, oReport, sLinkMode)
+        else:
+            syncFile(oEntry.path, sDstPath, sMode, oReport, sLinkMode, oEntry.stat())
+    return oReport
+
+
+def syncFile(sSrc, sDst, sMode=None, oReport=None, sLinkMode="copy", oSrcStat=None):
+    """
+    Copy a single file, skipping it if sMode is set and its copy in sDst is up to date.
+    The destination directory is created if needed. Parameters as for syncTree,
+    sMode None always copies the file.
+    """
+    if sMode is not None and sMode not in SYNC_MODES:
+        raise ValueError("Unknown island sync mode \"" + str(sMode) + "\", expected one of " + ", ".join(SYNC_MODES))
+    if oSrcStat is None:
+        oSrcStat = os.stat(sSrc)
+    if sMode and isFileUnchanged(sSrc, oSrcStat, sDst, sMode):
+        if oReport is not None:
+            oReport.add(False, oSrcStat.st_size)
+        return
+    sDstDir = os.path.dirname(sDst)
+    if sDstDir:
+        os.makedirs(sDstDir, exist_ok=True)
+    linkFile(sSrc, sDst, sLinkMode, oReport)
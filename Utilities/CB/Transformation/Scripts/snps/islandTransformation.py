@@ -10,16 +10,26 @@
 #    Contact: alexei.mate@synopsys.com
 
 import logging
-import os, re, glob
+import os, re, glob, sys, time
 from string import Template
 from shutil import copytree, copy2, ignore_patterns
-import time
+from concurrent.futures import Executor, ThreadPoolExecutor, wait
+from snps.islandSync import SyncReport, linkFile, syncFile, syncTree
+from supportFcn.dispFileLog import installBufferedLogHandlers
+from utilsFunctions.tracing import traced
 
 content_island = "ContentLocal"
 content_old = "..\\..\\..\\Content"
+island_manifest = "islandManifest.txt"
 
 oPrintToLogLogger = logging.getLogger("print_to_log")
 
+placeholder_re = re.compile(r"\$\{\w+\}")
+# an opening "${" directly before a substituted placeholder could form a new placeholder
+open_placeholder_re = re.compile(r"\$\{\w*\Z")
+# island Content paths inside ini values and userConfig strings, e.g. "-a ContentLocal\\ctrl\\...\\map.txt"
+island_path_re = re.compile(r"[^\s\"';,=]*" + content_island + r"[^\s\"';,]*")
+
 # make island content path globally accessible to reduce maintenance
 def get_island_content_name():
     return content_island
@@ -40,9 +50,127 @@ def replace_utilities_path(sfu_content):
     sfu_content = re.sub(old_DIVeInit_path_re, r"\2", sfu_content)
     return sfu_content
     
-def islandTransformation(s_final_sil_loc):
+class ParamResolver():
+    # Replaces the ${param} placeholders of the SFUs by the values of the init INIs.
+    # All placeholders are found in one pass over the SFU. If a substitution could build a new
+    # placeholder (values or text around them containing "$", "{", "}"), the SFU is resolved
+    # key by key like before, so the result is always the same.
+    def __init__(self, d_params):
+        self.d_params = d_params
+        # values still containing placeholders are not substituted
+        self.d_replace = {key: value for key, value in d_params.items() if not placeholder_re.search(value)}
+        self.single_pass = not any(c in value for value in self.d_replace.values() for c in "${}")
+
+    def resolve_sequential(self, sfu_content):
+        for key in self.d_replace:
+            sfu_content = sfu_content.replace(key, self.d_replace[key])
+        return sfu_content
+
+    def resolve(self, sfu_content):
+        if not self.single_pass:
+            return self.resolve_sequential(sfu_content)
+        parts = []
+        pos = 0
+        for match in placeholder_re.finditer(sfu_content):
+            value = self.d_replace.get(match.group(0))
+            if value is None:
+                continue
+            literal = sfu_content[pos:match.start()]
+            if open_placeholder_re.search(literal):
+                return self.resolve_sequential(sfu_content)
+            parts.append(literal)
+            parts.append(value)
+            pos = match.end()
+        parts.append(sfu_content[pos:])
+        return "".join(parts)
+
+def prune_nested_content_dirs(content_jobs):
+    # a Content folder below another copied folder is already copied with it
+    dirs_norm = {os.path.normcase(os.path.normpath(content_dir_old)) for content_dir_old in content_jobs}
+    pruned_jobs = {}
+    for content_dir_old, content_dir in content_jobs.items():
+        parent = os.path.dirname(os.path.normcase(os.path.normpath(content_dir_old)))
+        while parent and parent not in dirs_norm and os.path.dirname(parent) != parent:
+            parent = os.path.dirname(parent)
+        if parent not in dirs_norm:
+            pruned_jobs[content_dir_old] = content_dir
+    return pruned_jobs
+
+def add_closure_reference(content_path, content_path_old, closure_files, content_jobs):
+    # copy scope "closure": a referenced file is copied alone, a referenced folder completely
+    # returns False if the path does not exist, then the folder containing it has to be copied
+    if os.path.isfile(content_path_old):
+        closure_files[content_path_old] = content_path
+    elif os.path.isdir(content_path_old):
+        if content_path_old not in content_jobs:
+            content_jobs[content_path_old] = content_path
+    else:
+        return False
+    return True
+
+def prune_covered_files(closure_files, content_jobs):
+    # files inside a folder that is copied completely are not copied again
+    dirs_norm = [os.path.normcase(os.path.normpath(content_dir_old)) + os.sep for content_dir_old in content_jobs]
+    return {file_old: file_new for file_old, file_new in closure_files.items()
+            if not any(os.path.normcase(os.path.normpath(file_old)).startswith(dir_norm) for dir_norm in dirs_norm)}
+
+def write_island_manifest(copy_jobs):
+    # list of all Content folders and files copied to the island
+    with open(island_manifest, "w") as manifest_fobj:
+        for kind, source, target in copy_jobs:
+            if kind == "content":
+                manifest_fobj.write("folder\t" + source + "\t" + target + "\n")
+            elif kind == "file":
+                manifest_fobj.write("file\t" + source + "\t" + target + "\n")
+
+def run_copy_job(copy_job, sync_mode, sync_report, link_mode="copy"):
+    # returns the exception of a failed job, None on success
+    kind, source, target = copy_job
+    try:
+        if kind == "file":
+            syncFile(source, target, sync_mode, sync_report, link_mode)
+        elif kind == "content" and sync_mode:
+            syncTree(source, target, sync_mode, sync_report, link_mode)
+        elif kind == "content" and link_mode != "copy":
+            copytree(source, target, ignore=None, copy_function=lambda src, dst: linkFile(src, dst, link_mode, sync_report))
+        elif kind == "content":
+            copytree(source, target, ignore=None)
+        else:
+            copy2(source, target)
+    except Exception as e:
+        return e
+    return None
+
+@traced()
+def islandTransformation(s_final_sil_loc, sync_mode=None, pending_jobs=None, max_workers=None, link_mode=None, copy_scope=None):
+    # sync_mode "mtime" or "hash" only copies changed Content files into an existing island,
+    # None copies the complete Content folders (default taken from environment variable 'islandSyncMode')
+    # link_mode "auto" creates the island files as reflinks or hard links where possible (hard links only
+    # on Windows, never for result/output folders, see islandSync), "copy" always copies them (default taken from
+    # environment variable 'islandLinkMode', else "copy")
+    # pending_jobs are the futures (e.g. of sfuCreation.submitSFUsForModuleSetups) or the executor of the
+    # asynchronous tasks that have to be finished before the island is built, an executor is shut down and
+    # waited for. Callers without asynchronous tasks (e.g. after sfuCreation.createSFUsForModuleSetups, which
+    # returns when all SFUs are written) pass nothing and the island is built at once.
+    # max_workers bounds the number of parallel copy jobs (default of ThreadPoolExecutor)
+    # copy_scope "closure" only copies the Content files referenced by sil-lines, ini parameters and userConfig
+    # strings and writes a manifest, "folder" copies the folders containing them (default taken from
+    # environment variable 'islandCopyScope', else "folder")
     oPrintToLogLogger.info("\n\t========Performing Island Transformation========")
-    time.sleep(2)           # wait shortly for all the async tasks to be done
+    if isinstance(pending_jobs, Executor):
+        pending_jobs.shutdown(wait=True)
+    elif pending_jobs is not None:
+        wait(pending_jobs)
+    if sync_mode is None:
+        sync_mode = os.environ.get('islandSyncMode', None) or None
+    if link_mode is None:
+        link_mode = os.environ.get('islandLinkMode', None) or "copy"
+    if copy_scope is None:
+        copy_scope = os.environ.get('islandCopyScope', None) or "folder"
+    sync_report = SyncReport()
+    content_jobs = {}
+    closure_files = {}
+    utilities_jobs = {}
     s_cur_dir = os.getcwd()
     os.chdir(os.path.join(s_final_sil_loc, "Master"))
     ini_regex = r"(\w+)=(.*)"
@@ -68,15 +196,14 @@ def islandTransformation(s_final_sil_loc):
                 else:
                     d_params["${" + param + "}"] = value
         
+    param_resolver = ParamResolver(d_params)
     for sfu_file in sfu_list:
         oPrintToLogLogger.info("\t" + sfu_file)
         content_tracking = []
         with open(sfu_file, "r") as sfu_fobj:
             sfu_content = sfu_fobj.read()
             # resolve ini parameters
-            for key in d_params:
-                if not re.search(r"\$\{\w+\}",d_params[key]):
-                    sfu_content = sfu_content.replace(key, d_params[key])
+            sfu_content = param_resolver.resolve(sfu_content)
             if re.search(content_path_par, sfu_content):
                 sfu_list_patched[sfu_file] = sfu_content
             if re.search(old_content_path_re, sfu_content):
@@ -110,45 +237,89 @@ def islandTransformation(s_final_sil_loc):
                                 content_path_old = content_old + "\\" + path.split("\\",1)[1]
                             content_dir = os.path.dirname(content_path)
                             content_dir_old = os.path.dirname(content_path_old)
-                            if os.path.isdir(content_dir_old):
-                                if content_dir_old not in content_tracking:
-                                    try:
-                                        copytree(content_dir_old, content_dir, ignore=None)
-                                    except Exception as e:
-                                        oPrintToLogLogger.warning("Could not copy " + content_dir_old + " to " + content_island + ".")
-                                        oPrintToLogLogger.error("         The reason could either be a too long path, a non existent file or something else I didn't think of.")
-                                        oPrintToLogLogger.error("         " + str(e))
-                            else:
+                            if copy_scope == "closure" and add_closure_reference(content_path, content_path_old, closure_files, content_jobs):
+                                pass
+                            elif os.path.isdir(content_dir_old):
+                                if content_dir_old not in content_jobs:
+                                    content_jobs[content_dir_old] = content_dir
+                            elif content_dir_old not in content_tracking:
                                 oPrintToLogLogger.warning("The file can't be copied to "+ content_island + " as it doesn't exist.")
                             content_tracking.append(content_dir_old)
                         elif content_or_utility == 2:
                             utilities_path_old = path
-                            utilities_dir_old = os.path.dirname(utilities_path_old)
                             utilities_path = replace_utilities_path(utilities_path_old)
-                            utilities_dir = os.path.dirname(utilities_path)                                                        
                             if os.path.isfile(utilities_path_old) :
-                                try:
-                                    copy2(utilities_path_old, utilities_path)                                       
-                                except Exception as e:
-                                    oPrintToLogLogger.warning("Could not copy \"" + utilities_path_old + "\" to \"Master\".")
-                                    oPrintToLogLogger.error("         The reason could either be a too long path, a non existent file or something else I didn't think of.")
-                                    oPrintToLogLogger.error("         " + str(e))
+                                utilities_jobs[utilities_path_old] = utilities_path
                             else:
                                 oPrintToLogLogger.warning("The file" +  utilities_path_old + "can't be copied to \"Master\" as it doesn't exist.")
-                            
+
+    if copy_scope == "closure":
+        # Content paths in ini parameters and userConfig strings
+        for value in d_params.values():
+            for content_path in island_path_re.findall(re.sub(old_content_path_re, content_island, value)):
+                add_closure_reference(content_path, content_path.replace(content_island, content_old), closure_files, content_jobs)
+
+    # copy all collected Content folders and Utilities files in parallel, each folder/file only once
+    content_jobs = prune_nested_content_dirs(content_jobs)
+    copy_jobs = [("content", content_dir_old, content_dir) for content_dir_old, content_dir in content_jobs.items()]
+    copy_jobs += [("file", file_old, file_new) for file_old, file_new in prune_covered_files(closure_files, content_jobs).items()]
+    copy_jobs += [("utilities", utilities_path_old, utilities_path) for utilities_path_old, utilities_path in utilities_jobs.items()]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        copy_errors = list(executor.map(lambda copy_job: run_copy_job(copy_job, sync_mode, sync_report, link_mode), copy_jobs))
+    if copy_scope == "closure":
+        write_island_manifest(copy_jobs)
+    for (kind, source, target), e in zip(copy_jobs, copy_errors):
+        if e is None:
+            continue
+        if kind in ("content", "file"):
+            oPrintToLogLogger.warning("Could not copy " + source + " to " + content_island + ".")
+        else:
+            oPrintToLogLogger.warning("Could not copy \"" + source + "\" to \"Master\".")
+        oPrintToLogLogger.error("         The reason could either be a too long path, a non existent file or something else I didn't think of.")
+        oPrintToLogLogger.error("         " + str(e))
+
     # patching all paths in sfu's manually which contain fixed Content/Utilities paths, e.g. non DIVe SFU's
     for sfu_file in sfu_list_patched:
         with open(sfu_file, "w") as sfu_fobj:
             sfu_fobj.write(replace_utilities_path(sfu_list_patched[sfu_file]))
     
-    
+    if sync_mode or link_mode != "copy":
+        sync_report.log()
     os.chdir(s_cur_dir)
     oPrintToLogLogger.info("\t================================================")
-        
-        
 
 
+def _resolve_params_per_key(d_params, sfu_content):
+    # former resolution of the ini parameters, kept as reference for the benchmark
+    for key in d_params:
+        if not re.search(r"\$\{\w+\}",d_params[key]):
+            sfu_content = sfu_content.replace(key, d_params[key])
+    return sfu_content
 
+def benchmark_param_resolution(n_sfus=100, n_params=5000):
+    # compares the single pass ParamResolver with the former per key replacement on synthetic SFUs
+    d_params = {}
+    for i in range(n_params):
+        d_params["${par" + str(i) + "}"] = "..\\..\\..\\Content\\ctrl\\mod" + str(i) if i % 3 else "${par" + str(i + 1) + "}"
+    sfus = []
+    for n in range(n_sfus):
+        lines = ["<sil-line>-a &quot;${par" + str((n * 37 + k * 101) % (n_params + 10)) + "}&quot; -b ${unknown" + str(k) + "}</sil-line>" for k in range(200)]
+        sfus.append("<sfu>\n" + "\n".join(lines) + "\n</sfu>\n")
+    start = time.perf_counter()
+    param_resolver = ParamResolver(d_params)
+    resolved_single_pass = [param_resolver.resolve(sfu_content) for sfu_content in sfus]
+    duration_single_pass = time.perf_counter() - start
+    start = time.perf_counter()
+    resolved_per_key = [_resolve_params_per_key(d_params, sfu_content) for sfu_content in sfus]
+    duration_per_key = time.perf_counter() - start
+    if resolved_single_pass != resolved_per_key:
+        raise AssertionError("Resolved SFUs of both implementations differ")
+    oPrintToLogLogger.info("\t%d SFUs, %d ini parameters" % (n_sfus, n_params))
+    oPrintToLogLogger.info("\tsingle pass: %.3f s" % duration_single_pass)
+    oPrintToLogLogger.info("\tper key:     %.3f s" % duration_per_key)
+    return duration_single_pass, duration_per_key
 
-    
-    
\ No newline at end of file
+
+if __name__ == '__main__':
+    installBufferedLogHandlers()
+    benchmark_param_resolution(*[int(arg) for arg in sys.argv[1:3]])
@@ -1,85 +1,84 @@
-
+import io
 import logging
 import re
 import shutil
-import subprocess
+import zipfile
 import os, sys
+from snps.fmuInspection import getArchitecture, getFmuInfo
+from utilsFunctions.tracing import traced
 
-# unzip it in Master/delete fmu in Master
-# patch userconfig(Default)
-# zip it again / remove unzipped file
-   
-   
-oPrintToLogLogger = logging.getLogger("print_to_log")
+# copy the fmu from the Content to Master member by member with the public zipfile API:
+# all members are copied unchanged (same name, date, attributes and compression method),
+# only binaries/win<architecture>/userConfig.cfg gets the patched userConfigDefault
 
-def determine_architecture_(fmu_unzipped):
-    folder_name = os.path.join(fmu_unzipped, "binaries")
-    for root, dirs, files in os.walk(folder_name):
-        for dir in dirs:
-            if "win" in dir:
-                if "64" in dir:
-                    return True
-                elif "32" in dir:
-                    return False
-                else:
-                    oPrintToLogLogger.error("The fmu {}.fmu has neither a 32 nor a 64 bit folder".format(fmu_unzipped))
-                    sys.exit(-2)
-                    
-                pass
+oPrintToLogLogger = logging.getLogger("print_to_log")
 
-def copy_from_content_to_master(fmu_path, fmu_name):
+def determine_architecture_(architecture):
+    # architecture: as returned by fmuInspection.getArchitecture
+    if architecture == "unknown":
+        oPrintToLogLogger.error("The fmu has neither a 32 nor a 64 bit folder")
+        sys.exit(-2)
+    return architecture == "64"
+
+def find_user_config_member(fmu_members, architecture=None):
+    if architecture is None:
+        architecture = getArchitecture(fmu_members)
+    architecture = "64" if determine_architecture_(architecture) else "32"
+    user_config_default_file = "/".join(["binaries", "win" + architecture, "userConfig.cfg"])
+    for member in fmu_members:
+        if member.replace("\\", "/").lower() == user_config_default_file.lower():
+            return member
+    raise FileNotFoundError("The fmu has no member " + user_config_default_file)
+
+def patch_user_config_string(config_bytes, user_config):
+    # same text mode (encoding and newline) handling as reading/writing the extracted file
+    with io.TextIOWrapper(io.BytesIO(config_bytes)) as fobj:
+        config_content = fobj.read()
+    config_re = "userConfigDefault=(.*)\n"
+    match_config = re.match(config_re, config_content)
+    if not match_config:
+        raise ValueError("userConfig.cfg of the fmu does not start with a userConfigDefault= line")
+    print("user_config: ", user_config)
+    config_content_patched = config_content.replace(match_config.group(1),  user_config )
+    patched_bytes = io.BytesIO()
+    fobj = io.TextIOWrapper(patched_bytes)
+    fobj.write(config_content_patched)
+    fobj.flush()
+    config_bytes_patched = patched_bytes.getvalue()
+    fobj.close()
+    return config_bytes_patched
+
+def copy_member(zip_in, zip_out, zinfo):
+    # copy a member with the public zipfile API, the data is compressed again with the same method
+    zinfo_out = zipfile.ZipInfo(zinfo.filename, zinfo.date_time)
+    zinfo_out.compress_type = zinfo.compress_type
+    zinfo_out.external_attr = zinfo.external_attr
+    zinfo_out.comment = zinfo.comment
+    zinfo_out.file_size = zinfo.file_size
+    if zinfo.is_dir():
+        zip_out.writestr(zinfo_out, b"")
+        return
+    with zip_in.open(zinfo) as member_in, zip_out.open(zinfo_out, "w", force_zip64=zinfo.file_size > zipfile.ZIP64_LIMIT) as member_out:
+        shutil.copyfileobj(member_in, member_out, 1024 * 1024)
+
+@traced(dAttributeArgs={"fmu": "fmu_name"})
+def patchFmuUserConfig(fmu_path, fmu_name, user_config):
     content_path_fmu = os.path.join(fmu_path,fmu_name)
     master_path_fmu  = os.path.abspath(fmu_name)
-    shutil.copy2(content_path_fmu, master_path_fmu)                
-
-def call_7z(fmu_name):
-    store_cwd = os.getcwd()
-
-    fmu_extract = fmu_name.replace(".fmu", "")
-    cmd = "\"%SILVER_HOME%\\common\\ext-tools\\mingw\\bin\\7z.exe\" x -aoa -o\"" + fmu_extract + "\" \"" + fmu_name + "\" 2>&1"
-    print(cmd)
-    if os.path.isfile(fmu_name):
-        subprocess.check_output(cmd, shell=True)
-        os.remove(fmu_name)
-
-
-def patch_user_config_string(fmu_name, user_config):
-    fmu_extract = fmu_name.replace(".fmu", "")
-    architecture = "64" if determine_architecture_(fmu_extract) else "32"
-    user_config_default_file = "/".join([fmu_extract, "binaries", "win" + architecture, "userConfig.cfg"])
-    config_content_patched = ""
-    with open(user_config_default_file, "r") as fobj:
-        config_content = fobj.read()        
-        config_re = "userConfigDefault=(.*)\n"
-        match_config = re.match(config_re, config_content)
-        if match_config:
-            print("user_config: ", user_config)
-            config_content_patched = config_content.replace(match_config.group(1),  user_config )
-    with open(user_config_default_file, "w") as fobj:
-        fobj.write(config_content_patched)
-
-def zip_fmu_again(fmu_name):
-    # os.delete()
-    store_cwd = os.getcwd()
-    newd      = fmu_name.replace(".fmu", "")    
-    os.chdir(newd)
-    cmd = "\"%SILVER_HOME%\\common\\ext-tools\\mingw\\bin\\7z.exe\" a -r " + fmu_name.replace(".fmu", "") 
-    subprocess.check_output(cmd, shell=True)        
-    os.chdir(store_cwd)
-    shutil.move(os.path.join(newd, fmu_name.replace("fmu", "7z")), fmu_name)
-    shutil.rmtree(fmu_name.replace(".fmu", ""))
-
-    
-def patchFmuUserConfig(fmu_path, fmu_name, user_config):
-    copy_from_content_to_master(fmu_path, fmu_name)
-    call_7z(fmu_name)
-    patch_user_config_string(fmu_name, user_config)
-    zip_fmu_again(fmu_name)
-
-
-
-
-
-
-   
-   
\ No newline at end of file
+    master_path_tmp  = master_path_fmu + ".tmp"
+    try:
+        with zipfile.ZipFile(content_path_fmu, "r") as zip_in, zipfile.ZipFile(master_path_tmp, "w") as zip_out:
+            fmu_info = getFmuInfo(content_path_fmu)
+            user_config_member = find_user_config_member(fmu_info["members"], fmu_info["architecture"])
+            for zinfo in zip_in.infolist():
+                if zinfo.filename == user_config_member:
+                    zinfo_out = zipfile.ZipInfo(zinfo.filename, zinfo.date_time)
+                    zinfo_out.compress_type = zinfo.compress_type
+                    zinfo_out.external_attr = zinfo.external_attr
+                    zip_out.writestr(zinfo_out, patch_user_config_string(zip_in.read(zinfo), user_config))
+                else:
+                    copy_member(zip_in, zip_out, zinfo)
+        os.replace(master_path_tmp, master_path_fmu)
+    finally:
+        if os.path.isfile(master_path_tmp):
+            os.remove(master_path_tmp)
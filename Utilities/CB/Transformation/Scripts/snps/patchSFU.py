@@ -1,36 +1,174 @@
 import logging
 from string import Template
 import os
+import re
+import threading
+from utilsFunctions.buildCache import getBuildCache, getFingerprint
+from utilsFunctions.tracing import traced
 
 oDispFileLogLogger = logging.getLogger("disp_file_log")
 
+# Compiled templates are split into literal text and placeholder keys once and
+# rendered by a single join. Placeholders are compiled with private use
+# characters standing in for the substituted values, so the result is the same
+# as the two consecutive safe_substitute calls (including "$$" escapes).
+sClusterPattern = "<remote-module-cluster>_</remote-module-cluster"
+sParamsIniKey = "paramsIniConfigPath"
+sClusterKey = "remote-module-cluster"
+nSentinelBase = 0xE000
+reSentinel = re.compile("([\ue000-\ue0ff])")
+reWordValue = re.compile(r"(?a)\w*\Z")
+# "$" followed by identifier/brace characters running into a substituted value
+reAmbiguousDollar = re.compile(r"(?a)\$[\w{]*[\ue000-\ue0ff]")
+
+dTemplateText = {}
+dTemplateFingerprints = {}
+dCompiledTemplates = {}
+oTemplateLock = threading.Lock()
+
+
+def readTemplate(sTemplateFile):
+    """
+    Return the text of a template file, read once per path and modification time.
+    """
+    tKey = (sTemplateFile, os.path.getmtime(sTemplateFile))
+    sText = dTemplateText.get(tKey)
+    if sText is None:
+        with open(sTemplateFile, 'r') as f:
+            sText = f.read()
+        with oTemplateLock:
+            for tOldKey in [tOld for tOld in dTemplateText if tOld[0] == sTemplateFile]:
+                del dTemplateText[tOldKey]
+            dTemplateText[tKey] = sText
+    return tKey, sText
+
+
+def getTemplateFingerprint(sTemplateFile):
+    """
+    Return the fingerprint of a template file, computed once per path and modification time.
+    """
+    tKey, sText = readTemplate(sTemplateFile)
+    sFingerprint = dTemplateFingerprints.get(tKey)
+    if sFingerprint is None:
+        sFingerprint = dTemplateFingerprints[tKey] = getFingerprint(sText)
+    return sFingerprint
+
+
+def _straddlesCluster(lParts):
+    # the cluster tag must not be built from literal text and a substituted value
+    for i in range(0, len(lParts) - 1, 2):
+        sLiteral = lParts[i]
+        for k in range(1, len(sClusterPattern)):
+            if sLiteral.endswith(sClusterPattern[:k]):
+                return True
+    return False
+
+
+def compileTemplate(sText, lKeys, bSilFile, bSilverDll):
+    """
+    Split a template into literal and placeholder parts.
+
+    Parameters:
+        sText(string):      Template text.
+        lKeys(list):        Keys of the configuration parameters.
+        bSilFile(bool):     True for the SIL template (substitutes paramsIniConfigPath).
+        bSilverDll(bool):   True if the remote-module-cluster tag is patched.
+
+    Example:
+        lParts = compileTemplate(sText, ["_DIVeContext"], True, False)
+
+    Return:
+        List with literal text at even and keys at odd positions, or None if the
+        template cannot be compiled and has to be rendered with string.Template.
+    """
+    if reSentinel.search(sText):
+        return None
+    lAllKeys = list(lKeys) + [sParamsIniKey, sClusterKey]
+    dSentinel = {sKey: chr(nSentinelBase + i) for i, sKey in enumerate(lAllKeys)}
+    sCompiled = Template(sText).safe_substitute({sKey: dSentinel[sKey] for sKey in lKeys})
+    if bSilFile:
+        if reAmbiguousDollar.search(sCompiled):
+            return None
+        sCompiled = Template(sCompiled).safe_substitute({sParamsIniKey: dSentinel[sParamsIniKey]})
+        if bSilverDll:
+            sCompiled = sCompiled.replace(sClusterPattern, dSentinel[sClusterKey])
+    lParts = reSentinel.split(sCompiled)
+    for i in range(1, len(lParts), 2):
+        lParts[i] = lAllKeys[ord(lParts[i]) - nSentinelBase]
+    if bSilverDll and _straddlesCluster(lParts):
+        return None
+    return lParts
+
+
+def getCompiledTemplate(sTemplateFile, lKeys, bSilFile, bSilverDll):
+    tTextKey, sText = readTemplate(sTemplateFile)
+    tKey = (tTextKey, tuple(sorted(lKeys)), bSilFile, bSilverDll)
+    if tKey not in dCompiledTemplates:
+        lParts = compileTemplate(sText, lKeys, bSilFile, bSilverDll)
+        with oTemplateLock:
+            for tOldKey in [tOld for tOld in dCompiledTemplates if tOld[0][0] == sTemplateFile and tOld[0] != tTextKey]:
+                del dCompiledTemplates[tOldKey]
+            dCompiledTemplates[tKey] = lParts
+    return sText, dCompiledTemplates[tKey]
+
+
+def renderTemplate(lParts, dValues):
+    lOut = lParts[:]
+    for i in range(1, len(lOut), 2):
+        lOut[i] = dValues[lOut[i]]
+    return "".join(lOut)
+
+
+@traced(dAttributeArgs={"species": "dive_species", "sfu": "sfu_name"})
 def patchSFU(dive_species, conf_pars, template_silfile, template_inifile, sfu_path, sfu_name):
     oDispFileLogLogger.debug("\t\tExecuting patchSFU.py")
     oDispFileLogLogger.debug("\t\t\tMethod patchSFU() executed")
-    f = open(template_silfile, 'r')
-    silfile = f.read();
-    f.close();
-    
-    if (template_inifile != ""):
-        f = open(template_inifile, 'r')
-        inifile = f.read();
-        f.close();
-    
     for key in conf_pars.keys():
         conf_pars[key] = (dive_species + key)
-        
-    silfile = Template(silfile).safe_substitute(conf_pars) # replace keys by values
-    silfile = Template(silfile).safe_substitute({"paramsIniConfigPath" : ("..\\SFUs\\configParams\\" + sfu_name + ".ini")}) # replace keys by values
+    bSilverDll = "silverdll" in template_silfile.lower()
+
+    # the SFU is determined by the templates, the species, the parameter keys and its name
+    sSilFile = sfu_path + "\\" + sfu_name + ".sil"
+    sIniFile = sfu_path + "\\configParams\\" + sfu_name + ".ini"
+    lOutputFiles = [sSilFile, sIniFile] if template_inifile != "" else [sSilFile]
+    oBuildCache = getBuildCache(os.path.dirname(os.path.abspath(sfu_path)))
+    if oBuildCache is not None:
+        sFingerprint = getFingerprint(getTemplateFingerprint(template_silfile),
+                                      getTemplateFingerprint(template_inifile) if template_inifile != "" else "",
+                                      dive_species, sorted(conf_pars), sfu_name)
+        if oBuildCache.isUpToDate("patchSFU", lOutputFiles, sFingerprint):
+            oDispFileLogLogger.debug("\t\t\t" + sfu_name + " is up to date")
+            return
+
+    dValues = dict(conf_pars)
+    dValues[sParamsIniKey] = "..\\SFUs\\configParams\\" + sfu_name + ".ini"
+    dValues[sClusterKey] = "<remote-module-cluster>{cluster}</remote-module-cluster".format(cluster=dive_species + "_CLUSTER")
+    bWordValues = all(reWordValue.match(sValue) for sValue in conf_pars.values()) and "<" not in dValues[sParamsIniKey]
+
+    sTemplate, lParts = getCompiledTemplate(template_silfile, conf_pars.keys(), True, bSilverDll)
+    if lParts is not None and bWordValues:
+        silfile = renderTemplate(lParts, dValues)
+    else:
+        silfile = Template(sTemplate).safe_substitute(conf_pars) # replace keys by values
+        silfile = Template(silfile).safe_substitute({sParamsIniKey : dValues[sParamsIniKey]}) # replace keys by values
+        if bSilverDll:
+            silfile = silfile.replace(sClusterPattern, dValues[sClusterKey])
+
     if (template_inifile != ""):
-        inifile = Template(inifile).safe_substitute(conf_pars) # replace keys by values
-    if "silverdll" in template_silfile.lower():
-        silfile = silfile.replace("<remote-module-cluster>_</remote-module-cluster", "<remote-module-cluster>{cluster}</remote-module-cluster".format(cluster=dive_species + "_CLUSTER"))
-    f = open((sfu_path + "\\" + sfu_name + ".sil"), 'w')
+        sTemplate, lParts = getCompiledTemplate(template_inifile, conf_pars.keys(), False, False)
+        if lParts is not None:
+            inifile = renderTemplate(lParts, dValues)
+        else:
+            inifile = Template(sTemplate).safe_substitute(conf_pars) # replace keys by values
+
+    f = open(sSilFile, 'w')
     f.write(silfile);
     f.close();
-    
+
     if (template_inifile != ""):
-        f = open((sfu_path + "\\configParams\\" + sfu_name + ".ini"), 'w')
+        f = open(sIniFile, 'w')
         f.write(inifile);
         f.close();
-        
\ No newline at end of file
+
+    if oBuildCache is not None:
+        oBuildCache.update(lOutputFiles, sFingerprint)
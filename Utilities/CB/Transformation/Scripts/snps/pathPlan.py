@@ -0,0 +1,203 @@
+"""
+Path plan of a transformation.
+
+All input and output paths of generate_ini (planGenerateIni) and the SFU files
+of the SFU generation (planSfuCreation) are derived from the configuration
+before any file is written. The plan is validated as a batch: path length,
+existence of the inputs and writability of the outputs. All problems are
+reported together, so an invalid configuration is rejected before any partial
+output is written.
+
+The island transformation and the posthooks are not planned: the Content files
+of the island are only known from the SFUs after their placeholders are resolved
+and the posthook scripts and their outputs from the support xmls read by the
+posthook stage. Both stages check their paths when they use them.
+
+"""
+
+import logging
+import os
+import sys
+from collections import namedtuple
+
+from snps import islandTransformation
+from supportFcn.checkFileLength import nAllowedFilePathLength
+from transformation_constants import sTerminationErrorMessage
+
+oDispFileLogLogger = logging.getLogger("disp_file_log")
+oPrintToLogLogger = logging.getLogger("print_to_log")
+
+INPUT_FILE  = "input file"
+INPUT_DIR   = "input folder"
+OUTPUT_FILE = "output file"
+OUTPUT_DIR  = "output folder"
+
+# Path of the plan, required: a missing input stops the transformation (otherwise it is only reported)
+PlannedPath = namedtuple("PlannedPath", ["path", "kind", "purpose", "required"])
+
+
+def getSfuIniFileName(context_name, species_name, family_name, type_name, model_var, model_set):
+    return "SFU_"+context_name.upper()+"_"+species_name.upper()+"_"+family_name.upper()+"_"+type_name.upper()+"_"+model_var.upper()+"_"+model_set.upper() + ".ini"
+
+
+class PathPlan():
+    """
+    Input and output paths of a transformation, each path is contained once.
+
+    Example:
+        oPlan = PathPlan()
+        oPlan.add(sFinalSilLoc, OUTPUT_DIR, "final SIL folder")
+        lErrors, lWarnings = oPlan.validate()
+    """
+
+    def __init__(self):
+        self.dPaths = {}
+
+    def add(self, sPath, sKind, sPurpose, bRequired=True):
+        if sPath not in self.dPaths:
+            self.dPaths[sPath] = PlannedPath(sPath, sKind, sPurpose, bRequired)
+
+    def getPaths(self, sKind=None):
+        return [oPath for oPath in self.dPaths.values() if sKind is None or oPath.kind == sKind]
+
+    def validate(self):
+        """
+        Check length, existence and writability of all paths.
+
+        Return:
+            Tuple (errors, warnings), both lists of messages. Errors stop the transformation,
+            warnings are missing inputs the transformation continues without.
+        """
+        lErrors = []
+        lWarnings = []
+        dWritable = {}
+        for oPath in self.dPaths.values():
+            sDescription = oPath.purpose + " (" + oPath.kind + ") " + os.path.abspath(oPath.path)
+            if len(oPath.path) > nAllowedFilePathLength:
+                lErrors.append("path has " + str(len(oPath.path)) + " characters, more than " + str(nAllowedFilePathLength)
+                               + " characters are not allowed: " + sDescription)
+            if oPath.kind == INPUT_FILE and not os.path.isfile(oPath.path) or oPath.kind == INPUT_DIR and not os.path.isdir(oPath.path):
+                (lErrors if oPath.required else lWarnings).append("missing " + sDescription)
+            elif oPath.kind == OUTPUT_FILE and os.path.isdir(oPath.path) or oPath.kind == OUTPUT_DIR and os.path.isfile(oPath.path):
+                lErrors.append("existing " + ("folder" if oPath.kind == OUTPUT_FILE else "file") + " in place of " + sDescription)
+            elif oPath.kind in (OUTPUT_FILE, OUTPUT_DIR):
+                sExisting = oPath.path if os.path.exists(oPath.path) else getExistingParent(oPath.path)
+                if sExisting not in dWritable:
+                    dWritable[sExisting] = bool(sExisting) and os.access(sExisting, os.W_OK)
+                if not dWritable[sExisting]:
+                    lErrors.append("no write access to " + (sExisting or "any parent folder") + " for " + sDescription)
+        return lErrors, lWarnings
+
+
+def getExistingParent(sPath):
+    """
+    Return the nearest existing parent folder of a path, "" if there is none.
+    """
+    sParent = os.path.dirname(os.path.abspath(sPath))
+    while not os.path.isdir(sParent):
+        sNext = os.path.dirname(sParent)
+        if sNext == sParent:
+            return ""
+        sParent = sNext
+    return sParent
+
+
+def planGenerateIni(oConfiguration, sPathDiveDbContent, SilFileLoc, sConfigName, sCurDir):
+    """
+    Derive the input and output paths of generate_ini from the configuration xml.
+
+    Parameters:
+        oConfiguration(Configuration): Configuration xml as read by configReader.readConfiguration.
+        sPathDiveDbContent(string): Path of the DIVe Content folder.
+        SilFileLoc(string):         Folder of the SIL of the configuration.
+        sConfigName(string):        Name of the configuration.
+        sCurDir(string):            Transformation script folder (working directory of generate_ini).
+
+    Example:
+        checkPathPlan(planGenerateIni(readConfiguration(configRootElem), sPathDiveDbContent, SilFileLoc, sConfigName, os.getcwd()))
+
+    Return:
+        PathPlan object.
+    """
+    pathSep = "\\"
+    oPlan = PathPlan()
+    oPlan.add(sPathDiveDbContent, INPUT_DIR, "DIVe Content folder")
+    oPlan.add(os.path.realpath(pathSep.join([sCurDir,"..\\..\\..\\..\\SiLs",sConfigName])), OUTPUT_DIR, "SiLs folder of the configuration")
+    sFinalSilLoc = SilFileLoc+"\\Master"
+    sFinalSilIniLoc = SilFileLoc + "\\SFUs\\initParams\\"
+    oPlan.add(sFinalSilLoc, OUTPUT_DIR, "final SIL folder")
+    oPlan.add(sFinalSilIniLoc, OUTPUT_DIR, "SFU parameter folder")
+    oPlan.add(sFinalSilLoc + "\\" + islandTransformation.get_island_content_name(), OUTPUT_DIR, "Content island")
+    for sIniFileName in ("SFU_LOGGING.ini", "SFU_POST.ini", "SFU_SUPPORT.ini"):
+        oPlan.add(sFinalSilIniLoc + sIniFileName, OUTPUT_FILE, "SFU parameter file")
+
+    for module_setup in oConfiguration.moduleSetups:
+        for module in module_setup.modules:
+            context_name = module.get('context')
+            species_name = module.get('species')
+            family_name = module.get('family')
+            type_name = module.get('type')
+            model_var = module.get('variant')
+            model_set = module.get("modelSet")
+            oPlan.add(sFinalSilIniLoc + getSfuIniFileName(context_name,species_name,family_name,type_name,model_var,model_set),
+                      OUTPUT_FILE, "SFU parameter file of " + (module_setup.name or species_name))
+            if model_set in ("silver_dll_w32", "silver_dll_w64"):
+                oPlan.add(pathSep.join([sPathDiveDbContent,context_name,species_name,family_name,type_name,"Module",model_var, model_var + ".xml"]),
+                          INPUT_FILE, "module xml of " + (module_setup.name or species_name), bRequired=False)
+            elif model_set in ("fmu10", "fmu20"):
+                oPlan.add(pathSep.join([sPathDiveDbContent,context_name,species_name,family_name,type_name,"Module",model_var,model_set]),
+                          INPUT_DIR, "FMU folder of " + (module_setup.name or species_name), bRequired=False)
+    return oPlan
+
+
+def planSfuCreation(sSfupath, lSfuNames, oPlan=None):
+    """
+    Add the output paths of the SFU generation to a path plan.
+
+    Parameters:
+        sSfupath(string):           Destination folder of the SFUs.
+        lSfuNames(list):            Names of the SFUs generated for the module setups.
+
+    Keyword Arguments:
+        oPlan(PathPlan):            Plan the paths are added to, None for a new plan.
+
+    Example:
+        checkPathPlan(planSfuCreation(sSfupath, ["SFU_PHYS_TX_F_T_V_SFCN_W64"]))
+
+    Return:
+        PathPlan object.
+    """
+    if oPlan is None:
+        oPlan = PathPlan()
+    oPlan.add(sSfupath, OUTPUT_DIR, "SFU folder")
+    oPlan.add(sSfupath + "\\configParams", OUTPUT_DIR, "SFU configuration parameter folder")
+    for sSfuStr in lSfuNames:
+        oPlan.add(sSfupath + "\\" + sSfuStr.upper() + ".sil", OUTPUT_FILE, "SFU file")
+        oPlan.add(sSfupath + "\\configParams\\" + sSfuStr.upper() + ".ini", OUTPUT_FILE, "SFU configuration parameter file")
+    return oPlan
+
+
+def checkPathPlan(oPlan):
+    """
+    Validate a path plan, report all problems at once and terminate on errors.
+
+    Parameters:
+        oPlan(PathPlan):    Plan to validate.
+
+    Example:
+        checkPathPlan(oPlan)
+
+    Error:
+        If any path is too long, a required input is missing or an output is not
+        writable, all errors are logged and the execution is terminated.
+    """
+    oDispFileLogLogger.debug("\t\tChecking " + str(len(oPlan.dPaths)) + " planned paths")
+    lErrors, lWarnings = oPlan.validate()
+    for sWarning in lWarnings:
+        oPrintToLogLogger.warning("\t" + sWarning)
+    if lErrors:
+        oPrintToLogLogger.error("\t" + str(len(lErrors)) + " invalid path(s) of the transformation:")
+        for sError in lErrors:
+            oPrintToLogLogger.error("\t\t" + sError)
+        oPrintToLogLogger.error("\t" + sTerminationErrorMessage)
+        sys.exit(-2)
@@ -2,7 +2,14 @@ import logging
 import re, glob, copy
 import xml.etree.ElementTree as ET
 import os
+import hashlib, importlib.util, marshal, tempfile, threading
+import ast, builtins, contextlib, io, json, multiprocessing, sys, time, tracemalloc
+from concurrent.futures import ProcessPoolExecutor
 from supportFcn.dispFileLog import dispFileLog, print_to_log
+from utilsFunctions.contentIndex import getContentIndex
+from utilsFunctions.utils import parseXmlFileCached
+from utilsFunctions.tracing import span, traced
+from snps.configReader import readConfiguration
 # necessary inputs:
 # ModuleSetup
 # -> corr. datasets
@@ -10,71 +17,335 @@ from supportFcn.dispFileLog import dispFileLog, print_to_log
 
 oPrintToLogLogger = logging.getLogger("print_to_log")
 
-def posthook(configuration_xml_file, main_sil_name, dInitOrderModels):
-    main_sil_name = os.path.abspath(main_sil_name)
-    posthook_support = {}
-    posthook_info_list = []
-    sfu_list = []
-    module_dict = {}
-    data_dict   = {}
-    global_param_log_path = "Master/globalParam.log"
-    ini_global_params = {}
-    ini_global_params = return_global_params(global_param_log_path)
-    # gather information from config xml and support/data xml's
-    config_xml = ET.parse(configuration_xml_file).getroot()
-    defaultInitOrder = 0
+# compiled posthook scripts: absolute path -> ((mtime, size), code object)
+posthook_code_cache = {}
+posthook_code_cache_lock = threading.Lock()
+posthook_code_stats = {"memory": 0, "disk": 0, "compiled": 0}
 
-    for module_setup in config_xml.findall(".//{*}ModuleSetup"):
-        important_paths = {}
-        # gather important paths into dictionary, see posthook template
-        important_paths["pathRunDir"] = os.path.join(os.getcwd(), "Master")
-        nInitOrder   = module_setup.get("initOrder")
-        if nInitOrder == "":
-            defaultInitOrder += 1
-            nInitOrder = defaultInitOrder
-        module       = module_setup.findall(".//{*}Module")[0]
-        context_name = module.get('context')
-        species_name = module.get('species')
-        family_name  = module.get('family')
-        type_name    = module.get('type')
-        variant_name = module.get('variant')
-        model_set    = module.get('modelSet')
-    
-        family_path = "..\\..\\Content\\" + context_name + "\\" + species_name + "\\" + family_name + "\\"
-        module_xml_folder = family_path + type_name + "\\Module\\" +  variant_name
+def get_posthook_code_cache_dir():
+    # directory of the compiled posthook scripts shared between runs, "" disables the disk cache
+    return os.environ.get('posthookCodeCacheDir', os.path.join(tempfile.gettempdir(), "DIVe_posthook_cache"))
 
-        # add module name to important_paths
-        important_paths["pathModel"] = return_module_path(module_xml_folder, model_set)
-        ####################################
+def load_posthook_code(script_path):
+    # return the code object of a posthook script, compiled once per modification time
+    script_path = os.path.abspath(script_path)
+    script_stat = os.stat(script_path)
+    stamp = (script_stat.st_mtime_ns, script_stat.st_size)
+    cached = posthook_code_cache.get(script_path)
+    if cached is not None and cached[0] == stamp:
+        posthook_code_stats["memory"] += 1
+        return cached[1]
+    header = importlib.util.MAGIC_NUMBER + repr(stamp).encode() + b"\n"
+    cache_dir = get_posthook_code_cache_dir()
+    cache_file = ""
+    code = None
+    if cache_dir:
+        cache_file = os.path.join(cache_dir, hashlib.sha1(script_path.encode()).hexdigest() + ".bin")
+        try:
+            with open(cache_file, "rb") as cache_fobj:
+                data = cache_fobj.read()
+            if data.startswith(header):
+                code = marshal.loads(data[len(header):])
+                posthook_code_stats["disk"] += 1
+        except (OSError, ValueError, EOFError, TypeError):
+            code = None
+    if code is None:
+        with open(script_path, "r") as s_obj:
+            script = s_obj.read()
+        code = compile(script, script_path, "exec")
+        posthook_code_stats["compiled"] += 1
+        if cache_file:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                cache_tmp = cache_file + "." + str(os.getpid()) + ".tmp"
+                with open(cache_tmp, "wb") as cache_fobj:
+                    cache_fobj.write(header + marshal.dumps(code))
+                os.replace(cache_tmp, cache_file)
+            except OSError as e:
+                oPrintToLogLogger.debug("posthook code cache could not be written: " + str(e))
+    with posthook_code_cache_lock:
+        posthook_code_cache[script_path] = (stamp, code)
+    return code
 
-        # get all data sets for each module
-        important_paths["listPathDatasets"] = return_data_set_list(module_setup, family_path, type_name)    
-        ##################################
+@contextlib.contextmanager
+def count_files_written(files):
+    # while entered, add the files the calling thread opens for writing or moves into place to the set files,
+    # open, os.open, os.replace and os.rename are only wrapped for this time, other threads (e.g. the log writer)
+    # are not counted
+    thread = threading.get_ident()
+    original_open, original_os_open, original_replace, original_rename = builtins.open, os.open, os.replace, os.rename
+    def add(path):
+        if threading.get_ident() == thread and isinstance(path, (str, bytes, os.PathLike)):
+            files.add(os.path.abspath(os.fsdecode(path)))
+    def counting_open(file, mode="r", *args, **kwargs):
+        if any(c in mode for c in "wax+"):
+            add(file)
+        return original_open(file, mode, *args, **kwargs)
+    def counting_os_open(path, flags, *args, **kwargs):
+        if flags & (os.O_WRONLY | os.O_RDWR | os.O_APPEND | os.O_CREAT):
+            add(path)
+        return original_os_open(path, flags, *args, **kwargs)
+    def counting_replace(src, dst, *args, **kwargs):
+        add(dst)
+        return original_replace(src, dst, *args, **kwargs)
+    def counting_rename(src, dst, *args, **kwargs):
+        add(dst)
+        return original_rename(src, dst, *args, **kwargs)
+    builtins.open = io.open = counting_open
+    os.open, os.replace, os.rename = counting_os_open, counting_replace, counting_rename
+    try:
+        yield files
+    finally:
+        builtins.open = io.open = original_open
+        os.open, os.replace, os.rename = original_os_open, original_replace, original_rename
+
+def measure_posthook(script_path, function, *args):
+    # run function(*args) and return wall clock time, cpu time, peak memory and files written
+    # peak memory only if tracemalloc is enabled by the environment variable 'posthookTraceMemory' = "1"
+    # (tracing slows down the posthook considerably), otherwise it is None and reported as not traced
+    trace_memory = os.environ.get('posthookTraceMemory', "0") == "1"
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    elif trace_memory:
+        tracemalloc.reset_peak()
+    files_written = set()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        with count_files_written(files_written):
+            function(*args)
+    finally:
+        stats = {"script": script_path,
+                 "wallTime": time.perf_counter() - wall_start,
+                 "cpuTime": time.process_time() - cpu_start,
+                 "peakMemory": tracemalloc.get_traced_memory()[1] if trace_memory else None,
+                 "filesWritten": sorted(files_written)}
+        if started_tracing:
+            tracemalloc.stop()
+    return stats
+
+def report_posthook_stats(posthook_stats, main_sil_name):
+    # summary table in the log and <main sil>_posthookReport.json next to the main SIL
+    if not posthook_stats:
+        return
+    memory_traced = any(stats["peakMemory"] is not None for stats in posthook_stats)
+    oPrintToLogLogger.info("    posthook               wall [s]   cpu [s]   peak memory [MB]   files written")
+    for stats in posthook_stats:
+        peak_memory = "%18.1f" % (stats["peakMemory"] / 1e6) if stats["peakMemory"] is not None else "%18s" % "not traced"
+        oPrintToLogLogger.info("    %-20s %10.2f %9.2f %s %15d" % (os.path.basename(stats["script"])[:20], stats["wallTime"],
+                                                                 stats["cpuTime"], peak_memory, len(stats["filesWritten"])))
+    if not memory_traced:
+        oPrintToLogLogger.info("    peak memory is not traced, set the environment variable posthookTraceMemory=1 to trace it")
+    report_file = os.path.splitext(main_sil_name)[0] + "_posthookReport.json"
+    try:
+        with open(report_file, "w") as report_fobj:
+            json.dump({"mainSil": main_sil_name, "memoryTraced": memory_traced, "posthooks": posthook_stats}, report_fobj, indent=2)
+    except OSError as e:
+        oPrintToLogLogger.warning("posthook report could not be written: " + str(e))
+
+# resources a posthook can declare in the "touches" attribute of its SupportFile or SupportSet
+posthook_resource_names = ("mainSil", "sfu", "runDir", "config")
+
+def get_posthook_resources(pathPosthook, pathSFU, declared):
+    # resources a posthook may modify, declared by the "touches" attribute (names of posthook_resource_names,
+    # comma separated), parallel execution is opt-in: returns None (ordered with all other posthooks)
+    # if nothing, "all" or an unknown name is declared
+    names = set(name.strip() for name in (declared or "").split(",") if name.strip())
+    if not names or not names.issubset(posthook_resource_names):
+        return None
+    resources = {"cwd:" + os.path.normcase(pathPosthook)}
+    for name in names:
+        resources.add("sfu:" + os.path.normcase(pathSFU) if name == "sfu" else name)
+    return resources
+
+def schedule_posthook_levels(jobs_resources):
+    # level of a posthook: one after the last earlier posthook sharing a resource with it,
+    # posthooks of the same level are independent of each other
+    levels = []
+    job_levels = []
+    for i, resources in enumerate(jobs_resources):
+        level = 0
+        for j in range(i):
+            if resources is None or jobs_resources[j] is None or resources & jobs_resources[j]:
+                level = max(level, job_levels[j] + 1)
+        job_levels.append(level)
+        if level == len(levels):
+            levels.append([])
+        levels[level].append(i)
+    return levels
+
+class PosthookLogCollector(logging.Handler):
+    # collects the log messages of a posthook executed in a worker process
+    def __init__(self):
+        logging.Handler.__init__(self, logging.DEBUG)
+        self.messages = []
+    def emit(self, record):
+        self.messages.append((record.levelno, record.getMessage()))
+
+def run_posthook_isolated(pathPosthook, pathPosthookPy, pathMainSil, listPathSFUs, dictModule, etreeCfg):
+    # worker process: execute one posthook, return its log messages, printed output and measurements
+    # etreeCfg is the configuration parsed once by the calling process
+    collector = PosthookLogCollector()
+    stats = None
+    handlers, level, propagate = oPrintToLogLogger.handlers[:], oPrintToLogLogger.level, oPrintToLogLogger.propagate
+    oPrintToLogLogger.handlers = [collector]
+    oPrintToLogLogger.setLevel(logging.DEBUG)
+    oPrintToLogLogger.propagate = False
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            # the script is loaded before measuring, writing the code cache is not part of the posthook
+            script = load_posthook_code(pathPosthookPy)
+            stats = measure_posthook(pathPosthookPy, code_wrapper, pathPosthook, pathPosthookPy, pathMainSil, listPathSFUs, dictModule, etreeCfg, script)
+    except Exception as e:
+        collector.messages.append((logging.ERROR, "in " + pathPosthookPy + ", " + str(e)))
+    finally:
+        oPrintToLogLogger.handlers = handlers
+        oPrintToLogLogger.setLevel(level)
+        oPrintToLogLogger.propagate = propagate
+    return collector.messages, output.getvalue(), stats
+
+def is_main_module_guarded():
+    # worker processes started with "spawn" (default on Windows) import the __main__ module of the
+    # calling script again, its top level code has to be protected by if __name__ == "__main__":
+    if multiprocessing.get_start_method() == "fork":
+        return True
+    main_file = getattr(sys.modules.get("__main__"), "__file__", None)
+    if main_file is None:
+        # interactive session, nothing is imported again
+        return True
+    try:
+        with open(main_file, "r") as main_fobj:
+            main_tree = ast.parse(main_fobj.read(), main_file)
+    except (OSError, SyntaxError, ValueError):
+        return False
+    return any(isinstance(node, ast.If) and isinstance(node.test, ast.Compare) and isinstance(node.test.left, ast.Name)
+               and node.test.left.id == "__name__" and isinstance(node.test.comparators[0], ast.Constant)
+               and node.test.comparators[0].value == "__main__" for node in main_tree.body)
 
+def run_posthooks_parallel(posthook_jobs, config_xml, main_sil_name, sfu_list, max_workers=None):
+    # posthook_jobs: [pathPosthook, script path, ModuleContext, resources] in sequential order,
+    # the contexts are built when the first posthook of their module is submitted
+    # config_xml: parsed configuration, passed to the workers
+    # returns the measurements of the posthooks (see measure_posthook)
+    posthook_stats = []
+    levels = schedule_posthook_levels([job[3] for job in posthook_jobs])
+    oPrintToLogLogger.info("    running " + str(len(posthook_jobs)) + " posthooks in " + str(len(levels)) + " parallel steps")
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for level in levels:
+            futures = [executor.submit(run_posthook_isolated, posthook_jobs[i][0], posthook_jobs[i][1], main_sil_name,
+                                       sfu_list, posthook_jobs[i][2].get_dictModule(), config_xml) for i in level]
+            # results are reported in the sequential order
+            for i, future in zip(level, futures):
+                oPrintToLogLogger.info("    ==========================================")
+                oPrintToLogLogger.info("    executing posthook <" + posthook_jobs[i][1] + ">")
+                try:
+                    messages, output, stats = future.result()
+                except Exception as e:
+                    messages, output, stats = [(logging.ERROR, "in " + posthook_jobs[i][1] + ", " + str(e))], "", None
+                if output:
+                    print(output, end="")
+                for levelno, message in messages:
+                    oPrintToLogLogger.log(levelno, message)
+                if stats is not None:
+                    posthook_stats.append(stats)
+    return posthook_stats
+
+class ReadOnlyDict(dict):
+    # dictionary passed to posthooks, modifications raise a TypeError
+    # copy.copy / copy.deepcopy return plain (modifiable) dictionaries, pickling keeps the type
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("posthook context is read only, modify a copy (copy.deepcopy) instead "
+                        "or set the environment variable posthookContextReadOnly=0")
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = __ior__ = _read_only
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(dict(self), memo)
+
+    def __reduce__(self):
+        return (ReadOnlyDict, (dict(self),))
+
+class ModuleContext():
+    # context of a module passed to its posthooks as dictModule (see posthook template)
+    # keys: pathRunDir, pathModel, listPathDatasets, pathSFU, dictIniParams, dictGlobalIniParams
+    # it is only created for modules with posthooks and built when their first posthook runs (get_dictModule),
+    # relative paths refer to the working directory at creation
+    # the dictionaries are read only (ReadOnlyDict), posthooks that modify dictModule have to modify a copy
+    # (copy.deepcopy(dictModule)); with the environment variable 'posthookContextReadOnly' = "0" they get
+    # modifiable dictionaries with their own copy of the global parameters as before, shared by the posthooks
+    # of the module (in parallel mode changes are not passed on, each posthook gets its own copy)
+    def __init__(self, module_setup, module, base_dir, oContentIndex, global_params):
+        # module_setup: configReader.ModuleSetupRecord, module: attributes of its Module element
+        self.module_setup  = module_setup
+        self.context_name  = module.get('context')
+        self.species_name  = module.get('species')
+        self.family_name   = module.get('family')
+        self.type_name     = module.get('type')
+        self.variant_name  = module.get('variant')
+        self.model_set     = module.get('modelSet')
+        self.base_dir      = base_dir
+        self.oContentIndex = oContentIndex
+        self.family_path   = os.path.join(base_dir, "..\\..\\Content\\" + self.context_name + "\\" + self.species_name + "\\" + self.family_name + "\\")
+        # global parameters are shared by all modules
+        self.global_params = global_params
+        self.read_only     = os.environ.get('posthookContextReadOnly', "1") != "0"
+        self.dict_module   = None
+
+    def get_dictModule(self):
+        # dictionary of all entries, built on the first call (the INI file is read then)
+        if self.dict_module is None:
+            self.dict_module = self.build()
+        return self.dict_module
+
+    def build(self):
+        list_path_datasets = self.get_listPathDatasets()
+        dict_module = dict(pathRunDir=os.path.join(self.base_dir, "Master"),
+                           pathModel=self.get_pathModel(),
+                           listPathDatasets=list_path_datasets,
+                           pathSFU=self.get_pathSFU(list_path_datasets),
+                           dictIniParams=self.get_dictIniParams(list_path_datasets),
+                           dictGlobalIniParams=self.global_params)
+        if not self.read_only:
+            return copy.deepcopy(dict_module)
+        return ReadOnlyDict(dict_module)
+
+    def is_plant_or_human_open(self):
+        return not ((self.context_name != "pltm" and self.context_name != "human") or self.model_set != "open")
+
+    def get_pathModel(self):
+        module_xml_folder = self.family_path + self.type_name + "\\Module\\" +  self.variant_name
+        module_xml = self.oContentIndex.getModuleXml(self.context_name, self.species_name, self.family_name, self.type_name, self.variant_name)
+        return return_module_path(module_xml_folder, self.model_set, module_xml)
+
+    def get_listPathDatasets(self):
+        return return_data_set_list(self.module_setup.dataSets, self.family_path, self.type_name)
+
+    def get_pathSFU(self, list_path_datasets):
         # get sfu name for the current module
-        if (context_name != "pltm" and context_name != "human") or model_set != "open":
-            sfu_name = "SFUs\\SFU_" + context_name + "_" + species_name + "_" + family_name + "_" + type_name + "_" + variant_name + "_" + model_set 
+        if not self.is_plant_or_human_open():
+            sfu_name = "SFUs\\SFU_" + self.context_name + "_" + self.species_name + "_" + self.family_name + "_" + self.type_name + "_" + self.variant_name + "_" + self.model_set 
             sfu_name = sfu_name.upper() + ".sil"
         else:
             sfu_name = ""
-            for dataset_path in important_paths["listPathDatasets"]:                
+            for dataset_path in list_path_datasets:                
                 sfus_found = glob.glob(dataset_path + "\\*.sil")
-                inis_found = glob.glob(dataset_path + "\\*.ini")
                 if len(sfus_found) > 0:
                     sfu_name = os.path.join("SFUs", os.path.split(sfus_found[0])[-1])
                     break
+        return os.path.abspath(os.path.join(self.base_dir, sfu_name))
 
-        important_paths["pathSFU"] = os.path.abspath(sfu_name)
-        #####################################
-
+    def get_dictIniParams(self, list_path_datasets):
         # get ini name for the current module and its parameters
-        important_paths["dictIniParams"] = {}
+        ini_params = {}
         ini_name = ""
-        if (context_name != "pltm" and context_name != "human") or model_set != "open":   
-            ini_name =  context_name + "_" + species_name + "_" + family_name + "_" + type_name + "_" + variant_name + "_" + model_set 
-            ini_name = "SFUs\\initParams\\SFU_" + ini_name.upper() + ".ini"
+        if not self.is_plant_or_human_open():
+            ini_name =  self.context_name + "_" + self.species_name + "_" + self.family_name + "_" + self.type_name + "_" + self.variant_name + "_" + self.model_set 
+            ini_name = os.path.join(self.base_dir, "SFUs\\initParams\\SFU_" + ini_name.upper() + ".ini")
         else:
-            for dataset_path in important_paths["listPathDatasets"]:
+            for dataset_path in list_path_datasets:
                 sfus_found = glob.glob(dataset_path + "\\*.sil")
                 inis_found = glob.glob(dataset_path + "\\*.ini")        
                 if len(sfus_found) == 0 and len(inis_found) == 1:
@@ -89,37 +360,68 @@ def posthook(configuration_xml_file, main_sil_name, dInitOrderModels):
                         key_value[0] = key_value[0].replace(" ", "")
                         key_value[1] = key_value[1].replace("\n", "")
                         key_value[1] = re.sub(r"#.*", "", key_value[1]).rstrip()
-                        important_paths["dictIniParams"][key_value[0]] = key_value[1]
+                        ini_params[key_value[0]] = key_value[1]
         else:
-            important_paths["dictIniParams"][""] = "" 
-        ########################################################
-        
-        # set global parameters from "globalParams.log"
-        important_paths["dictGlobalIniParams"] = copy.deepcopy(ini_global_params)
-        ###############################################
-        
-        init_order = int(module_setup.get("initOrder"))
-        module_dict[init_order] = module
+            ini_params[""] = "" 
+        return ReadOnlyDict(ini_params)
+
+@traced()
+def posthook(configuration_xml_file, main_sil_name, dInitOrderModels, parallel=None, max_workers=None):
+    # parallel: run posthooks in a process pool (default taken from environment variable 'posthookParallel'),
+    # only posthooks declaring the resources they touch (see get_posthook_resources) run concurrently,
+    # posthooks touching the same SFU, the main SIL or other shared resources keep their order
+    if parallel is None:
+        parallel = os.environ.get('posthookParallel', "0") == "1"
+    if parallel and not is_main_module_guarded():
+        oPrintToLogLogger.warning("    posthooks run sequentially, the main script has no if __name__ == \"__main__\": guard")
+        parallel = False
+    main_sil_name = os.path.abspath(main_sil_name)
+    posthook_support = {}
+    posthook_info_list = []
+    sfu_list = []
+    global_param_log_path = "Master/globalParam.log"
+    ini_global_params = {}
+    ini_global_params = ReadOnlyDict(return_global_params(global_param_log_path))
+    # gather information from config xml (streamed, the full tree is only parsed for running posthooks) and support/data xml's
+    config_xml = None
+    oContentIndex = getContentIndex("..\\..\\Content")
+    defaultInitOrder = 0
+
+    for module_setup in readConfiguration(configuration_xml_file).moduleSetups:
+        nInitOrder   = module_setup.attributes.get("initOrder")
+        if nInitOrder == "":
+            defaultInitOrder += 1
+            nInitOrder = defaultInitOrder
+        module       = module_setup.modules[0]
+        context_name = module.get('context')
+        species_name = module.get('species')
+        family_name  = module.get('family')
+        type_name    = module.get('type')
 
+        # context of the module for its posthooks (see posthook template), only created if it has posthooks
+        module_context = None
 
         #iterate through support sets
         posthook_support[nInitOrder] = []
-        for support_set in module_setup.findall(".//{*}SupportSet"): 
+        for support_set in module_setup.supportSets: 
             support_name = support_set.get("name")
             # filter for posthooks in support sets
             if "posthook" in support_name.lower():
+                if module_context is None:
+                    module_context = ModuleContext(module_setup, module, os.getcwd(), oContentIndex, ini_global_params)
                 if support_set.get("level") == "family":
                     path = "..\\..\\Content\\" + context_name + "\\" + species_name + "\\" + family_name + "\\Support\\" + support_name
                 elif support_set.get("level") == "type":
                     path = "..\\..\\Content\\" + context_name + "\\" + species_name + "\\" + family_name + "\\" + type_name + "\\Support\\" + support_name
                 elif support_set.get("level") == "species":
                     path = "..\\..\\Content\\" + context_name + "\\" + species_name + "\\Support\\" + support_name
-                posthook_support[nInitOrder].append([os.path.abspath(path), support_name + ".xml", [],  important_paths])
+                posthook_support[nInitOrder].append([os.path.abspath(path), support_name + ".xml", [],  module_context, {}])
                 path_support_xml = os.path.join(posthook_support[nInitOrder][-1][0], posthook_support[nInitOrder][-1][1]) 
                 # get support script name(s)
-                supportRootElem = ET.parse(path_support_xml).getroot()
+                supportRootElem = parseXmlFileCached(path_support_xml)
                 for  support_file in supportRootElem.findall(".//{*}SupportFile"): 
                     posthook_support[nInitOrder][-1][2].append(support_file.get("name"))
+                    posthook_support[nInitOrder][-1][4][support_file.get("name")] = support_file.get("touches", supportRootElem.get("touches", ""))
                 ############################
             ######################################
         #############################
@@ -143,15 +445,31 @@ def posthook(configuration_xml_file, main_sil_name, dInitOrderModels):
     ##########################################
 
     #iterate through posthook support sets
+    posthook_jobs = []
+    posthook_stats = []
     for info in posthook_info_list:
         #iterate through scripts per support sets
         for script_name in info[2]:
             script_path = os.path.abspath(os.path.join(info[0], script_name))
+            if config_xml is None:
+                config_xml = ET.parse(configuration_xml_file).getroot()
+            if parallel:
+                path_sfu = info[3].get_pathSFU(info[3].get_listPathDatasets())
+                posthook_jobs.append([info[0], script_path, info[3], get_posthook_resources(info[0], path_sfu, info[4][script_name])])
+                continue
             oPrintToLogLogger.info("    ==========================================")
             oPrintToLogLogger.info("    executing posthook <" + script_path + ">")
-            #              1           2             3             4        5         6
-            code_wrapper(info[0], script_path, main_sil_name,  sfu_list, info[3], config_xml)
+            #                                             1           2             3             4        5         6
+            with span("posthook script", script=script_name, supportSet=os.path.basename(info[0])):
+                # the script is loaded before measuring, writing the code cache is not part of the posthook
+                script = load_posthook_code(script_path)
+                posthook_stats.append(measure_posthook(script_path, code_wrapper, info[0], script_path, main_sil_name,  sfu_list, info[3].get_dictModule(), config_xml, script))
+    if posthook_jobs:
+        with span("posthook scripts parallel", scripts=len(posthook_jobs)):
+            posthook_stats = run_posthooks_parallel(posthook_jobs, config_xml, main_sil_name, sfu_list, max_workers)
     oPrintToLogLogger.info("    ==========================================")
+    report_posthook_stats(posthook_stats, main_sil_name)
+    oPrintToLogLogger.debug("    posthook scripts: %(memory)d from memory, %(disk)d from disk cache, %(compiled)d compiled" % posthook_code_stats)
         #########################################
     ######################################
     
@@ -168,10 +486,11 @@ def return_global_params(global_param_log_path):
         pass # for now
     return gather_params
     
-def return_module_path(module_xml_folder, type):
-    module_xml = glob.glob(module_xml_folder + "\\*.xml")[0]
+def return_module_path(module_xml_folder, type, module_xml=None):
+    if module_xml is None:
+        module_xml = glob.glob(module_xml_folder + "\\*.xml")[0]
     try:
-        module_xml_root = ET.parse(module_xml).getroot()
+        module_xml_root = parseXmlFileCached(module_xml)
     except Exception as e:
         oPrintToLogLogger.error("in posthook, can't read module xml as it is trying to reference external resource...")
         return ""
@@ -182,22 +501,20 @@ def return_module_path(module_xml_folder, type):
                     return os.path.abspath(module_xml_folder + "\\" + module_setup.attrib["type"] + "\\" + model_file.attrib["name"])
     return ""
 
-def return_data_set_list(model_setup, family_path, type_name):
+def return_data_set_list(data_sets, family_path, type_name):
+    # data_sets: attributes of the DataSet elements of a ModuleSetup
     data_set_list = []
-    for sub_elem in model_setup:
-        if "DataSet" in sub_elem.tag:                
-            data_set = copy.deepcopy(sub_elem) 
-            if   data_set.attrib["level"] == "family":
-                data_set_list.append(os.path.abspath(family_path + "Data\\" + data_set.attrib["classType"] + "\\" + data_set.attrib["variant"]))
-            elif data_set.attrib["level"] == "type":
-                data_set_list.append(os.path.abspath(family_path + type_name + "\\Data\\" + data_set.attrib["classType"] + "\\" + data_set.attrib["variant"]))                    
+    for data_set in data_sets:
+        if   data_set["level"] == "family":
+            data_set_list.append(os.path.abspath(family_path + "Data\\" + data_set["classType"] + "\\" + data_set["variant"]))
+        elif data_set["level"] == "type":
+            data_set_list.append(os.path.abspath(family_path + type_name + "\\Data\\" + data_set["classType"] + "\\" + data_set["variant"]))
     return data_set_list
 #                      1           2               3             4                 5         6    
-def code_wrapper(pathPosthook, pathPosthookPy, pathMainSil, listPathSFUs, dictModule, etreeCfg):
-    script = ""
-    with open(pathPosthookPy, "r") as s_obj:
-        for line in s_obj.readlines():
-            script = script + line
+def code_wrapper(pathPosthook, pathPosthookPy, pathMainSil, listPathSFUs, dictModule, etreeCfg, script=None):
+    # script: code object of the posthook if already loaded (see load_posthook_code)
+    if script is None:
+        script = load_posthook_code(pathPosthookPy)
     # store current working dir & change wd to posthook support script folder
     current_wd = os.getcwd()    
     os.chdir(pathPosthook)
@@ -1,6 +1,7 @@
 import logging
-import openpyxl
 import re
+from snps.configReader import readConfiguration
+from snps.fmuInspection import getFmuSignals
 
 oPrintToLogLogger = logging.getLogger("print_to_log")
 
@@ -15,14 +16,21 @@ class RangeCheck():
     tab =   "    "
     min_min = "-1E+10"
     max_max = "1E+10"
-    def __init__(self, signal_list, config_xml):
+    signal_name_re = re.compile(r"\w+")
+    def __init__(self, signal_list, config_xml, fmu_files=None):
+        # signal_list: Excel signal list (None if only FMUs are used)
+        # fmu_files: FMUs whose min/max attributes of the modelDescription.xml are checked as well,
+        #            entries of the Excel signal list take precedence
         self.signal_list    = signal_list
         self.config_xml     = config_xml
+        self.fmu_files      = fmu_files if fmu_files else []
         self.signals            = []
         self.signals_project    = []
         try:
             self.parse_signals_from_config_xml()
-            self.parse_signal_list()
+            if self.signal_list:
+                self.parse_signal_list()
+            self.parse_fmu_signals()
             self.create_check_range_python()
         except Exception as e:
             oPrintToLogLogger.warning(self.tab + "Could not create signalRangeCheck.py.")
@@ -36,18 +44,16 @@ class RangeCheck():
         return last_string + spaces
         
     def parse_signals_from_config_xml(self):
-        signal_re = [r".*?<Signal name=\"(\w+)\",.*",
-        r".*?<Constant name=\"(\w+)\"",
-        r".*?<OpenPort name=\"(\w+)\""]
-        with open(self.config_xml, "r") as config_obj:
-            for line in config_obj:
-                for regex in signal_re:
-                    match = re.search(regex, line)
-                    if match:
-                        self.signals_project.append(match.group(1))
-                        break
+        # Signal, Constant and OpenPort declarations of the configuration (shared streaming pass).
+        # Signal declarations are range checked now as well: the former line regex expected a comma
+        # after the signal name and only found Constants and OpenPorts (with name as first attribute).
+        for signal in readConfiguration(self.config_xml).signals:
+            if self.signal_name_re.fullmatch(signal.name):
+                self.signals_project.append(signal.name)
             
     def parse_signal_list(self):
+        # openpyxl is only needed for the Excel signal list, not for range checks of FMUs only
+        import openpyxl
         wb_obj = openpyxl.load_workbook(self.signal_list)
         sheet = wb_obj.active
         nrows = sheet.max_row
@@ -69,6 +75,23 @@ class RangeCheck():
             else:
                 pass # ignoring None-valued cells.
         
+    def parse_fmu_signals(self):
+        signal_names = {signal.name for signal in self.signals}
+        for fmu_file in self.fmu_files:
+            for fmu_signal in getFmuSignals(fmu_file):
+                if fmu_signal.name in signal_names or not (fmu_signal.min or fmu_signal.max):
+                    continue
+                min     = fmu_signal.min if fmu_signal.min else self.min_min
+                max     = fmu_signal.max if fmu_signal.max else self.max_max
+                try:
+                    init = str((float(min) + float(max))*0.5)
+                except ValueError as e:
+                    oPrintToLogLogger.warning(self.tab + "Invalid range of {name} in {fmu}.".format(name=fmu_signal.name, fmu=fmu_file))
+                    oPrintToLogLogger.warning(self.tab + str(e))
+                    continue
+                self.signals.append(Signal(fmu_signal.name, init, min, max))
+                signal_names.add(fmu_signal.name)
+
     def create_check_range_python(self):
         python_lines    = []
         interface_lines = []
@@ -7,6 +7,7 @@ This package contains subfunctions required for generating SFUs.
 4. Function for generating SFU for GT based model
 5. Function for generating SFU for FMU model
 6. Function for generating SFU for Slave model
+7. Function for generating the SFUs of all module setups on a worker pool
 
 @author: nramach
 email-id: nagaraj.ramachandra@daimler.com
@@ -17,16 +18,21 @@ import logging
 import os
 import subprocess
 import sys
-import zipfile
 import re
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from shutil import copy
 from . import patchSFU
-import pdb
+from .fmuInspection import getFmuInfo
+from .configReader import ModuleSetupRecord, getModuleSetupRecord
+from .pathPlan import checkPathPlan, planSfuCreation
+from utilsFunctions.contentIndex import getContentIndex
+from utilsFunctions.tracing import traced
 
 oDispFileLogLogger = logging.getLogger("disp_file_log")
 oPrintToLogLogger = logging.getLogger("print_to_log")
 
+@traced(dAttributeArgs={"context": "context_name", "species": "species_name", "modelSet": "model_set"})
 def createSFUforSFunction(sCurDir,context_name,species_name,family_name,type_name,model_var,model_set,sSfupath,sSfuStr):
     oDispFileLogLogger.debug("\tProcessing {} to create SFU for SFunction".format(species_name))
     oDispFileLogLogger.debug("\tExecuting sfuCreation.py")
@@ -57,6 +63,7 @@ def createSFUforSFunction(sCurDir,context_name,species_name,family_name,type_nam
         nErrorFlag = 1  
     return nErrorFlag
 
+@traced()
 def createSFUforRBU(sSfupath,sCurDir):
     oDispFileLogLogger.debug("\tExecuting sfuCreation.py")
     oDispFileLogLogger.debug("\t\tMethod createSFUforRBU() executed")
@@ -77,6 +84,7 @@ def createSFUforRBU(sSfupath,sCurDir):
         nErrorFlag = 1
     return nErrorFlag
     
+@traced()
 def createSFUforTemplate(sSfupath,sCurDir):
     oDispFileLogLogger.debug("\tExecuting sfuCreation.py")
     oDispFileLogLogger.debug("\t\t\tMethod createSFUforTemplate() executed")
@@ -98,6 +106,7 @@ def createSFUforTemplate(sSfupath,sCurDir):
         nErrorFlag = 1
     return nErrorFlag
 
+@traced(dAttributeArgs={"context": "context_name", "species": "species_name", "modelSet": "model_set"})
 def createSFUforFMUcs(sCurDir,sCbContentPath,model_set,model_var,type_name,family_name,species_name,context_name,sSfupath,sSfuStr):
     oDispFileLogLogger.debug("\tProcessing {} to create SFU for FMU".format(species_name))
     oDispFileLogLogger.debug("\t\tExecuting sfuCreation.py")
@@ -116,16 +125,11 @@ def createSFUforFMUcs(sCurDir,sCbContentPath,model_set,model_var,type_name,famil
         
         # check FMU for available model sets by looking into package
         sFmuPath = pathSep.join([sCbContentPath,context_name,species_name,family_name,type_name,"Module",model_var,model_set])
-        for (sDirPath,sDirName,sFileNames) in os.walk(sFmuPath):
-            for eachFile in sFileNames:
-                if eachFile.endswith("fmu"):
-                    sFmuFileName = pathSep.join([sFmuPath,eachFile])
-        fmu_filelist = zipfile.ZipFile(sFmuFileName, 'r').namelist()
-        for fmu_file in fmu_filelist:
-            if ("binaries/win32" in fmu_file):
-                bFmuType32 = 1
-            if ("binaries/win64" in fmu_file):
-                bFmuType64 = 1
+        sFmuFileName = pathSep.join([sFmuPath,getContentIndex(sCbContentPath).getMainModelFile(context_name,species_name,family_name,type_name,model_var,model_set,["fmu"])])
+        dFmuInfo = getFmuInfo(sFmuFileName)
+        fmu_filelist = dFmuInfo["members"]
+        bFmuType32 = int(dFmuInfo["win32"])
+        bFmuType64 = int(dFmuInfo["win64"])
         if bFmuType64 == 1:
             patchSFU.patchSFU(species_name.upper(), conf_pars, (sCurDir+r"\templates\template_SFUs\template_SFU_FMU20CS_64Bit.sil"), (sCurDir+r"\templates\template_SFUs\template_configParams\template_SFU_FMU20CS_64Bit_configParams.ini"), sSfupath, sSfuStr.upper())
         else:
@@ -141,6 +145,7 @@ def createSFUforFMUcs(sCurDir,sCbContentPath,model_set,model_var,type_name,famil
         nErrorCheck = 1         
     return nErrorCheck
 
+@traced(dAttributeArgs={"context": "context_name", "species": "species_name", "modelSet": "model_set"})
 def createSFUforFMU(sCurDir,sCbContentPath,model_set,model_var,type_name,family_name,species_name,context_name,sSfupath,sSfuStr):
     oDispFileLogLogger.debug("\tProcessing {} to create SFU for FMU".format(species_name))
     oDispFileLogLogger.debug("\t\tExecuting sfuCreation.py")
@@ -158,16 +163,11 @@ def createSFUforFMU(sCurDir,sCbContentPath,model_set,model_var,type_name,family_
         oPrintToLogLogger.info("\tGenerating SFU for "+ pathSep.join([context_name,species_name,family_name,type_name,"Module",model_var,model_set]))
         # check FMU for available model sets by looking into package
         sFmuPath = pathSep.join([sCbContentPath,context_name,species_name,family_name,type_name,"Module",model_var,model_set])
-        for (sDirPath,sDirName,sFileNames) in os.walk(sFmuPath):
-            for eachFile in sFileNames:
-                if eachFile.endswith("fmu"):
-                    sFmuFileName = pathSep.join([sFmuPath,eachFile])
-        fmu_filelist = zipfile.ZipFile(sFmuFileName, 'r').namelist()
-        for fmu_file in fmu_filelist:
-            if ("binaries/win32" in fmu_file):
-                bFmuType32 = 1
-            if ("binaries/win64" in fmu_file):
-                bFmuType64 = 1
+        sFmuFileName = pathSep.join([sFmuPath,getContentIndex(sCbContentPath).getMainModelFile(context_name,species_name,family_name,type_name,model_var,model_set,["fmu"])])
+        dFmuInfo = getFmuInfo(sFmuFileName)
+        fmu_filelist = dFmuInfo["members"]
+        bFmuType32 = int(dFmuInfo["win32"])
+        bFmuType64 = int(dFmuInfo["win64"])
         if bFmuType64 == 1:
             patchSFU.patchSFU(species_name.upper(), conf_pars, (sCurDir+r"\templates\template_SFUs\template_SFU_FMU20_64Bit.sil"), (sCurDir+r"\templates\template_SFUs\template_configParams\template_SFU_FMU20_64Bit_configParams.ini"), sSfupath, sSfuStr.upper())
         else:
@@ -183,6 +183,7 @@ def createSFUforFMU(sCurDir,sCbContentPath,model_set,model_var,type_name,family_
         nErrorCheck = 1         
     return nErrorCheck
     
+@traced(dAttributeArgs={"context": "context_name", "species": "species_name", "modelSet": "model_set"})
 def createSFUforGT(sCurDir,model_set,model_var,type_name,family_name,species_name,context_name,sSfupath,sSfuStr):
     oDispFileLogLogger.debug("\tProcessing {} to create SFU for GT".format(species_name))
     oDispFileLogLogger.debug("\t\tExecuting sfuCreation.py")
@@ -319,6 +320,7 @@ def createSfuForSlaveModels(sExecutionTool,sCurDir,sSfupath):
         nErrorCheck = 1
     return nErrorCheck
         
+@traced(dAttributeArgs={"context": "context_name", "species": "species_name", "modelSet": "model_set"})
 def createSFUforOpenSilver(sCurDir,model_set,model_var,type_name,family_name,species_name,context_name,sSfupath,sSfuStr):
     oDispFileLogLogger.debug("\tProcessing {} to create SFU for OpenSilver".format(species_name))
     oDispFileLogLogger.debug("\tExecuting sfuCreation.py")
@@ -347,4 +349,188 @@ def createSFUforOpenSilver(sCurDir,model_set,model_var,type_name,family_name,spe
     if not os.path.isfile(sSfupath+"\\"+sSfuStr.upper()+".sil"):
         oPrintToLogLogger.error("\tSFU generation failed for Open-Silver models because of some unexpected exceptions.")
         nErrorFlag = 1  
-    return nErrorFlag
\ No newline at end of file
+    return nErrorFlag
+
+def getSfuName(context_name,species_name,family_name,type_name,model_var,model_set):
+    return ("SFU_"+context_name+"_"+species_name+"_"+family_name+"_"+type_name+"_"+model_var+"_"+model_set).upper()
+
+# kind of model of a Module, decides its SFU (getSfuCreationJob) and its INI entries (generateIni.generate_ini)
+MODEL_OPEN          = "open"
+MODEL_SILVER_DLL    = "silverDll"
+MODEL_FMU           = "fmu"
+MODEL_FMU_CS        = "fmuCs"
+MODEL_GT            = "gt"
+MODEL_SFCN          = "sfcn"
+
+def getModelKind(module):
+    """
+    Return the kind of model (MODEL_*) of a Module, given as dictionary of its attributes.
+    Model sets that are neither open, Silver DLL nor FMU are s-functions, GT-SUITE engines included.
+    """
+    model_set = module.get('modelSet')
+    if model_set == "open":
+        return MODEL_OPEN
+    if model_set in ("silver_dll_w32", "silver_dll_w64"):
+        return MODEL_SILVER_DLL
+    if model_set in ("fmu10", "fmu20"):
+        return MODEL_FMU if (module.get('context') == "ctrl" and module.get('family') == "sil") else MODEL_FMU_CS
+    if module.get('species') == 'eng' and module.get('family') == 'detail' and module.get('type') == 'gtfrm':
+        return MODEL_GT
+    return MODEL_SFCN
+
+def isSfcnHandledAsOpen(module, sModelname, dSfcnModelandStatus):
+    """
+    Return True if the s-function of a Module is handled as open model (dSfcnModelandStatus: ModuleSetup name -> status).
+    """
+    return "sfcn" in module.get('modelSet') and bool((dSfcnModelandStatus or {}).get(sModelname))
+
+def getSfuCreationJob(module_setup,sCurDir,sCbContentPath,sSfupath,dSfcnModelandStatus=None):
+    """
+    Determine the SFU creation function and its arguments for one module setup.
+
+    Parameters:
+        module_setup(ModuleSetupRecord): ModuleSetup as read by configReader.readConfiguration
+                                        (a ModuleSetup element is accepted as well).
+        sCurDir(string):                Directory containing the templates folder.
+        sCbContentPath(string):         Path of the DIVe Content folder.
+        sSfupath(string):               Destination folder of the SFUs.
+
+    Keyword Arguments:
+        dSfcnModelandStatus(dict):      ModuleSetup name -> True if the s-function is handled as open.
+
+    Example:
+        oJob = getSfuCreationJob(module_setup, sCurDir, sCbContentPath, sSfupath)
+
+    Return:
+        Tuple (SFU name, function, argument tuple) or None if the module set needs no module SFU.
+    """
+    if not isinstance(module_setup, ModuleSetupRecord):
+        module_setup = getModuleSetupRecord(module_setup)
+    module = module_setup.modules[0]
+    context_name = module.get('context')
+    species_name = module.get('species')
+    family_name = module.get('family')
+    type_name = module.get('type')
+    model_var = module.get('variant')
+    model_set = module.get('modelSet')
+    sSfuStr = getSfuName(context_name,species_name,family_name,type_name,model_var,model_set)
+
+    model_kind = getModelKind(module)
+    if model_kind == MODEL_OPEN or isSfcnHandledAsOpen(module, module_setup.name, dSfcnModelandStatus):
+        return None
+    if model_kind == MODEL_SFCN:
+        tArgs = (sCurDir,context_name,species_name,family_name,type_name,model_var,model_set,sSfupath,sSfuStr)
+    elif model_kind in (MODEL_FMU, MODEL_FMU_CS):
+        tArgs = (sCurDir,sCbContentPath,model_set,model_var,type_name,family_name,species_name,context_name,sSfupath,sSfuStr)
+    else:
+        tArgs = (sCurDir,model_set,model_var,type_name,family_name,species_name,context_name,sSfupath,sSfuStr)
+    return (sSfuStr, dSfuCreationFunctions[model_kind], tArgs)
+
+# SFU creation function of every kind of model, open models have no module SFU
+dSfuCreationFunctions = {
+    MODEL_SILVER_DLL:   createSFUforOpenSilver,
+    MODEL_FMU:          createSFUforFMU,
+    MODEL_FMU_CS:       createSFUforFMUcs,
+    MODEL_GT:           createSFUforGT,
+    MODEL_SFCN:         createSFUforSFunction,
+}
+
+def _runSfuCreationJob(fcnCreate, tArgs):
+    try:
+        return fcnCreate(*tArgs)
+    except Exception as e:
+        oPrintToLogLogger.error("\tSFU generation failed for " + tArgs[-1])
+        oPrintToLogLogger.error(traceback.format_exc(limit=1))
+        return 1
+
+def submitSFUsForModuleSetups(oExecutor,sCurDir,sCbContentPath,lModuleSetups,sSfupath,dSfcnModelandStatus=None):
+    """
+    Submit the SFU generation of all given module setups to an executor without waiting for it.
+
+    Parameters:
+        oExecutor(Executor):            Executor running the SFU generation, e.g. a ThreadPoolExecutor.
+        sCurDir(string):                Directory containing the templates folder.
+        sCbContentPath(string):         Path of the DIVe Content folder.
+        lModuleSetups(list):            ModuleSetupRecords of the configuration (configReader.readConfiguration),
+                                        ModuleSetup elements are accepted as well.
+        sSfupath(string):               Destination folder of the SFUs.
+
+    Keyword Arguments:
+        dSfcnModelandStatus(dict):      ModuleSetup name -> True if the s-function is handled as open.
+
+    Example:
+        with ThreadPoolExecutor() as oExecutor:
+            dSfuOfModule, dFutures = submitSFUsForModuleSetups(oExecutor, sCurDir, sCbContentPath, lModuleSetups, sSfupath)
+            ...  # other stages not depending on the SFUs
+            islandTransformation.islandTransformation(sFinalSilLoc, pending_jobs=list(dFutures.values()))
+        dErrorReport = getSfuErrorReport(dSfuOfModule, dFutures)
+
+    Return:
+        Tuple (ModuleSetup name -> SFU name, SFU name -> future of its nErrorFlag).
+        Module setups that resolve to the same SFU share one job.
+
+    Error:
+        If an SFU path is too long or not writable, all invalid paths are logged and the
+        execution is terminated before any job is submitted (see pathPlan.checkPathPlan).
+    """
+    dSfuOfModule = {}
+    dJobs = {}
+    for module_setup in lModuleSetups:
+        if not isinstance(module_setup, ModuleSetupRecord):
+            module_setup = getModuleSetupRecord(module_setup)
+        oJob = getSfuCreationJob(module_setup,sCurDir,sCbContentPath,sSfupath,dSfcnModelandStatus)
+        if oJob is None:
+            continue
+        dSfuOfModule[module_setup.name] = oJob[0]
+        dJobs.setdefault(oJob[0], oJob[1:])
+    # all SFU paths are checked before a job is started
+    checkPathPlan(planSfuCreation(sSfupath, list(dJobs)))
+    dFutures = {sSfuStr: oExecutor.submit(_runSfuCreationJob, *tJob) for sSfuStr, tJob in dJobs.items()}
+    return dSfuOfModule, dFutures
+
+def getSfuErrorReport(dSfuOfModule, dFutures):
+    """
+    Wait for submitted SFU generation jobs (see submitSFUsForModuleSetups) and return
+    the dictionary ModuleSetup name -> nErrorFlag of its SFU, in configuration order.
+    """
+    dSfuErrorFlag = {sSfuStr: oFuture.result() for sSfuStr, oFuture in dFutures.items()}
+    dErrorReport = {sModelname: dSfuErrorFlag[sSfuStr] for sModelname, sSfuStr in dSfuOfModule.items()}
+    lFailed = [sModelname for sModelname, nErrorFlag in dErrorReport.items() if nErrorFlag]
+    if lFailed:
+        oPrintToLogLogger.error("\tSFU generation failed for module setups: " + ", ".join(lFailed))
+    return dErrorReport
+
+@traced()
+def createSFUsForModuleSetups(sCurDir,sCbContentPath,lModuleSetups,sSfupath,dSfcnModelandStatus=None,nMaxWorkers=None):
+    """
+    Generate the SFUs of all given module setups on a thread pool.
+
+    Every module SFU is written to its own file, so the output is identical to
+    calling the createSFUfor* functions one after another. Module setups that
+    resolve to the same SFU are generated only once.
+
+    Parameters:
+        sCurDir(string):                Directory containing the templates folder.
+        sCbContentPath(string):         Path of the DIVe Content folder.
+        lModuleSetups(list):            ModuleSetupRecords of the configuration (configReader.readConfiguration),
+                                        ModuleSetup elements are accepted as well.
+        sSfupath(string):               Destination folder of the SFUs.
+
+    Keyword Arguments:
+        dSfcnModelandStatus(dict):      ModuleSetup name -> True if the s-function is handled as open.
+        nMaxWorkers(int):               Number of worker threads, None for the executor default.
+
+    Example:
+        dErrorReport = createSFUsForModuleSetups(sCurDir, sCbContentPath,
+            readConfiguration(sConfigurationXml).moduleSetups, sSfupath)
+        nErrorFlag = int(any(dErrorReport.values()))
+
+    Return:
+        Dictionary ModuleSetup name -> nErrorFlag of its SFU, in configuration order.
+        Module setups without module SFU (e.g. open model sets) are not contained.
+    """
+    oDispFileLogLogger.debug("\tExecuting sfuCreation.py")
+    oDispFileLogLogger.debug("\t\tMethod createSFUsForModuleSetups() executed")
+    with ThreadPoolExecutor(max_workers=nMaxWorkers) as oExecutor:
+        dSfuOfModule, dFutures = submitSFUsForModuleSetups(oExecutor,sCurDir,sCbContentPath,lModuleSetups,sSfupath,dSfcnModelandStatus)
+    return getSfuErrorReport(dSfuOfModule, dFutures)
@@ -1,19 +1,158 @@
+import atexit
 import datetime
+import logging
 import os, sys
 import configparser
+import queue
+import threading
 
 sCbRootPath =  os.path.abspath(__file__).split("Utilities")[0]
 
-def dispFileLog(sMessage="", bModuleInfo=False):
-    bDisp = False
+# seconds between two flushes of the log files
+nFlushInterval = 0.5
+# verbosity of myDIVeCB.ini, read once per process
+dConfigVerbosity = {}
+# log files that could be opened for appending
+setCheckedLogFiles = set()
+
+
+class LogWriter():
+    """
+    Buffered writer of log files.
+
+    Messages are put into a queue and written by one writer thread in batches. The log
+    files are kept open while messages arrive and closed as soon as the writer is idle
+    for nFlushInterval seconds or flushed, so other tools can rotate or delete them. A
+    process forked from the creating one (worker processes) gets a new writer on first use.
+
+    Example:
+        getLogWriter().write("D:\\DIVe\\transformation.log", "\nmessage")
+    """
+
+    def __init__(self):
+        self.nPid = os.getpid()
+        self.oQueue = queue.Queue()
+        self.dFiles = {}
+        self.oThread = threading.Thread(target=self.run, name="LogWriter", daemon=True)
+        self.oThread.start()
+
+    def write(self, sLogFile, sText):
+        self.oQueue.put((sLogFile, sText))
+
+    def flush(self):
+        """
+        Block until all queued messages are written to their files and the files are closed.
+        """
+        oDone = threading.Event()
+        self.oQueue.put((None, oDone))
+        oDone.wait()
+
+    def run(self):
+        while True:
+            try:
+                lBatch = [self.oQueue.get(timeout=nFlushInterval)]
+            except queue.Empty:
+                self.closeFiles()
+                continue
+            while True:
+                try:
+                    lBatch.append(self.oQueue.get_nowait())
+                except queue.Empty:
+                    break
+            dTexts = {}
+            lDone = []
+            for sLogFile, sText in lBatch:
+                if sLogFile is None:
+                    lDone.append(sText)
+                else:
+                    dTexts.setdefault(sLogFile, []).append(sText)
+            for sLogFile, lTexts in dTexts.items():
+                try:
+                    if sLogFile not in self.dFiles:
+                        self.dFiles[sLogFile] = open(sLogFile, 'a')
+                    self.dFiles[sLogFile].write("".join(lTexts))
+                    self.dFiles[sLogFile].flush()
+                except Exception as e:
+                    sys.stderr.write("Error while logging to file {} -> {}\n".format(sLogFile, e))
+            if lDone:
+                self.closeFiles()
+            sys.stdout.flush()
+            for oDone in lDone:
+                oDone.set()
+
+    def closeFiles(self):
+        for sLogFile, oFile in self.dFiles.items():
+            try:
+                oFile.close()
+            except Exception as e:
+                sys.stderr.write("Error while logging to file {} -> {}\n".format(sLogFile, e))
+        self.dFiles = {}
+
+
+oLogWriter = None
+oLogWriterLock = threading.Lock()
+
+
+def getLogWriter():
+    """
+    Return the log writer of the current process, created on first use.
+    """
+    global oLogWriter
+    with oLogWriterLock:
+        if oLogWriter is None or oLogWriter.nPid != os.getpid():
+            oLogWriter = LogWriter()
+        return oLogWriter
+
+
+def resetLogWriterAfterFork():
+    # the writer thread does not exist in a forked child and the lock may have been held by another
+    # thread at fork time, so the child starts with a new lock and creates its own writer
+    global oLogWriter, oLogWriterLock
+    oLogWriterLock = threading.Lock()
+    oLogWriter = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=resetLogWriterAfterFork)
+
+
+def flushLogs():
+    if oLogWriter is not None and oLogWriter.nPid == os.getpid():
+        oLogWriter.flush()
+
+
+atexit.register(flushLogs)
+
+
+def checkLogFile(sLogFile):
+    # errors of opening the log file are reported before any message is queued
+    if sLogFile not in setCheckedLogFiles:
+        try:
+            with open(sLogFile, 'a'):
+                pass
+        except Exception as e:
+            print("Error while logging to file {} -> {}".format(sLogFile, e))
+            sys.exit(-2)
+        setCheckedLogFiles.add(sLogFile)
+
+
+def getVerbosity():
     nFileLog = int(os.getenv('displayLog')) if os.getenv('displayLog') else ""
-    sLogFile = os.environ.get('transformationLogFile', None)
     if not nFileLog:
-        config = configparser.RawConfigParser()
-        config.read(sCbRootPath+r"\\Preferences\\myDIVeCB.ini")
-        nFileLog = config.get("Logs","verbosity", fallback='')
+        if "verbosity" not in dConfigVerbosity:
+            config = configparser.RawConfigParser()
+            config.read(sCbRootPath+r"\\Preferences\\myDIVeCB.ini")
+            dConfigVerbosity["verbosity"] = config.get("Logs","verbosity", fallback='')
+        nFileLog = dConfigVerbosity["verbosity"]
         os.environ['displayLog'] = nFileLog
         nFileLog = int(nFileLog) if nFileLog else nFileLog
+    return nFileLog
+
+
+def dispFileLog(sMessage="", bModuleInfo=False):
+    bDisp = False
+    nFileLog = getVerbosity()
+    sLogFile = os.environ.get('transformationLogFile', None)
     if nFileLog:
         if nFileLog == 2 and bModuleInfo:
             bDisp = True
@@ -21,23 +160,78 @@ def dispFileLog(sMessage="", bModuleInfo=False):
             bDisp = True
     if bDisp:
         print(sMessage)
-        try:
-            with open(sLogFile, 'a') as oFile:
-                oFile.write("\n"+ datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S') +" "+sMessage)
-        except Exception as e:
-            print("Error while logging to file {} -> {}".format(sLogFile, e))
-            sys.exit(-2)
+        checkLogFile(sLogFile)
+        getLogWriter().write(sLogFile, "\n"+ datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S') +" "+sMessage)
 
 
 def print_to_log(sMessage):
     print(sMessage)
-    sys.stdout.flush()
     sConfigName = os.environ.get('configName', None)
     if sConfigName:
         sLogFile = os.environ.get('log_file', None)
+        checkLogFile(sLogFile)
+        getLogWriter().write(sLogFile, "\n"+sMessage)
+
+
+class BufferedLogHandler(logging.Handler):
+    """
+    Logging handler writing through the buffered log writer.
+
+    Parameters:
+        sLogFileEnv(string):    Environment variable holding the path of the log file.
+
+    Keyword Arguments:
+        bTimestamp(bool):       Prefix messages with date and time like dispFileLog.
+        sRequiredEnv(string):   Only log if this environment variable is set (like 'configName' for print_to_log).
+
+    Example:
+        logging.getLogger("print_to_log").addHandler(BufferedLogHandler('log_file', sRequiredEnv='configName'))
+    """
+
+    def __init__(self, sLogFileEnv, bTimestamp=False, sRequiredEnv=None):
+        logging.Handler.__init__(self)
+        self.sLogFileEnv = sLogFileEnv
+        self.bTimestamp = bTimestamp
+        self.sRequiredEnv = sRequiredEnv
+
+    def emit(self, record):
+        if self.sRequiredEnv and not os.environ.get(self.sRequiredEnv, None):
+            return
+        sLogFile = os.environ.get(self.sLogFileEnv, None)
+        if not sLogFile:
+            return
         try:
-            with open(sLogFile, 'a') as oLog:
-                oLog.write("\n"+sMessage)
-        except Exception as e:
-            print("Error while logging to file {} -> {}".format(sLogFile, e))
-            sys.exit(-2)
\ No newline at end of file
+            sMessage = self.format(record)
+            if self.bTimestamp:
+                sMessage = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S') + " " + sMessage
+            getLogWriter().write(sLogFile, "\n" + sMessage)
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        flushLogs()
+
+
+def installBufferedLogHandlers():
+    """
+    Route the "disp_file_log" and "print_to_log" loggers of the transformation modules through the
+    buffered log writer, like the functions dispFileLog and print_to_log.
+
+    The entry point of a transformation calls it once before anything is logged (see runPosthook.py).
+    print_to_log messages are printed and written to the file of the environment variable 'log_file'
+    if 'configName' is set, disp_file_log messages are written with date and time to the file of
+    'transformationLogFile' if a verbosity is configured. Calling it again does not add further handlers.
+
+    Example:
+        installBufferedLogHandlers()
+        logging.getLogger("print_to_log").info("message")
+    """
+    oPrintToLogLogger = logging.getLogger("print_to_log")
+    if not any(isinstance(oHandler, BufferedLogHandler) for oHandler in oPrintToLogLogger.handlers):
+        oPrintToLogLogger.addHandler(logging.StreamHandler(sys.stdout))
+        oPrintToLogLogger.addHandler(BufferedLogHandler('log_file', sRequiredEnv='configName'))
+        oPrintToLogLogger.setLevel(logging.INFO)
+    oDispFileLogLogger = logging.getLogger("disp_file_log")
+    if not any(isinstance(oHandler, BufferedLogHandler) for oHandler in oDispFileLogLogger.handlers) and getVerbosity():
+        oDispFileLogLogger.addHandler(BufferedLogHandler('transformationLogFile', bTimestamp=True))
+        oDispFileLogLogger.setLevel(logging.DEBUG)
@@ -0,0 +1,14 @@
+import os
+import sys
+import types
+
+# the transformation scripts import their packages (snps, utilsFunctions, supportFcn) from the Scripts folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# transformation_constants is provided by the transformation environment, not by the Scripts folder
+try:
+    import transformation_constants
+except ImportError:
+    transformation_constants = types.ModuleType("transformation_constants")
+    transformation_constants.sTerminationErrorMessage = "Transformation terminated."
+    sys.modules["transformation_constants"] = transformation_constants
@@ -0,0 +1,64 @@
+import os
+
+from snps import globalParameters
+from utilsFunctions import buildCache
+
+
+def test_getFingerprint_separates_inputs():
+    assert buildCache.getFingerprint("ab", "c") == buildCache.getFingerprint("ab", "c")
+    assert buildCache.getFingerprint("ab", "c") != buildCache.getFingerprint("a", "bc")
+    assert buildCache.getFingerprint(["a"]) != buildCache.getFingerprint("['a']", "")
+
+
+def test_getFileStats(tmp_path):
+    sFile = str(tmp_path / "module.xml")
+    with open(sFile, "w") as oFile:
+        oFile.write("<Module/>")
+    lStats = buildCache.getFileStats(sFile, str(tmp_path / "missing"))
+    assert lStats[0][0] == sFile and lStats[0][2] == len("<Module/>")
+    assert lStats[1] == [str(tmp_path / "missing"), None, None]
+
+
+def test_buildCache_roundtrip(tmp_path):
+    sCacheFile = str(tmp_path / "buildCache.json")
+    sOutput = str(tmp_path / "SFU_A.ini")
+    oBuildCache = buildCache.BuildCache(sCacheFile)
+    assert not oBuildCache.isUpToDate("generateIni", [sOutput], "fp1")
+    with open(sOutput, "w") as oFile:
+        oFile.write("A=1\n")
+    oBuildCache.update([sOutput], "fp1")
+    oBuildCache.save()
+
+    oBuildCache = buildCache.BuildCache(sCacheFile)
+    assert oBuildCache.isUpToDate("generateIni", [sOutput], "fp1")
+    assert not oBuildCache.isUpToDate("generateIni", [sOutput], "fp2")
+    # an output modified after it was written is regenerated
+    with open(sOutput, "a") as oFile:
+        oFile.write("B=2\n")
+    assert not oBuildCache.isUpToDate("generateIni", [sOutput], "fp1")
+    assert oBuildCache.getStatistics() == {"generateIni": {"hits": 1, "misses": 2}}
+
+
+def test_getBuildCache_is_opt_in(tmp_path, monkeypatch):
+    monkeypatch.delenv("buildCacheFile", raising=False)
+    assert buildCache.getBuildCache(str(tmp_path)) is None
+    monkeypatch.setenv("buildCacheFile", "")
+    assert buildCache.getBuildCache(str(tmp_path)) is None
+    monkeypatch.setenv("buildCacheFile", "buildCache.json")
+    oBuildCache = buildCache.getBuildCache(str(tmp_path))
+    assert oBuildCache.sCacheFile == os.path.abspath(str(tmp_path / "buildCache.json"))
+    assert buildCache.getBuildCache(str(tmp_path)) is oBuildCache
+
+
+def test_forgetOutputs_removes_patched_outputs(tmp_path, monkeypatch):
+    monkeypatch.setenv("buildCacheFile", "buildCache.json")
+    sOutput = str(tmp_path / "SFU_A.ini")
+    with open(sOutput, "w") as oFile:
+        oFile.write("A = 1 # fromGlobal\n")
+    oBuildCache = buildCache.getBuildCache(str(tmp_path))
+    oBuildCache.update([sOutput], "fp1")
+    assert oBuildCache.isUpToDate("generateIni", [sOutput], "fp1")
+    globalParameters.patchGlobalsInIni([[sOutput, "pillow", "A", "1"]])
+    assert not oBuildCache.isUpToDate("generateIni", [sOutput], "fp1")
+    oBuildCache.save()
+    assert not buildCache.BuildCache(oBuildCache.sCacheFile).isUpToDate("generateIni", [sOutput], "fp1")
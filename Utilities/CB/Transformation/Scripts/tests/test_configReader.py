@@ -0,0 +1,99 @@
+import os
+
+import xml.etree.ElementTree as ET
+
+from snps import configReader
+
+sConfigurationXml = """<?xml version="1.0" encoding="UTF-8"?>
+<Configuration xmlns="http://www.daimler.com/DIVeModuleConfiguration" name="cfg" version="1">
+  <ModuleSetups>
+    <ModuleSetup name="mcm" initOrder="1">
+      <Module context="ctrl" species="mcm" family="sil" type="std" variant="v1" modelSet="fmu20"/>
+      <DataSet className="initIO" level="main" variant="std"/>
+      <DataSet className="param" level="main" variant="eu6"/>
+      <SupportSet name="posthook_x" level="main"/>
+      <Interface>
+        <Signal name="in_mcm"/>
+      </Interface>
+    </ModuleSetup>
+    <ModuleSetup name="eng">
+      <Module context="phys" species="eng" family="detail" type="std" variant="v2" modelSet="silver_dll_w64"/>
+    </ModuleSetup>
+  </ModuleSetups>
+  <Interface>
+    <Signals>
+      <Signal name="sig_a"/>
+      <Constant name="const_b" value="1"/>
+      <OpenPort name="open_c"/>
+      <Signal/>
+    </Signals>
+  </Interface>
+  <MasterSolver maxCosimStepsize="0.01" timeEnd="10"/>
+  <MasterSolver maxCosimStepsize="1"/>
+</Configuration>
+"""
+
+
+def writeConfiguration(tmp_path, sContent=sConfigurationXml):
+    sConfigXml = str(tmp_path / "cfg.xml")
+    with open(sConfigXml, "w") as oFile:
+        oFile.write(sContent)
+    return sConfigXml
+
+
+def test_readConfigurationFile_matches_parsed_element(tmp_path):
+    sConfigXml = writeConfiguration(tmp_path)
+    oConfiguration = configReader.readConfigurationFile(sConfigXml)
+    assert oConfiguration == configReader.readConfigurationElement(ET.parse(sConfigXml).getroot())
+
+    assert oConfiguration.attributes == {"name": "cfg", "version": "1"}
+    assert [oModuleSetup.name for oModuleSetup in oConfiguration.moduleSetups] == ["mcm", "eng"]
+    oMcm = oConfiguration.moduleSetups[0]
+    assert oMcm.attributes == {"name": "mcm", "initOrder": "1"}
+    assert oMcm.modules[0]["modelSet"] == "fmu20"
+    assert [dDataSet["className"] for dDataSet in oMcm.dataSets] == ["initIO", "param"]
+    assert oMcm.supportSets == [{"name": "posthook_x", "level": "main"}]
+    # signals of ModuleSetups are included, declarations without name are not
+    assert oConfiguration.signals == [configReader.ConfigSignal("in_mcm", "Signal"),
+                                      configReader.ConfigSignal("sig_a", "Signal"),
+                                      configReader.ConfigSignal("const_b", "Constant"),
+                                      configReader.ConfigSignal("open_c", "OpenPort")]
+    # the first MasterSolver wins
+    assert oConfiguration.masterSolver == {"maxCosimStepsize": "0.01", "timeEnd": "10"}
+
+
+def test_readConfigurationFile_without_namespace_and_master_solver(tmp_path):
+    sConfigXml = writeConfiguration(tmp_path, "<Configuration><ModuleSetup name='a'><Module species='a'/></ModuleSetup></Configuration>")
+    oConfiguration = configReader.readConfigurationFile(sConfigXml)
+    assert oConfiguration == configReader.readConfigurationElement(ET.parse(sConfigXml).getroot())
+    assert oConfiguration.masterSolver is None
+    assert oConfiguration.moduleSetups[0].modules == [{"species": "a"}]
+
+
+def test_readConfiguration_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(configReader, "dConfigurations", configReader.OrderedDict())
+    sConfigXml = writeConfiguration(tmp_path)
+    oConfiguration = configReader.readConfiguration(sConfigXml)
+    assert configReader.readConfiguration(sConfigXml) is oConfiguration
+
+    # a changed file is read again
+    writeConfiguration(tmp_path, sConfigurationXml.replace('name="eng"', 'name="engine"'))
+    os.utime(sConfigXml, (1, 1))
+    oChanged = configReader.readConfiguration(sConfigXml)
+    assert oChanged is not oConfiguration
+    assert oChanged.moduleSetups[1].name == "engine"
+
+    # parsed root elements are not cached
+    oRootElem = ET.parse(sConfigXml).getroot()
+    assert configReader.readConfiguration(oRootElem) == oChanged
+
+
+def test_readConfiguration_cache_size(tmp_path, monkeypatch):
+    monkeypatch.setattr(configReader, "dConfigurations", configReader.OrderedDict())
+    monkeypatch.setattr(configReader, "nConfigCacheSize", 2)
+    lConfigXmls = []
+    for nConfig in range(3):
+        os.mkdir(str(tmp_path / str(nConfig)))
+        lConfigXmls.append(writeConfiguration(tmp_path / str(nConfig)))
+        configReader.readConfiguration(lConfigXmls[-1])
+    assert list(configReader.dConfigurations) == [os.path.abspath(sConfigXml) for sConfigXml in lConfigXmls[1:]]
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+from utilsFunctions import contentIndex
+
+
+def writeFile(sPath):
+    os.makedirs(os.path.dirname(sPath), exist_ok=True)
+    open(sPath, "w").close()
+
+
+@pytest.fixture
+def sContent(tmp_path):
+    sContent = str(tmp_path / "Content")
+    sVariant = os.path.join(sContent, "ctrl", "mcm", "sil", "m04", "Module", "std")
+    writeFile(os.path.join(sVariant, "std.xml"))
+    writeFile(os.path.join(sVariant, "fmu20", "readme.txt"))
+    writeFile(os.path.join(sVariant, "fmu20", "bin", "mcm.fmu"))
+    writeFile(os.path.join(sVariant, "sfcn_w64", "mcm.mexw64"))
+    writeFile(os.path.join(sVariant, "sfcn_w64", "sub", "other.mexw64"))
+    return sContent
+
+
+def test_getMainModelFile(sContent):
+    oContentIndex = contentIndex.ContentIndex(sContent)
+    # files of the model set folder are preferred over files in subfolders
+    assert oContentIndex.getMainModelFile("ctrl", "mcm", "sil", "m04", "std", "sfcn_w64", ["mexw32", "mexw64"]) == "mcm.mexw64"
+    assert oContentIndex.getMainModelFile("ctrl", "mcm", "sil", "m04", "std", "fmu20", ["fmu"]) == os.path.join("bin", "mcm.fmu")
+    assert oContentIndex.getMainModelFile("ctrl", "mcm", "sil", "m04", "std", "fmu10", ["fmu"]) == ""
+    assert oContentIndex.getModuleXml("ctrl", "mcm", "sil", "m04", "std") == os.path.join(
+        sContent, "ctrl", "mcm", "sil", "m04", "Module", "std", "std.xml")
+    assert oContentIndex.getModuleXml("ctrl", "mcm", "sil", "m04", "missing") == ""
+
+
+def test_listDirectory(sContent):
+    oContentIndex = contentIndex.ContentIndex(sContent)
+    sRelDir = os.path.join("ctrl", "mcm", "sil", "m04", "Module", "std", "sfcn_w64")
+    assert oContentIndex.listDirectory(sRelDir) == (["mcm.mexw64"], ["sub"])
+    assert oContentIndex.listDirectory("missing") == ([], [])
+
+
+def test_cache_file_is_reused_while_folders_are_unchanged(tmp_path, sContent):
+    sCacheFile = str(tmp_path / "contentIndex.json")
+    sRelDir = os.path.join("ctrl", "mcm", "sil", "m04", "Module", "std", "sfcn_w64")
+    oContentIndex = contentIndex.ContentIndex(sContent, sCacheFile)
+    oContentIndex.listDirectory(sRelDir)
+    oContentIndex.save()
+    assert os.path.isfile(sCacheFile)
+
+    oContentIndex = contentIndex.ContentIndex(sContent, sCacheFile)
+    assert sRelDir in oContentIndex.dDirs
+    assert oContentIndex.listDirectory(sRelDir) == (["mcm.mexw64"], ["sub"])
+    assert not oContentIndex.bDirty
+
+    # a new file changes the modification time of its folder, the listing is read again
+    writeFile(os.path.join(sContent, sRelDir, "new.mexw64"))
+    nMtime = os.stat(os.path.join(sContent, sRelDir)).st_mtime
+    oContentIndex = contentIndex.ContentIndex(sContent, sCacheFile)
+    oContentIndex.dDirs[sRelDir][0] = nMtime - 1
+    assert oContentIndex.listDirectory(sRelDir) == (["mcm.mexw64", "new.mexw64"], ["sub"])
+
+
+def test_getContentIndex_is_shared(sContent):
+    assert contentIndex.getContentIndex(sContent) is contentIndex.getContentIndex(sContent + os.sep)
@@ -0,0 +1,115 @@
+import logging
+import os
+import time
+
+import pytest
+
+from supportFcn import dispFileLog
+
+
+def test_print_to_log_is_buffered_into_the_log_file(tmp_path, monkeypatch, capsys):
+    sLogFile = str(tmp_path / "transformation.log")
+    monkeypatch.setenv("configName", "cfg")
+    monkeypatch.setenv("log_file", sLogFile)
+    for nMessage in range(3):
+        dispFileLog.print_to_log("message " + str(nMessage))
+    dispFileLog.flushLogs()
+    with open(sLogFile) as oFile:
+        assert oFile.read() == "\nmessage 0\nmessage 1\nmessage 2"
+    assert capsys.readouterr().out == "message 0\nmessage 1\nmessage 2\n"
+
+
+def test_buffered_log_handler(tmp_path, monkeypatch):
+    sLogFile = str(tmp_path / "disp.log")
+    monkeypatch.setenv("transformationLogFile", sLogFile)
+    oLogger = logging.getLogger("test_buffered_log_handler")
+    oLogger.setLevel(logging.INFO)
+    oHandler = dispFileLog.BufferedLogHandler('transformationLogFile')
+    oLogger.addHandler(oHandler)
+    try:
+        oLogger.info("first")
+        oLogger.warning("second")
+        oHandler.flush()
+    finally:
+        oLogger.removeHandler(oHandler)
+    with open(sLogFile) as oFile:
+        assert oFile.read() == "\nfirst\nsecond"
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="fork is not available")
+def test_forked_child_does_not_inherit_a_held_lock(tmp_path, monkeypatch):
+    sLogFile = str(tmp_path / "child.log")
+    monkeypatch.setenv("configName", "cfg")
+    monkeypatch.setenv("log_file", sLogFile)
+    # the lock is held at fork time, as if another thread was logging
+    with dispFileLog.oLogWriterLock:
+        nPid = os.fork()
+        if nPid == 0:
+            try:
+                dispFileLog.print_to_log("from child")
+                dispFileLog.flushLogs()
+            finally:
+                os._exit(0)
+    nDeadline = time.time() + 10
+    while time.time() < nDeadline:
+        nDone, nStatus = os.waitpid(nPid, os.WNOHANG)
+        if nDone:
+            break
+        time.sleep(0.05)
+    else:
+        os.kill(nPid, 9)
+        os.waitpid(nPid, 0)
+        pytest.fail("forked child blocked on the log writer lock")
+    with open(sLogFile) as oFile:
+        assert oFile.read() == "\nfrom child"
+
+
+def test_log_files_are_closed_on_flush(tmp_path, monkeypatch):
+    sLogFile = str(tmp_path / "transformation.log")
+    monkeypatch.setenv("configName", "cfg")
+    monkeypatch.setenv("log_file", sLogFile)
+    dispFileLog.print_to_log("message")
+    dispFileLog.flushLogs()
+    assert dispFileLog.getLogWriter().dFiles == {}
+    # the log can be rotated while the transformation is running
+    os.replace(sLogFile, sLogFile + ".1")
+    dispFileLog.print_to_log("next")
+    dispFileLog.flushLogs()
+    with open(sLogFile) as oFile:
+        assert oFile.read() == "\nnext"
+
+
+def test_log_files_are_closed_when_idle(tmp_path):
+    sLogFile = str(tmp_path / "idle.log")
+    oLogWriter = dispFileLog.getLogWriter()
+    oLogWriter.write(sLogFile, "message")
+    nDeadline = time.time() + 10
+    while (not os.path.isfile(sLogFile) or oLogWriter.dFiles) and time.time() < nDeadline:
+        time.sleep(0.05)
+    assert oLogWriter.dFiles == {}
+
+
+def test_installBufferedLogHandlers(tmp_path, monkeypatch, capsys):
+    sLogFile = str(tmp_path / "transformation.log")
+    monkeypatch.setenv("configName", "cfg")
+    monkeypatch.setenv("log_file", sLogFile)
+    monkeypatch.setenv("displayLog", "1")
+    monkeypatch.setenv("transformationLogFile", str(tmp_path / "disp.log"))
+    oPrintToLogLogger = logging.getLogger("print_to_log")
+    oDispFileLogLogger = logging.getLogger("disp_file_log")
+    for oLogger in (oPrintToLogLogger, oDispFileLogLogger):
+        monkeypatch.setattr(oLogger, "handlers", [])
+        monkeypatch.setattr(oLogger, "level", logging.NOTSET)
+    dispFileLog.installBufferedLogHandlers()
+    dispFileLog.installBufferedLogHandlers()
+    assert len(oPrintToLogLogger.handlers) == 2 and len(oDispFileLogLogger.handlers) == 1
+
+    oPrintToLogLogger.info("info")
+    oPrintToLogLogger.debug("debug")
+    oDispFileLogLogger.debug("details")
+    dispFileLog.flushLogs()
+    with open(sLogFile) as oFile:
+        assert oFile.read() == "\ninfo"
+    with open(str(tmp_path / "disp.log")) as oFile:
+        assert oFile.read().endswith(" details")
+    assert capsys.readouterr().out == "info\n"
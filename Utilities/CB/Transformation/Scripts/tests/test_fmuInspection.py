@@ -0,0 +1,133 @@
+import os
+import zipfile
+
+from snps import fmuInspection
+
+sModelDescriptionFmi2 = """<?xml version="1.0" encoding="UTF-8"?>
+<fmiModelDescription fmiVersion="2.0" modelName="mcm">
+  <CoSimulation modelIdentifier="mcm"/>
+  <ModelVariables>
+    <ScalarVariable name="u" causality="input"><Real start="1.5" min="0" max="10"/></ScalarVariable>
+    <ScalarVariable name="y" causality="output"><Integer/></ScalarVariable>
+    <ScalarVariable name="k"><Boolean start="true"/></ScalarVariable>
+  </ModelVariables>
+  <ModelStructure/>
+</fmiModelDescription>
+"""
+
+
+def writeFmu(sFmuFile, lMembers, sModelDescription=sModelDescriptionFmi2):
+    with zipfile.ZipFile(sFmuFile, "w") as oFmu:
+        if sModelDescription is not None:
+            oFmu.writestr("modelDescription.xml", sModelDescription)
+        for sMember in lMembers:
+            oFmu.writestr(sMember, "")
+    return sFmuFile
+
+
+def test_getArchitecture():
+    assert fmuInspection.getArchitecture(["binaries/win64/mcm.dll"]) == "64"
+    assert fmuInspection.getArchitecture(["binaries/win32/mcm.dll"]) == "32"
+    assert fmuInspection.getArchitecture(["binaries/linux64/mcm.so"]) == ""
+    assert fmuInspection.getArchitecture(["binaries/winarm/mcm.dll"]) == "unknown"
+    # outer folders first, then by name
+    assert fmuInspection.getArchitecture(["binaries/x/win32/a.dll", "binaries/win64/a.dll"]) == "64"
+    assert fmuInspection.getArchitecture(["binaries\\win32\\a.dll", "binaries\\win64\\a.dll"]) == "32"
+    assert fmuInspection.getArchitecture(["resources/win64/a.dll"]) == ""
+
+
+def test_inspectFmu(tmp_path):
+    sFmuFile = writeFmu(str(tmp_path / "mcm.fmu"), ["binaries/win64/mcm.dll"])
+    dInfo = fmuInspection.inspectFmu(sFmuFile)
+    assert dInfo["members"] == ["modelDescription.xml", "binaries/win64/mcm.dll"]
+    assert dInfo["win64"] and not dInfo["win32"]
+    assert dInfo["architecture"] == "64"
+    assert dInfo["fmiVersion"] == "2.0"
+    assert dInfo["kinds"] == ["CS"]
+    assert dInfo["modelIdentifier"] == "mcm"
+
+
+def test_inspectFmu_fmi1_and_missing_modelDescription(tmp_path):
+    sFmuFile = writeFmu(str(tmp_path / "fmi1.fmu"), ["binaries/win32/a.dll"],
+                        '<fmiModelDescription fmiVersion="1.0" modelIdentifier="a"><Implementation/></fmiModelDescription>')
+    dInfo = fmuInspection.inspectFmu(sFmuFile)
+    assert (dInfo["kinds"], dInfo["modelIdentifier"], dInfo["architecture"]) == (["CS"], "a", "32")
+
+    dInfo = fmuInspection.inspectFmu(writeFmu(str(tmp_path / "empty.fmu"), ["binaries/win64/a.dll"], None))
+    assert (dInfo["fmiVersion"], dInfo["kinds"], dInfo["modelIdentifier"]) == ("", [], "")
+    assert dInfo["win64"]
+
+
+def test_FmuInspectionCache_reuse_and_invalidation(tmp_path, monkeypatch):
+    sFmuFile = writeFmu(str(tmp_path / "mcm.fmu"), ["binaries/win64/mcm.dll"])
+    sCacheFile = str(tmp_path / "fmuInspection.json")
+    oCache = fmuInspection.FmuInspectionCache(sCacheFile)
+    dInfo = oCache.getInfo(sFmuFile)
+    assert oCache.getInfo(sFmuFile) is dInfo
+    oCache.save()
+
+    # a later run reads the cache file instead of the FMU
+    lInspected = []
+    monkeypatch.setattr(fmuInspection, "inspectFmu", lambda sFmuFile: lInspected.append(sFmuFile) or {})
+    oCache = fmuInspection.FmuInspectionCache(sCacheFile)
+    assert oCache.getInfo(sFmuFile) == dInfo
+    assert lInspected == []
+
+    # a changed FMU is inspected again
+    writeFmu(sFmuFile, ["binaries/win32/mcm.dll", "binaries/win32/other.dll"])
+    os.utime(sFmuFile, (1, 1))
+    oCache.getInfo(sFmuFile)
+    assert lInspected == [os.path.abspath(sFmuFile)]
+
+
+def test_getFmuInfo_uses_shared_cache(tmp_path, monkeypatch):
+    monkeypatch.delenv("fmuInspectionCacheFile", raising=False)
+    monkeypatch.setattr(fmuInspection, "dFmuCaches", {})
+    sFmuFile = writeFmu(str(tmp_path / "mcm.fmu"), ["binaries/win64/mcm.dll"])
+    assert fmuInspection.getFmuInfo(sFmuFile) is fmuInspection.getFmuInfo(sFmuFile)
+    assert fmuInspection.getFmuInspectionCache() is fmuInspection.getFmuInspectionCache(None)
+
+
+sModelDescriptionFmi3 = """<?xml version="1.0" encoding="UTF-8"?>
+<fmiModelDescription fmiVersion="3.0" modelName="m">
+  <CoSimulation modelIdentifier="m"/>
+  <ModelVariables>
+    <Float64 name="x" causality="output" start="0.5"/>
+    <Int32 name="n" causality="parameter" min="1" max="4"/>
+    <Annotations/>
+  </ModelVariables>
+</fmiModelDescription>
+"""
+
+
+def test_readFmuSignals_fmi2(tmp_path):
+    sFmuFile = writeFmu(str(tmp_path / "mcm.fmu"), [])
+    assert fmuInspection.readFmuSignals(sFmuFile) == [
+        fmuInspection.FmuSignal("u", "input", "Real", "1.5", "0", "10"),
+        fmuInspection.FmuSignal("y", "output", "Integer", "", "", ""),
+        fmuInspection.FmuSignal("k", "local", "Boolean", "true", "", ""),
+    ]
+
+
+def test_readFmuSignals_fmi3(tmp_path):
+    sFmuFile = writeFmu(str(tmp_path / "m.fmu"), [], sModelDescriptionFmi3)
+    assert fmuInspection.readFmuSignals(sFmuFile) == [
+        fmuInspection.FmuSignal("x", "output", "Float64", "0.5", "", ""),
+        fmuInspection.FmuSignal("n", "parameter", "Int32", "", "1", "4"),
+    ]
+
+
+def test_getFmuSignals_causalities_and_cache_file(tmp_path, monkeypatch):
+    sCacheFile = str(tmp_path / "fmuInspection.json")
+    monkeypatch.setenv("fmuInspectionCacheFile", sCacheFile)
+    monkeypatch.setattr(fmuInspection, "dFmuCaches", {})
+    sFmuFile = writeFmu(str(tmp_path / "mcm.fmu"), [])
+    assert [oSignal.name for oSignal in fmuInspection.getFmuSignals(sFmuFile, ["input", "output"])] == ["u", "y"]
+    assert len(fmuInspection.getFmuSignals(sFmuFile)) == 3
+    fmuInspection.saveFmuInspectionCaches()
+
+    # signal tables are restored as FmuSignal tuples
+    oCache = fmuInspection.FmuInspectionCache(sCacheFile)
+    lSignals = oCache.getSignals(sFmuFile)
+    assert lSignals == fmuInspection.readFmuSignals(sFmuFile)
+    assert lSignals[0].causality == "input"
@@ -0,0 +1,102 @@
+import logging
+import os
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from snps import generateIni
+
+sConfiguration = """<Configuration xmlns="n"><MasterSolver maxCosimStepsize="0.01"/>
+<ModuleSetup name="eng"><Module context="ctrl" species="eng" family="detail" type="gtfrm" variant="v" modelSet="sfcn_w64"/><DataSet className="initIO" variant="std"/></ModuleSetup>
+<ModuleSetup name="tx"><Module context="phys" species="tx" family="f" type="t" variant="v" modelSet="sfcn_w64"/><DataSet className="initIO" variant="std"/></ModuleSetup>
+<ModuleSetup name="rx"><Module context="phys" species="rx" family="f" type="t" variant="v" modelSet="sfcn_w32"/></ModuleSetup>
+<ModuleSetup name="dll"><Module context="phys" species="dll" family="f" type="t" variant="v" modelSet="silver_dll_w64"/></ModuleSetup>
+<ModuleSetup name="drv"><Module context="phys" species="drv" family="f" type="t" variant="v" modelSet="open"/><DataSet className="initIO" variant="o"/></ModuleSetup>
+</Configuration>"""
+
+sModuleXml = """<Module xmlns="n"><ModelSet type="silver_dll_w64"><ModelFile name="dllModel.dll" isMain="1"/></ModelSet></Module>"""
+
+sHeader = "# Comment: for %s\n" + "".join("    %s_" + sKey + "=%s\n" for sKey in
+                                           ("PathContent", "DIVeContext", "DIVeSpecies", "DIVeFamily", "DIVeType", "DIVeVariant", "DIVeModelSet"))
+
+# INI files of generate_ini before the in-memory buffer, rx has no s-function file
+dGolden = {
+    "SFU_LOGGING.ini": "# LOGGING\nRBU_DIVe_configuration=cfg",
+    "SFU_POST.ini": "# POSTPROCESSING\nSFU_Matlab64Exe=${DIVe_Matlab64Exe}",
+    "SFU_SUPPORT.ini": "# SUPPORT\nDIVeInitIOPaths=\nSFU_Matlab64Exe=${DIVe_Matlab64Exe}",
+    "SFU_CTRL_ENG_DETAIL_GTFRM_V_SFCN_W64.ini":
+        sHeader % ("ENG", "ENG", "${DIVe_ContentPath}", "ENG", "ctrl", "ENG", "eng", "ENG", "detail", "ENG", "gtfrm", "ENG", "v", "ENG", "sfcn_w64")
+        + "ENG_DIVe_dataClass_initIO=std\nENG_DIVe_StepSize=0.005\nGtSuiteVer=v2020\n",
+    "SFU_PHYS_TX_F_T_V_SFCN_W64.ini":
+        sHeader % ("TX", "TX", "${DIVe_ContentPath}", "TX", "phys", "TX", "tx", "TX", "f", "TX", "t", "TX", "v", "TX", "sfcn_w64")
+        + "TX_DIVe_dataClass_initIO=std\nTX_file_mexw64=tx.mexw64\n",
+    "SFU_PHYS_RX_F_T_V_SFCN_W32.ini":
+        sHeader % ("RX", "RX", "${DIVe_ContentPath}", "RX", "phys", "RX", "rx", "RX", "f", "RX", "t", "RX", "v", "RX", "sfcn_w32")
+        + "RX_file_mexw32=\n",
+    "SFU_PHYS_DLL_F_T_V_SILVER_DLL_W64.ini":
+        sHeader % ("DLL", "DLL", "${DIVe_ContentPath}", "DLL", "phys", "DLL", "dll", "DLL", "f", "DLL", "t", "DLL", "v", "DLL", "silver_dll_w64")
+        + "DLL_file_dll_w64=dllModel\n",
+    "SFU_PHYS_DRV_F_T_V_OPEN.ini":
+        sHeader % ("DRV", "DRV", "${DIVe_ContentPath}", "DRV", "phys", "DRV", "drv", "DRV", "f", "DRV", "t", "DRV", "v", "DRV", "open")
+        + "DRV_DIVe_dataClass_initIO=o\n",
+}
+
+
+def writeFile(sPath, sText=""):
+    if os.path.dirname(sPath):
+        os.makedirs(os.path.dirname(sPath), exist_ok=True)
+    with open(sPath, "w") as oFile:
+        oFile.write(sText)
+
+
+@pytest.fixture
+def sBase(tmp_path, monkeypatch):
+    # generate_ini changes to "<cur>\..\..\..\.." and builds Content paths with backslashes,
+    # on Linux both are single folder or file names
+    monkeypatch.delenv("buildCacheFile", raising=False)
+    sBase = str(tmp_path)
+    os.makedirs(os.path.join(sBase, "cur"))
+    os.makedirs(os.path.join(sBase, "cur\\..\\..\\..\\.."))
+    os.makedirs(os.path.join(sBase, "sil"))
+    sContent = os.path.join(sBase, "Content")
+    writeFile(os.path.join(sContent, "phys", "tx", "f", "t", "Module", "v", "sfcn_w64", "tx.mexw64"))
+    os.makedirs(os.path.join(sContent, "phys", "rx", "f", "t", "Module", "v", "sfcn_w32"))
+    writeFile(sContent + "\\phys\\dll\\f\\t\\Module\\v\\v.xml", sModuleXml)
+    sCurDir = os.getcwd()
+    os.chdir(os.path.join(sBase, "cur"))
+    yield sBase
+    os.chdir(sCurDir)
+
+
+def readInis(sBase):
+    dInis = {}
+    for sFile in os.listdir(sBase):
+        if sFile.endswith(".ini"):
+            with open(os.path.join(sBase, sFile)) as oFile:
+                dInis[sFile.split("\\")[-1]] = oFile.read()
+    return dInis
+
+
+def test_generate_ini_matches_golden_output(sBase, caplog):
+    with caplog.at_level(logging.ERROR, logger="print_to_log"):
+        assert generateIni.generate_ini({}, ET.fromstring(sConfiguration), os.path.join(sBase, "Content"), os.path.join(sBase, "sil"),
+                                        "", "cfg", "v2020", 0, False, "")
+    assert readInis(sBase) == dGolden
+    assert [oRecord.getMessage() for oRecord in caplog.records] == \
+        ["\nCannot find s-function file in " + os.path.abspath(os.path.join(sBase, "Content") + "\\phys\\rx\\f\\t\\Module\\v\\sfcn_w32")]
+
+
+def test_flushIniBuffer_writes_every_file_once(tmp_path):
+    dIniBuffer = {}
+    sIniA = str(tmp_path / "SFU_A.ini")
+    sIniB = str(tmp_path / "SFU_B.ini")
+    generateIni.appendIniText(dIniBuffer, sIniA, "# A\n")
+    generateIni.appendIniText(dIniBuffer, sIniB, "# B\n")
+    generateIni.appendIniText(dIniBuffer, sIniA, "A=1\n")
+    writeFile(sIniA, "stale content\n")
+    generateIni.flushIniBuffer(dIniBuffer)
+    assert sorted(os.listdir(str(tmp_path))) == ["SFU_A.ini", "SFU_B.ini"]
+    with open(sIniA) as oFile:
+        assert oFile.read() == "# A\nA=1\n"
+    with open(sIniB) as oFile:
+        assert oFile.read() == "# B\n"
@@ -0,0 +1,73 @@
+import logging
+import re
+
+import pytest
+
+from snps import globalParameters
+
+lParFileTexts = [
+    "a = 1 # global\nb = 2 #fromGlobal\nc = 3\n# global comment without parameter\n",
+    "A_x=${A_y} #Global\nb = 20 # FromGlobal # global\nd = 4 # fromglobal local\ne 5 # global\n",
+    "",
+    "c = 30 #fromGlobal\na = 10 #GLOBAL trailing text\nf = x y #fromGlobal\n",
+]
+
+
+def saveGlobalParamsLegacy(pltm_sfu_par_file, pltm_sfu_par_file_target):
+    # former saveGlobalParams with one regex search per line
+    array_global_pars = []
+    with open(pltm_sfu_par_file, "r") as fobj:
+        for line in fobj:
+            if re.search(r".*#\s*[gG][lL][oO][bB][aA][lL]", line):
+                match = re.search(r"(\w+)\s*=\s*([\_\w\$\{\}]+).*", line)
+                if match:
+                    array_global_pars.append([pltm_sfu_par_file_target, "needle", match.group(1), match.group(2)])
+            elif re.search(r".*#\s*[fF][rR][oO][mM][gG][lL][oO][bB][aA][lL]", line):
+                match = re.search(r"(\w+)\s*=\s*([\w\$\{\}\s]+).*#.*", line)
+                if match:
+                    array_global_pars.append([pltm_sfu_par_file_target, "pillow", match.group(1), match.group(2)])
+    return array_global_pars
+
+
+@pytest.fixture
+def lParFiles(tmp_path):
+    lParFiles = []
+    for n, sText in enumerate(lParFileTexts):
+        sParFile = str(tmp_path / ("par" + str(n) + ".txt"))
+        with open(sParFile, "w") as fobj:
+            fobj.write(sText)
+        lParFiles.append(sParFile)
+    return lParFiles
+
+
+def test_saveGlobalParams_matches_legacy(lParFiles):
+    for sParFile in lParFiles:
+        assert globalParameters.saveGlobalParams(sParFile, "target.ini") == saveGlobalParamsLegacy(sParFile, "target.ini")
+
+
+@pytest.mark.parametrize("nMaxWorkers", [None, 1, 3])
+def test_iterGlobalParams_matches_saveGlobalParams(lParFiles, nMaxWorkers):
+    lJobs = [(sParFile, "SFU_" + str(n) + ".ini") for n, sParFile in enumerate(lParFiles)]
+    lRecords = list(globalParameters.iterGlobalParams(lJobs, nMaxWorkers=nMaxWorkers))
+    assert all(isinstance(oPar, globalParameters.GlobalParam) for oPar in lRecords)
+    assert globalParameters.toGlobalParList(lRecords) == [par for sParFile, sTarget in lJobs
+                                                           for par in saveGlobalParamsLegacy(sParFile, sTarget)]
+    assert lRecords[0] == globalParameters.GlobalParam("a", "1", globalParameters.GLOBAL, "SFU_0.ini")
+    # fromGlobal values keep the blanks before the comment, as before
+    assert lRecords[1] == globalParameters.GlobalParam("b", "2 ", globalParameters.FROM_GLOBAL, "SFU_0.ini")
+
+
+def test_iterGlobalParams_names_the_file_as_source(lParFiles):
+    lRecords = list(globalParameters.iterGlobalParams(lParFiles[:1], nMaxWorkers=4))
+    assert {oPar.source for oPar in lRecords} == {lParFiles[0]}
+
+
+def test_benchmark_indexed_matches_nested(caplog):
+    # benchmark raises if both implementations patch the INI files differently
+    with caplog.at_level(logging.INFO, logger="print_to_log"):
+        nIndexed, nIndexedSubset, nNested = globalParameters.benchmark(nParams=1000, nInis=5, nNestedParams=200)
+    assert nIndexed >= 0 and nIndexedSubset >= 0 and nNested >= 0
+    assert [oRecord.getMessage() for oRecord in caplog.records][1:] == [
+        "\tindexed: %.3f s for 1000 parameters" % nIndexed,
+        "\tindexed: %.3f s for 200 parameters" % nIndexedSubset,
+        "\tnested:  %.3f s for 200 parameters" % nNested]
@@ -0,0 +1,99 @@
+import os
+
+import pytest
+
+from snps import islandSync
+
+
+def writeFile(sPath, sText):
+    os.makedirs(os.path.dirname(sPath), exist_ok=True)
+    with open(sPath, "w") as oFile:
+        oFile.write(sText)
+
+
+@pytest.fixture
+def sContent(tmp_path):
+    sContent = str(tmp_path / "Content" / "phys" / "tx")
+    writeFile(os.path.join(sContent, "Module", "v", "model.sil"), "model")
+    writeFile(os.path.join(sContent, "Data", "sim", "results", "ParsLog.txt"), "log")
+    return sContent
+
+
+@pytest.mark.parametrize("sMode", islandSync.SYNC_MODES)
+def test_syncTree_copies_only_changed_files(tmp_path, sContent, sMode):
+    sIsland = str(tmp_path / "ContentLocal" / "phys" / "tx")
+    oReport = islandSync.syncTree(sContent, sIsland, sMode)
+    assert (oReport.nFilesCopied, oReport.nFilesSkipped) == (2, 0)
+    oReport = islandSync.syncTree(sContent, sIsland, sMode)
+    assert (oReport.nFilesCopied, oReport.nFilesSkipped) == (0, 2)
+    writeFile(os.path.join(sContent, "Module", "v", "model.sil"), "changed model")
+    oReport = islandSync.syncTree(sContent, sIsland, sMode)
+    assert (oReport.nFilesCopied, oReport.nFilesSkipped) == (1, 1)
+    with open(os.path.join(sIsland, "Module", "v", "model.sil")) as oFile:
+        assert oFile.read() == "changed model"
+
+
+def test_linkFile_never_links_result_folders(tmp_path, sContent, monkeypatch):
+    monkeypatch.delenv("islandCopyOnlyFolders", raising=False)
+    sSrc = os.path.join(sContent, "Data", "sim", "results", "ParsLog.txt")
+    sDst = str(tmp_path / "island" / "ParsLog.txt")
+    os.makedirs(os.path.dirname(sDst))
+    assert islandSync.linkFile(sSrc, sDst, "auto") == "copy"
+    with open(sDst, "a") as oFile:
+        oFile.write(" appended by the simulation")
+    with open(sSrc) as oFile:
+        assert oFile.read() == "log"
+
+
+def test_isLinkAllowed(sContent, monkeypatch):
+    monkeypatch.delenv("islandCopyOnlyFolders", raising=False)
+    sModel = os.path.join(sContent, "Module", "v", "model.sil")
+    assert not islandSync.isLinkAllowed(os.path.join(sContent, "Data", "sim", "results", "ParsLog.txt"))
+    assert not islandSync.isLinkAllowed("..\\..\\Content\\phys\\tx\\Data\\Output\\run.csv")
+    monkeypatch.setenv("islandCopyOnlyFolders", "Module")
+    assert not islandSync.isLinkAllowed(sModel)
+    monkeypatch.setenv("islandCopyOnlyFolders", "")
+    assert islandSync.isLinkAllowed(sModel)
+    monkeypatch.setattr(islandSync.os, "name", "nt")
+    assert islandSync.isLinkAllowed(sModel)
+
+
+def test_linkFile_auto_hard_links_without_reflink(tmp_path, sContent, monkeypatch):
+    # as on Windows: no fcntl, the file is hard linked
+    monkeypatch.delenv("islandCopyOnlyFolders", raising=False)
+    monkeypatch.setattr(islandSync, "fcntl", None)
+    sSrc = os.path.join(sContent, "Module", "v", "model.sil")
+    sDst = str(tmp_path / "island" / "model.sil")
+    os.makedirs(os.path.dirname(sDst))
+    assert islandSync.linkFile(sSrc, sDst, "auto") == "hardlink"
+    assert os.path.samefile(sSrc, sDst)
+
+
+def test_linkFile_auto_copies_if_hard_link_fails(tmp_path, sContent, monkeypatch):
+    # e.g. Content and island on different volumes
+    def link(sSrc, sDst):
+        raise OSError("cross-device link")
+    monkeypatch.delenv("islandCopyOnlyFolders", raising=False)
+    monkeypatch.setattr(islandSync, "fcntl", None)
+    monkeypatch.setattr(islandSync.os, "link", link)
+    sSrc = os.path.join(sContent, "Module", "v", "model.sil")
+    sDst = str(tmp_path / "island" / "model.sil")
+    os.makedirs(os.path.dirname(sDst))
+    assert islandSync.linkFile(sSrc, sDst, "auto") == "copy"
+    assert not os.path.samefile(sSrc, sDst)
+    with open(sDst) as oFile:
+        assert oFile.read() == "model"
+
+
+def test_linkFile_auto_creates_identical_files(tmp_path, sContent):
+    sSrc = os.path.join(sContent, "Module", "v", "model.sil")
+    sDst = str(tmp_path / "island" / "model.sil")
+    os.makedirs(os.path.dirname(sDst))
+    oReport = islandSync.SyncReport()
+    sMethod = islandSync.linkFile(sSrc, sDst, "auto", oReport)
+    assert sMethod in ("reflink", "hardlink", "copy")
+    assert oReport.dMethods == {sMethod: 1}
+    with open(sDst) as oFile:
+        assert oFile.read() == "model"
+    with pytest.raises(ValueError):
+        islandSync.linkFile(sSrc, sDst, "symlink")
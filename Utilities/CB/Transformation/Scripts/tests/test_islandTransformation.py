@@ -0,0 +1,199 @@
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from snps.islandTransformation import (ParamResolver, _resolve_params_per_key, add_closure_reference, benchmark_param_resolution,
+                                       island_manifest, islandTransformation, prune_covered_files, prune_nested_content_dirs,
+                                       write_island_manifest)
+
+lCases = [
+    # plain values
+    ({"${A_PathContent}": "..\\..\\..\\Content", "${B_file}": "b.dll"},
+     "<sil-line>${A_PathContent}\\ctrl\\${B_file} ${unknown}</sil-line>"),
+    # values that are placeholders themselves are not resolved
+    ({"${A}": "${B}", "${B}": "b"}, "${A} ${B} ${A}${B}"),
+    # a value containing another key is resolved further by the later key
+    ({"${A}": "x${B", "${B}": "b"}, "${A}} ${B}"),
+    ({"${A}": "$", "${B}": "{C}", "${C}": "c"}, "${A}${B} ${C}"),
+    # placeholder split by a literal
+    ({"${A}": "a"}, "${${A}} $${A} ${A"),
+    ({}, "${A}"),
+]
+
+
+@pytest.mark.parametrize("dParams, sSfuContent", lCases)
+def test_ParamResolver_matches_per_key_replacement(dParams, sSfuContent):
+    assert ParamResolver(dParams).resolve(sSfuContent) == _resolve_params_per_key(dParams, sSfuContent)
+
+
+def test_benchmark_param_resolution(caplog):
+    # the benchmark raises if both implementations resolve the SFUs differently
+    with caplog.at_level(logging.INFO, logger="print_to_log"):
+        nSinglePass, nPerKey = benchmark_param_resolution(n_sfus=5, n_params=300)
+    assert nSinglePass >= 0 and nPerKey >= 0
+    assert [oRecord.getMessage() for oRecord in caplog.records] == [
+        "\t5 SFUs, 300 ini parameters", "\tsingle pass: %.3f s" % nSinglePass, "\tper key:     %.3f s" % nPerKey]
+
+
+def _writeSfuDelayed(sSfuFile, sContent):
+    time.sleep(0.2)
+    with open(sSfuFile, "w") as hSfuFile:
+        hSfuFile.write(sContent)
+
+
+@pytest.mark.parametrize("bPassExecutor", [False, True])
+def test_islandTransformation_waits_for_pending_jobs(tmp_path, monkeypatch, bPassExecutor):
+    # the SFU is written by a job still running when the island transformation starts
+    monkeypatch.delenv("islandSyncMode", raising=False)
+    monkeypatch.delenv("islandLinkMode", raising=False)
+    monkeypatch.delenv("islandCopyScope", raising=False)
+    sMaster = tmp_path / "Master"
+    sMaster.mkdir()
+    sSfuFile = str(sMaster / "..\\SFUs\\SFU_A.sil")
+    oExecutor = ThreadPoolExecutor(max_workers=1)
+    oFuture = oExecutor.submit(_writeSfuDelayed, sSfuFile, "<sil-line>-a ..\\..\\..\\Content\\ctrl\\a.txt</sil-line>\n")
+    sCurDir = os.getcwd()
+    try:
+        islandTransformation(str(tmp_path), pending_jobs=oExecutor if bPassExecutor else [oFuture])
+    finally:
+        os.chdir(sCurDir)
+        oExecutor.shutdown()
+    with open(sSfuFile) as hSfuFile:
+        assert hSfuFile.read() == "<sil-line>-a ContentLocal\\ctrl\\a.txt</sil-line>\n"
+
+
+@pytest.fixture
+def sContent(tmp_path):
+    # small Content tree: a module folder with a data subfolder and a single map file
+    sContent = str(tmp_path / "Content")
+    for sFile in (os.path.join("ctrl", "mcm", "Module", "v", "model.sil"),
+                  os.path.join("ctrl", "mcm", "Module", "v", "data", "par.txt"),
+                  os.path.join("phys", "tx", "Data", "map.txt"),
+                  os.path.join("phys", "tx", "Data", "unused.txt")):
+        os.makedirs(os.path.dirname(os.path.join(sContent, sFile)), exist_ok=True)
+        with open(os.path.join(sContent, sFile), "w") as hFile:
+            hFile.write(sFile)
+    return sContent
+
+
+def test_closure_of_content_references(sContent):
+    sModule = os.path.join(sContent, "ctrl", "mcm", "Module", "v")
+    sMap = os.path.join(sContent, "phys", "tx", "Data", "map.txt")
+    dClosureFiles = {}
+    dContentJobs = {}
+    # referenced files are copied alone, referenced folders completely
+    for sPathOld in (sMap, os.path.join(sModule, "data", "par.txt"), os.path.join(sModule, "data"), sModule):
+        assert add_closure_reference(sPathOld.replace(sContent, "ContentLocal"), sPathOld, dClosureFiles, dContentJobs)
+    assert not add_closure_reference("ContentLocal", os.path.join(sContent, "missing.txt"), dClosureFiles, dContentJobs)
+    assert set(dClosureFiles) == {sMap, os.path.join(sModule, "data", "par.txt")}
+    assert set(dContentJobs) == {sModule, os.path.join(sModule, "data")}
+    # the data folder and par.txt are copied with the module folder
+    dContentJobs = prune_nested_content_dirs(dContentJobs)
+    assert dContentJobs == {sModule: sModule.replace(sContent, "ContentLocal")}
+    assert prune_covered_files(dClosureFiles, dContentJobs) == \
+        {sMap: sMap.replace(sContent, "ContentLocal")}
+
+
+def test_write_island_manifest(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_island_manifest([("content", "old\\mod", "ContentLocal\\mod"),
+                           ("file", "old\\map.txt", "ContentLocal\\map.txt"),
+                           ("utilities", "old\\init.py", "init.py")])
+    with open(island_manifest) as hManifest:
+        assert hManifest.read() == "folder\told\\mod\tContentLocal\\mod\nfile\told\\map.txt\tContentLocal\\map.txt\n"
+
+
+def test_islandTransformation_copies_closure(tmp_path, monkeypatch):
+    # the Content paths are relative to Master and contain backslashes, on Linux they are single file names
+    monkeypatch.delenv("islandSyncMode", raising=False)
+    monkeypatch.delenv("islandLinkMode", raising=False)
+    sMaster = tmp_path / "Master"
+    sMaster.mkdir()
+    dFiles = {"..\\..\\..\\Content\\phys\\tx\\Data\\map.txt": "map",
+              "..\\..\\..\\Content\\phys\\tx\\Data\\unused.txt": "unused",
+              "..\\SFUs\\SFU_TX.sil": "<sil-line>-a ${TX_PathContent}\\phys\\tx\\Data\\map.txt</sil-line>\n",
+              "..\\SFUs\\initParams\\SFU_TX.ini": "TX_PathContent=..\\..\\..\\Content\nTX_user_config=-f ..\\..\\..\\Content\\phys\\tx\\Data\\cfg\n"}
+    for sFile, sText in dFiles.items():
+        with open(str(sMaster / sFile), "w") as hFile:
+            hFile.write(sText)
+    (sMaster / "..\\..\\..\\Content\\phys\\tx\\Data\\cfg").mkdir()
+    (sMaster / "..\\..\\..\\Content\\phys\\tx\\Data\\cfg" / "user.cfg").write_text("cfg")
+    sCurDir = os.getcwd()
+    try:
+        islandTransformation(str(tmp_path), copy_scope="closure")
+    finally:
+        os.chdir(sCurDir)
+    with open(str(sMaster / "ContentLocal\\phys\\tx\\Data\\map.txt")) as hFile:
+        assert hFile.read() == "map"
+    assert (sMaster / "ContentLocal\\phys\\tx\\Data\\cfg" / "user.cfg").read_text() == "cfg"
+    assert not (sMaster / "ContentLocal\\phys\\tx\\Data\\unused.txt").exists()
+    with open(str(sMaster / island_manifest)) as hManifest:
+        assert sorted(hManifest.read().splitlines()) == [
+            "file\t..\\..\\..\\Content\\phys\\tx\\Data\\map.txt\tContentLocal\\phys\\tx\\Data\\map.txt",
+            "folder\t..\\..\\..\\Content\\phys\\tx\\Data\\cfg\tContentLocal\\phys\\tx\\Data\\cfg"]
+
+
+def runIslandTransformation(sSilFolder, caplog):
+    sCurDir = os.getcwd()
+    caplog.clear()
+    try:
+        with caplog.at_level(logging.INFO, logger="print_to_log"):
+            islandTransformation(sSilFolder)
+    finally:
+        os.chdir(sCurDir)
+    return [oRecord.getMessage() for oRecord in caplog.records]
+
+
+@pytest.fixture
+def sSyncSil(tmp_path, monkeypatch):
+    # Content folder "..\..\..\Content" next to Master, referenced with forward slashes by the SFU
+    monkeypatch.delenv("islandLinkMode", raising=False)
+    monkeypatch.delenv("islandCopyScope", raising=False)
+    sMaster = tmp_path / "Master"
+    sData = sMaster / "..\\..\\..\\Content" / "phys" / "tx" / "Data"
+    sData.mkdir(parents=True)
+    (sData / "map.txt").write_text("map")
+    (sData / "par.txt").write_text("par")
+    (sMaster / "..\\SFUs\\SFU_TX.sil").write_text("<sil-line>-a ../../../Content/phys/tx/Data/map.txt</sil-line>\n")
+    return str(tmp_path)
+
+
+def test_islandTransformation_sync_mode_from_environment(sSyncSil, monkeypatch, caplog):
+    monkeypatch.setenv("islandSyncMode", "mtime")
+    sIslandData = os.path.join(sSyncSil, "Master", "ContentLocal", "phys", "tx", "Data")
+    sContentData = os.path.join(sSyncSil, "Master", "..\\..\\..\\Content", "phys", "tx", "Data")
+    assert "\tIsland sync: 2 files (0.0 MB) copied, 0 files (0.0 MB) unchanged" in runIslandTransformation(sSyncSil, caplog)
+    with open(os.path.join(sIslandData, "par.txt"), "w") as hFile:
+        hFile.write("written by the simulation")
+    os.utime(os.path.join(sIslandData, "par.txt"), ns=(os.stat(os.path.join(sContentData, "par.txt")).st_mtime_ns,) * 2)
+    with open(os.path.join(sContentData, "map.txt"), "w") as hFile:
+        hFile.write("changed map")
+    with open(os.path.join(sIslandData, "island_only.txt"), "w") as hFile:
+        hFile.write("island")
+    lMessages = runIslandTransformation(sSyncSil, caplog)
+    # par.txt differs in size from the Content file and is copied again with map.txt
+    assert "\tIsland sync: 2 files (0.0 MB) copied, 0 files (0.0 MB) unchanged" in lMessages
+    lMessages = runIslandTransformation(sSyncSil, caplog)
+    assert "\tIsland sync: 0 files (0.0 MB) copied, 2 files (0.0 MB) unchanged" in lMessages
+    assert not any("Could not copy" in sMessage for sMessage in lMessages)
+    with open(os.path.join(sIslandData, "map.txt")) as hFile:
+        assert hFile.read() == "changed map"
+    assert os.path.isfile(os.path.join(sIslandData, "island_only.txt"))
+
+
+def test_islandTransformation_without_sync_mode_copies_folders(sSyncSil, monkeypatch, caplog):
+    monkeypatch.delenv("islandSyncMode", raising=False)
+    lMessages = runIslandTransformation(sSyncSil, caplog)
+    assert not any("Island sync" in sMessage or "Could not copy" in sMessage for sMessage in lMessages)
+    assert os.path.isfile(os.path.join(sSyncSil, "Master", "ContentLocal", "phys", "tx", "Data", "map.txt"))
+    # a complete copy into an existing island fails like before
+    assert any("Could not copy" in sMessage for sMessage in runIslandTransformation(sSyncSil, caplog))
+
+
+def test_islandTransformation_rejects_unknown_sync_mode(sSyncSil, monkeypatch, caplog):
+    monkeypatch.setenv("islandSyncMode", "size")
+    lMessages = runIslandTransformation(sSyncSil, caplog)
+    assert any("Unknown island sync mode" in sMessage for sMessage in lMessages)
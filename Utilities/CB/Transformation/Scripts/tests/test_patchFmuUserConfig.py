@@ -0,0 +1,53 @@
+import os
+import zipfile
+
+import pytest
+
+from snps import patchFmuUserConfig as patchFmu
+
+dMembers = {
+    "modelDescription.xml": (b"<fmiModelDescription fmiVersion=\"2.0\"/>", zipfile.ZIP_DEFLATED),
+    "binaries/win64/model.dll": (bytes(range(256)) * 64, zipfile.ZIP_DEFLATED),
+    "binaries/win64/userConfig.cfg": (b"userConfigDefault=default\nother=1\n", zipfile.ZIP_DEFLATED),
+    "resources/data.bin": (b"\x00\x01" * 1000, zipfile.ZIP_STORED),
+}
+
+
+def writeFmu(sFmuFile, dFmuMembers=dMembers):
+    with zipfile.ZipFile(sFmuFile, "w") as oZip:
+        oZip.writestr(zipfile.ZipInfo("resources/"), b"")
+        for sName, (bData, nCompressType) in dFmuMembers.items():
+            oZip.writestr(sName, bData, compress_type=nCompressType)
+
+
+def test_patchFmuUserConfig_roundtrip(tmp_path, monkeypatch):
+    (tmp_path / "content").mkdir()
+    (tmp_path / "master").mkdir()
+    writeFmu(str(tmp_path / "content" / "ctrl.fmu"))
+    monkeypatch.chdir(tmp_path / "master")
+
+    patchFmu.patchFmuUserConfig(str(tmp_path / "content"), "ctrl.fmu", "myConfig")
+
+    with zipfile.ZipFile(str(tmp_path / "master" / "ctrl.fmu")) as oZip, \
+            zipfile.ZipFile(str(tmp_path / "content" / "ctrl.fmu")) as oZipIn:
+        assert oZip.testzip() is None
+        assert oZip.namelist() == oZipIn.namelist()
+        for oInfo in oZipIn.infolist():
+            assert oZip.getinfo(oInfo.filename).compress_type == oInfo.compress_type
+        for sName, (bData, nCompressType) in dMembers.items():
+            if sName.endswith("userConfig.cfg"):
+                assert oZip.read(sName).replace(b"\r\n", b"\n") == b"userConfigDefault=myConfig\nother=1\n"
+            else:
+                assert oZip.read(sName) == bData
+    assert not (tmp_path / "master" / "ctrl.fmu.tmp").exists()
+
+
+def test_patchFmuUserConfig_without_userConfigDefault(tmp_path, monkeypatch):
+    dFmuMembers = dict(dMembers)
+    dFmuMembers["binaries/win64/userConfig.cfg"] = (b"other=1\n", zipfile.ZIP_DEFLATED)
+    writeFmu(str(tmp_path / "ctrl.fmu"), dFmuMembers)
+    (tmp_path / "master").mkdir()
+    monkeypatch.chdir(tmp_path / "master")
+    with pytest.raises(ValueError, match="userConfigDefault"):
+        patchFmu.patchFmuUserConfig(str(tmp_path), "ctrl.fmu", "myConfig")
+    assert os.listdir(str(tmp_path / "master")) == []
@@ -0,0 +1,50 @@
+import os
+from string import Template
+
+import pytest
+
+from snps import patchSFU
+
+lTemplates = [
+    "<sil-line>${_DIVeContext} $_DIVeSpecies -p $paramsIniConfigPath</sil-line>\n",
+    "$$_DIVeContext $${_DIVeSpecies} $$$_DIVeContext ${unknown} $unknown $ 100$\n",
+    "${_DIVeContext}${_DIVeSpecies}$_DIVeContext_suffix ${paramsIniConfigPath}x\n",
+    "$_DIVeContext$paramsIniConfigPath <remote-module-cluster>_</remote-module-cluster>\n",
+    "<remote-module-cluster>$_DIVeContext</remote-module-cluster> $${paramsIniConfigPath}\n",
+    "\ue001 private use text $_DIVeSpecies\n",
+]
+
+
+def patchSFUSafeSubstitute(dive_species, conf_pars, sSilTemplate, sIniTemplate, sfu_name, bSilverDll):
+    # reference: consecutive string.Template.safe_substitute calls of the former patchSFU
+    conf_pars = {key: dive_species + key for key in conf_pars}
+    silfile = Template(sSilTemplate).safe_substitute(conf_pars)
+    silfile = Template(silfile).safe_substitute({"paramsIniConfigPath": "..\\SFUs\\configParams\\" + sfu_name + ".ini"})
+    inifile = Template(sIniTemplate).safe_substitute(conf_pars)
+    if bSilverDll:
+        silfile = silfile.replace("<remote-module-cluster>_</remote-module-cluster",
+                                  "<remote-module-cluster>{cluster}</remote-module-cluster".format(cluster=dive_species + "_CLUSTER"))
+    return silfile, inifile
+
+
+@pytest.mark.parametrize("sTemplateName", ["template_SFU_SFunc_64Bit", "template_SFU_SilverDLL_64Bit"])
+@pytest.mark.parametrize("sTemplate", lTemplates)
+def test_compiled_templates_match_safe_substitute(tmp_path, monkeypatch, sTemplateName, sTemplate):
+    monkeypatch.delenv("buildCacheFile", raising=False)
+    sSilTemplate = str(tmp_path / (sTemplateName + ".sil"))
+    sIniTemplate = str(tmp_path / (sTemplateName + "_configParams.ini"))
+    for sFile in (sSilTemplate, sIniTemplate):
+        with open(sFile, "w") as oFile:
+            oFile.write(sTemplate)
+    sSfupath = str(tmp_path / "SFUs")
+    os.makedirs(sSfupath + "\\configParams", exist_ok=True)
+
+    # rendered twice: the second call uses the cached compiled template
+    for nRun in range(2):
+        patchSFU.patchSFU("ENG", {"_DIVeContext": "", "_DIVeSpecies": ""}, sSilTemplate, sIniTemplate, sSfupath, "SFU_ENG")
+        with open(sSfupath + "\\SFU_ENG.sil") as oFile:
+            sSilfile = oFile.read()
+        with open(sSfupath + "\\configParams\\SFU_ENG.ini") as oFile:
+            sInifile = oFile.read()
+        assert (sSilfile, sInifile) == patchSFUSafeSubstitute("ENG", ["_DIVeContext", "_DIVeSpecies"], sTemplate, sTemplate,
+                                                              "SFU_ENG", "silverdll" in sTemplateName.lower())
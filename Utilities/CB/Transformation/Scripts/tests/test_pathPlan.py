@@ -0,0 +1,87 @@
+import os
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from snps import pathPlan
+from snps.configReader import readConfigurationElement
+
+sConfigurationXml = """<Configuration name="cfg">
+  <ModuleSetups>
+    <ModuleSetup name="mcm">
+      <Module context="ctrl" species="mcm" family="sil" type="std" variant="v1" modelSet="silver_dll_w64"/>
+    </ModuleSetup>
+    <ModuleSetup name="eng">
+      <Module context="phys" species="eng" family="detail" type="std" variant="v2" modelSet="fmu20"/>
+    </ModuleSetup>
+  </ModuleSetups>
+</Configuration>
+"""
+
+
+def test_validate_reports_all_problems(tmp_path):
+    sInput = str(tmp_path / "module.xml")
+    with open(sInput, "w") as oFile:
+        oFile.write("<Module/>")
+    sDir = str(tmp_path / "out")
+    os.mkdir(sDir)
+
+    oPlan = pathPlan.PathPlan()
+    oPlan.add(sInput, pathPlan.INPUT_FILE, "module xml")
+    oPlan.add(sInput, pathPlan.OUTPUT_FILE, "added twice")
+    oPlan.add(str(tmp_path / "missing.xml"), pathPlan.INPUT_FILE, "required input")
+    oPlan.add(str(tmp_path / "missing"), pathPlan.INPUT_DIR, "optional input", bRequired=False)
+    oPlan.add(sDir, pathPlan.OUTPUT_FILE, "file in place of a folder")
+    oPlan.add(str(tmp_path / "new" / "sub" / "SFU.ini"), pathPlan.OUTPUT_FILE, "new output")
+    oPlan.add(str(tmp_path / ("x" * 300)), pathPlan.OUTPUT_DIR, "long output")
+
+    assert len(oPlan.getPaths()) == 6
+    assert [oPath.purpose for oPath in oPlan.getPaths(pathPlan.INPUT_FILE)] == ["module xml", "required input"]
+    lErrors, lWarnings = oPlan.validate()
+    assert len(lErrors) == 3
+    assert lErrors[0].startswith("missing required input")
+    assert lErrors[1].startswith("existing folder in place of file in place of a folder")
+    assert "more than 255 characters" in lErrors[2]
+    assert len(lWarnings) == 1 and lWarnings[0].startswith("missing optional input")
+
+
+def test_getExistingParent(tmp_path):
+    assert pathPlan.getExistingParent(str(tmp_path / "a" / "b" / "c.ini")) == str(tmp_path)
+    assert pathPlan.getExistingParent(str(tmp_path / "c.ini")) == str(tmp_path)
+
+
+def test_planGenerateIni(tmp_path):
+    oConfiguration = readConfigurationElement(ET.fromstring(sConfigurationXml))
+    sContent = str(tmp_path / "Content")
+    sSil = str(tmp_path / "SiLs" / "cfg")
+    oPlan = pathPlan.planGenerateIni(oConfiguration, sContent, sSil, "cfg", str(tmp_path))
+
+    sIniLoc = sSil + "\\SFUs\\initParams\\"
+    lOutputFiles = [oPath.path for oPath in oPlan.getPaths(pathPlan.OUTPUT_FILE)]
+    assert lOutputFiles == [sIniLoc + sIniFile for sIniFile in ("SFU_LOGGING.ini", "SFU_POST.ini", "SFU_SUPPORT.ini",
+                                                                "SFU_CTRL_MCM_SIL_STD_V1_SILVER_DLL_W64.ini",
+                                                                "SFU_PHYS_ENG_DETAIL_STD_V2_FMU20.ini")]
+    assert [(oPath.path, oPath.required) for oPath in oPlan.getPaths(pathPlan.INPUT_FILE)] == [
+        ("\\".join([sContent, "ctrl", "mcm", "sil", "std", "Module", "v1", "v1.xml"]), False)]
+    assert [oPath.path for oPath in oPlan.getPaths(pathPlan.INPUT_DIR)] == [
+        sContent, "\\".join([sContent, "phys", "eng", "detail", "std", "Module", "v2", "fmu20"])]
+
+    # missing module inputs are only warnings, the missing Content folder is an error
+    lErrors, lWarnings = oPlan.validate()
+    assert len(lErrors) == 1 and lErrors[0].startswith("missing DIVe Content folder")
+    assert len(lWarnings) == 2
+
+
+def test_planSfuCreation(tmp_path):
+    sSfupath = str(tmp_path / "SFUs")
+    oPlan = pathPlan.planSfuCreation(sSfupath, ["SFU_PHYS_TX_F_T_V_SFCN_W64"])
+    assert [oPath.path for oPath in oPlan.getPaths(pathPlan.OUTPUT_DIR)] == [sSfupath, sSfupath + "\\configParams"]
+    assert [oPath.path for oPath in oPlan.getPaths(pathPlan.OUTPUT_FILE)] == [
+        sSfupath + "\\SFU_PHYS_TX_F_T_V_SFCN_W64.sil", sSfupath + "\\configParams\\SFU_PHYS_TX_F_T_V_SFCN_W64.ini"]
+    assert oPlan.validate() == ([], [])
+    # too long SFU names are rejected before anything is generated
+    oPlan = pathPlan.planSfuCreation(sSfupath, ["SFU_" + "X" * 300], oPlan)
+    lErrors, lWarnings = oPlan.validate()
+    assert len(lErrors) == 2 and all("more than 255 characters" in sError for sError in lErrors)
+    with pytest.raises(SystemExit):
+        pathPlan.checkPathPlan(oPlan)
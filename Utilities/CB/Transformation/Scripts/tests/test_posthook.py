@@ -0,0 +1,243 @@
+import os
+import sys
+import threading
+import types
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from snps import posthook
+from snps.configReader import ModuleSetupRecord
+
+
+def test_measure_posthook_counts_files_of_the_measured_thread(tmp_path, monkeypatch):
+    monkeypatch.delenv("posthookTraceMemory", raising=False)
+    sOwnFile = str(tmp_path / "posthook.txt")
+    sOtherFile = str(tmp_path / "other_thread.txt")
+
+    def runPosthook():
+        # another thread (e.g. the log writer) writes while the posthook runs
+        oThread = threading.Thread(target=lambda: open(sOtherFile, "w").close())
+        oThread.start()
+        oThread.join()
+        with open(sOwnFile, "w") as oFile:
+            oFile.write("x")
+        open(sOwnFile).close()
+
+    dStats = posthook.measure_posthook("posthook.py", runPosthook)
+    assert dStats["filesWritten"] == [sOwnFile]
+    assert dStats["peakMemory"] is None
+    assert dStats["script"] == "posthook.py"
+
+
+def test_measure_posthook_wraps_file_functions_only_during_the_call(tmp_path):
+    import builtins
+    sTmpFile = str(tmp_path / "result.tmp")
+    sResultFile = str(tmp_path / "result.txt")
+
+    def runPosthook():
+        with open(sTmpFile, "w") as oFile:
+            oFile.write("x")
+        os.replace(sTmpFile, sResultFile)
+
+    oOpen, oReplace = builtins.open, os.replace
+    dStats = posthook.measure_posthook("posthook.py", runPosthook)
+    assert dStats["filesWritten"] == sorted([sTmpFile, sResultFile])
+    assert builtins.open is oOpen and os.replace is oReplace
+
+
+def test_report_posthook_stats_states_untraced_memory(tmp_path, caplog):
+    import json
+    import logging
+    sMainSil = str(tmp_path / "main.sil")
+    lStats = [{"script": "ph.py", "wallTime": 0.5, "cpuTime": 0.25, "peakMemory": None, "filesWritten": []}]
+    with caplog.at_level(logging.INFO, logger="print_to_log"):
+        posthook.report_posthook_stats(lStats, sMainSil)
+    assert "not traced" in caplog.text and "posthookTraceMemory=1" in caplog.text
+    with open(str(tmp_path / "main_posthookReport.json")) as oFile:
+        dReport = json.load(oFile)
+    assert dReport["memoryTraced"] is False and dReport["posthooks"] == lStats
+
+
+def test_measure_posthook_traces_memory_on_request(monkeypatch):
+    monkeypatch.setenv("posthookTraceMemory", "1")
+    dStats = posthook.measure_posthook("posthook.py", lambda: bytearray(1000000))
+    assert dStats["peakMemory"] >= 1000000
+
+
+def test_module_context_is_read_only_and_copyable():
+    import copy
+    import pickle
+    dContext = posthook.ReadOnlyDict(pathSFU="SFU_A.sil", dictIniParams=posthook.ReadOnlyDict(A="1"))
+    with pytest.raises(TypeError):
+        dContext["pathSFU"] = "SFU_B.sil"
+    with pytest.raises(TypeError):
+        dContext["dictIniParams"].update(B="2")
+    dCopy = copy.deepcopy(dContext)
+    dCopy["dictIniParams"]["B"] = "2"
+    assert dContext == {"pathSFU": "SFU_A.sil", "dictIniParams": {"A": "1"}}
+    # worker processes of parallel posthooks get the same type
+    dPickled = pickle.loads(pickle.dumps(dContext))
+    assert type(dPickled) is posthook.ReadOnlyDict and type(dPickled["dictIniParams"]) is posthook.ReadOnlyDict
+
+
+def test_is_main_module_guarded(tmp_path, monkeypatch):
+    import multiprocessing
+    import types
+    monkeypatch.setattr(multiprocessing, "get_start_method", lambda: "spawn")
+    for sSource, bGuarded in [("import sys\nprint(sys.argv)\n", False),
+                              ("import sys\nif __name__ == \"__main__\":\n    print(sys.argv)\n", True)]:
+        oMain = types.ModuleType("__main__")
+        oMain.__file__ = str(tmp_path / "driver.py")
+        with open(oMain.__file__, "w") as oFile:
+            oFile.write(sSource)
+        monkeypatch.setitem(sys.modules, "__main__", oMain)
+        assert posthook.is_main_module_guarded() == bGuarded
+
+
+def test_get_posthook_resources_only_from_declared_touches(tmp_path):
+    sPosthook = str(tmp_path / "posthook_a")
+    sSfu = str(tmp_path / "SFU_A.sil")
+    # undeclared, "all" and unknown names are ordered with all other posthooks
+    for sDeclared in ("", None, "all", "sfu,results", " , "):
+        assert posthook.get_posthook_resources(sPosthook, sSfu, sDeclared) is None
+    assert posthook.get_posthook_resources(sPosthook, sSfu, "sfu, mainSil") == {
+        "cwd:" + os.path.normcase(sPosthook), "sfu:" + os.path.normcase(sSfu), "mainSil"}
+
+
+def test_schedule_posthook_levels():
+    setA, setB = {"sfu:a", "cwd:a"}, {"sfu:b", "cwd:b"}
+    assert posthook.schedule_posthook_levels([setA, setB, {"sfu:a", "cwd:c"}]) == [[0, 1], [2]]
+    assert posthook.schedule_posthook_levels([setA, None, setB]) == [[0], [1], [2]]
+
+
+def test_run_posthooks_parallel_passes_context_and_configuration(tmp_path):
+    lJobs = []
+    for sName in ("a", "b"):
+        sPosthook = str(tmp_path / ("posthook_" + sName))
+        os.mkdir(sPosthook)
+        sScript = os.path.join(sPosthook, "ph.py")
+        with open(sScript, "w") as oFile:
+            oFile.write("with open('out.txt', 'w') as f:\n"
+                        "    f.write(dictModule['pathSFU'] + ' ' + etreeCfg.get('name'))\n"
+                        "print('done ' + dictModule['pathSFU'])\n")
+        dContext = posthook.ReadOnlyDict(pathSFU="SFU_" + sName.upper() + ".sil")
+        oModuleContext = types.SimpleNamespace(get_dictModule=lambda dContext=dContext: dContext)
+        lJobs.append([sPosthook, sScript, oModuleContext, posthook.get_posthook_resources(sPosthook, dContext["pathSFU"], "sfu")])
+
+    lStats = posthook.run_posthooks_parallel(lJobs, ET.fromstring('<Configuration name="cfg"/>'), "main.sil", [], max_workers=2)
+    assert [os.path.basename(dStats["script"]) for dStats in lStats] == ["ph.py", "ph.py"]
+    for sName in ("a", "b"):
+        with open(str(tmp_path / ("posthook_" + sName) / "out.txt")) as oFile:
+            assert oFile.read() == "SFU_" + sName.upper() + ".sil cfg"
+
+
+def test_runPosthook_entry_point_is_guarded(monkeypatch):
+    import multiprocessing
+    import types
+    monkeypatch.setattr(multiprocessing, "get_start_method", lambda: "spawn")
+    oMain = types.ModuleType("__main__")
+    oMain.__file__ = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "runPosthook.py")
+    monkeypatch.setitem(sys.modules, "__main__", oMain)
+    assert posthook.is_main_module_guarded()
+
+
+class EmptyContentIndex():
+    def getModuleXml(self, *args):
+        return ""
+
+
+def getModuleContext(sBaseDir, dGlobalParams):
+    oModuleSetup = ModuleSetupRecord("mcm", {"name": "mcm"}, [], [], [])
+    dModule = {"context": "ctrl", "species": "mcm", "family": "sil", "type": "std", "variant": "v1", "modelSet": "fmu20"}
+    return posthook.ModuleContext(oModuleSetup, dModule, sBaseDir, EmptyContentIndex(), dGlobalParams)
+
+
+def test_module_context_is_built_on_first_use(tmp_path, monkeypatch):
+    monkeypatch.delenv("posthookContextReadOnly", raising=False)
+    dGlobalParams = posthook.ReadOnlyDict(g="1")
+    oModuleContext = getModuleContext(str(tmp_path), dGlobalParams)
+    # the INI file is only read when the first posthook of the module needs the context
+    with open(str(tmp_path / "SFUs\\initParams\\SFU_CTRL_MCM_SIL_STD_V1_FMU20.ini"), "w") as oFile:
+        oFile.write("MCM_PathContent = ../Content # comment\n")
+    dModule = oModuleContext.get_dictModule()
+    assert oModuleContext.get_dictModule() is dModule
+    assert dModule["dictIniParams"] == {"MCM_PathContent": " ../Content"}
+    assert dModule["dictGlobalIniParams"] is dGlobalParams
+    assert dModule["pathSFU"] == os.path.join(str(tmp_path), "SFUS\\SFU_CTRL_MCM_SIL_STD_V1_FMU20.sil")
+    with pytest.raises(TypeError):
+        dModule["dictIniParams"]["MCM_PathContent"] = ""
+
+
+def test_module_context_can_be_modifiable(tmp_path, monkeypatch):
+    monkeypatch.setenv("posthookContextReadOnly", "0")
+    dGlobalParams = posthook.ReadOnlyDict(g="1")
+    dModule = getModuleContext(str(tmp_path), dGlobalParams).get_dictModule()
+    dModule["dictGlobalIniParams"]["g"] = "2"
+    dModule["dictIniParams"]["A"] = "1"
+    assert type(dModule) is dict and dGlobalParams == {"g": "1"}
+
+
+@pytest.fixture
+def sCodeCacheDir(tmp_path, monkeypatch):
+    sCodeCacheDir = str(tmp_path / "codeCache")
+    monkeypatch.setenv("posthookCodeCacheDir", sCodeCacheDir)
+    monkeypatch.setattr(posthook, "posthook_code_cache", {})
+    monkeypatch.setattr(posthook, "posthook_code_stats", {"memory": 0, "disk": 0, "compiled": 0})
+    return sCodeCacheDir
+
+
+def writeScript(sScript, sSource, nMtimeNs):
+    with open(sScript, "w") as oFile:
+        oFile.write(sSource)
+    os.utime(sScript, ns=(nMtimeNs, nMtimeNs))
+
+
+def runCode(oCode):
+    dNamespace = {}
+    exec(oCode, dNamespace)
+    return dNamespace["x"]
+
+
+def test_load_posthook_code_memory_and_disk_cache(tmp_path, sCodeCacheDir):
+    sScript = str(tmp_path / "ph.py")
+    writeScript(sScript, "x = 1\n", 10**18)
+    oCode = posthook.load_posthook_code(sScript)
+    assert posthook.load_posthook_code(sScript) is oCode
+    # a later run loads the code from the disk cache
+    posthook.posthook_code_cache.clear()
+    assert runCode(posthook.load_posthook_code(sScript)) == 1
+    assert posthook.posthook_code_stats == {"memory": 1, "disk": 1, "compiled": 1}
+    assert len(os.listdir(sCodeCacheDir)) == 1
+
+
+def test_load_posthook_code_recompiles_changed_scripts(tmp_path, sCodeCacheDir):
+    sScript = str(tmp_path / "ph.py")
+    writeScript(sScript, "x = 1\n", 10**18)
+    posthook.load_posthook_code(sScript)
+    # same size, other modification time
+    writeScript(sScript, "x = 2\n", 10**18 + 1)
+    assert runCode(posthook.load_posthook_code(sScript)) == 2
+    # same modification time, other size
+    writeScript(sScript, "x = 33\n", 10**18 + 1)
+    posthook.posthook_code_cache.clear()
+    assert runCode(posthook.load_posthook_code(sScript)) == 33
+    assert posthook.posthook_code_stats == {"memory": 0, "disk": 0, "compiled": 3}
+
+
+def test_load_posthook_code_ignores_invalid_cache_files(tmp_path, sCodeCacheDir):
+    sScript = str(tmp_path / "ph.py")
+    writeScript(sScript, "x = 1\n", 10**18)
+    posthook.load_posthook_code(sScript)
+    sCacheFile = os.path.join(sCodeCacheDir, os.listdir(sCodeCacheDir)[0])
+    with open(sCacheFile, "rb") as oFile:
+        bData = oFile.read()
+    sHeader = bData[:bData.index(b"\n") + 1]
+    # other Python version (magic number), truncated code and garbage after a valid header
+    for bCorrupt in (b"\0\0\0\0" + sHeader[4:] + bData[len(sHeader):], bData[:-5], sHeader + b"\xff\x00garbage"):
+        with open(sCacheFile, "wb") as oFile:
+            oFile.write(bCorrupt)
+        posthook.posthook_code_cache.clear()
+        assert runCode(posthook.load_posthook_code(sScript)) == 1
+    assert posthook.posthook_code_stats["disk"] == 0
+    assert posthook.posthook_code_stats["compiled"] == 4
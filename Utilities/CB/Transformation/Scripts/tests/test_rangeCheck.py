@@ -0,0 +1,34 @@
+from snps.rangeCheck import RangeCheck, Signal
+
+sConfigurationXml = """<Configuration xmlns="http://www.daimler.com/DIVeModuleConfiguration" name="cfg">
+  <Interface>
+    <Signals>
+      <Signal name="sigA" modelRef="mcm" unit="-"/>
+      <Signal modelRef="tx" name="sigB"/>
+      <Signal name="bad name"/>
+      <Constant name="constC" value="1"/>
+      <OpenPort name="portD"/>
+    </Signals>
+  </Interface>
+</Configuration>
+"""
+
+
+def test_parse_signals_from_config_xml(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sConfigXml = str(tmp_path / "cfg.xml")
+    with open(sConfigXml, "w") as hFile:
+        hFile.write(sConfigurationXml)
+    oRangeCheck = RangeCheck(None, sConfigXml)
+    # Signal declarations are contained, the former line regex only found constC and portD
+    assert oRangeCheck.signals_project == ["sigA", "sigB", "constC", "portD"]
+
+    oRangeCheck.signals = [Signal("sigA", "0.0", "-1", "1"), Signal("sigX", "0.0", "-1", "1"), Signal("portD", "5.0", "0", "10")]
+    oRangeCheck.create_check_range_python()
+    with open("signalRangeCheck.py") as hFile:
+        lLines = hFile.read().split("\n")
+    assert lLines[:4] == ["from synopsys.silver import *", "time = Variable(\"currentTime\")",
+                          RangeCheck.get_spaces("sigA", 50) + " = Variable(\"sigA\")",
+                          RangeCheck.get_spaces("portD", 50) + " = Variable(\"portD\")"]
+    assert lLines[4] == "def MainGenerator(*args):"
+    assert len(lLines) == 7 and "Range Error: sigA" in lLines[5] and "Range Error: portD" in lLines[6]
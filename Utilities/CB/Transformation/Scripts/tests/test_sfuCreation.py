@@ -0,0 +1,104 @@
+import os
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from snps import sfuCreation
+from snps.configReader import readConfigurationElement
+
+sConfiguration = """<Configuration xmlns="n">
+<ModuleSetup name="eng"><Module context="ctrl" species="eng" family="detail" type="gtfrm" variant="v" modelSet="sfcn_w64"/></ModuleSetup>
+<ModuleSetup name="tx"><Module context="phys" species="tx" family="f" type="t" variant="v" modelSet="sfcn_w64"/></ModuleSetup>
+<ModuleSetup name="tx_again"><Module context="phys" species="tx" family="f" type="t" variant="v" modelSet="sfcn_w64"/></ModuleSetup>
+<ModuleSetup name="drv"><Module context="phys" species="drv" family="f" type="t" variant="v" modelSet="open"/></ModuleSetup>
+</Configuration>"""
+
+
+def writeFile(sPath, sText):
+    # template paths are built with backslashes, on Windows they are folders
+    if os.path.dirname(sPath):
+        os.makedirs(os.path.dirname(sPath), exist_ok=True)
+    with open(sPath, "w") as oFile:
+        oFile.write(sText)
+
+
+def readSfus(sSfupath, lSfuNames):
+    dSfus = {}
+    for sSfuName in lSfuNames:
+        for sFile in (sSfupath + "\\" + sSfuName + ".sil", sSfupath + "\\configParams\\" + sSfuName + ".ini"):
+            with open(sFile) as oFile:
+                dSfus[sFile[len(sSfupath):]] = oFile.read()
+    return dSfus
+
+
+@pytest.fixture
+def sCurDir(tmp_path, monkeypatch):
+    monkeypatch.delenv("buildCacheFile", raising=False)
+    sCurDir = str(tmp_path / "cur")
+    os.makedirs(sCurDir)
+    for sTemplate in ("SFunc_64Bit", "Gt_64Bit"):
+        writeFile(sCurDir + r"\templates\template_SFUs\template_SFU_" + sTemplate + ".sil",
+                  "<sil>${_DIVeSpecies} " + sTemplate + " $paramsIniConfigPath</sil>\n")
+        writeFile(sCurDir + r"\templates\template_SFUs\template_configParams\template_SFU_" + sTemplate + "_configParams.ini",
+                  "context=${_DIVeContext}\n")
+    return sCurDir
+
+
+def test_createSFUsForModuleSetups_matches_serial_generation(tmp_path, sCurDir):
+    lModuleSetups = readConfigurationElement(ET.fromstring(sConfiguration)).moduleSetups
+    sSfupath = str(tmp_path / "parallel")
+    os.makedirs(sSfupath + "\\configParams", exist_ok=True)
+    dErrorReport = sfuCreation.createSFUsForModuleSetups(sCurDir, str(tmp_path / "Content"), lModuleSetups, sSfupath, nMaxWorkers=4)
+    assert dErrorReport == {"eng": 0, "tx": 0, "tx_again": 0}
+
+    sSerialpath = str(tmp_path / "serial")
+    os.makedirs(sSerialpath + "\\configParams", exist_ok=True)
+    sfuCreation.createSFUforGT(sCurDir, "sfcn_w64", "v", "gtfrm", "detail", "eng", "ctrl", sSerialpath, "")
+    sfuCreation.createSFUforSFunction(sCurDir, "phys", "tx", "f", "t", "v", "sfcn_w64", sSerialpath, "")
+    lSfuNames = ["SFU_CTRL_ENG_DETAIL_GTFRM_V_SFCN_W64", "SFU_PHYS_TX_F_T_V_SFCN_W64"]
+    assert readSfus(sSfupath, lSfuNames) == readSfus(sSerialpath, lSfuNames)
+
+
+def test_createSFUsForModuleSetups_accepts_elements(tmp_path, sCurDir):
+    lElements = ET.fromstring(sConfiguration).findall(".//{*}ModuleSetup")
+    sSfupath = str(tmp_path / "SFUs")
+    os.makedirs(sSfupath + "\\configParams", exist_ok=True)
+    dErrorReport = sfuCreation.createSFUsForModuleSetups(sCurDir, str(tmp_path / "Content"), lElements, sSfupath,
+                                                         dSfcnModelandStatus={"tx": True, "tx_again": True})
+    assert dErrorReport == {"eng": 0}
+
+
+def test_submitSFUsForModuleSetups_futures(tmp_path, sCurDir):
+    from concurrent.futures import ThreadPoolExecutor, wait
+    lModuleSetups = readConfigurationElement(ET.fromstring(sConfiguration)).moduleSetups
+    sSfupath = str(tmp_path / "SFUs")
+    os.makedirs(sSfupath + "\\configParams", exist_ok=True)
+    with ThreadPoolExecutor(max_workers=2) as oExecutor:
+        dSfuOfModule, dFutures = sfuCreation.submitSFUsForModuleSetups(oExecutor, sCurDir, str(tmp_path / "Content"), lModuleSetups, sSfupath)
+        # the futures are the barrier passed to islandTransformation as pending_jobs
+        wait(list(dFutures.values()))
+        assert all(os.path.isfile(sSfupath + "\\" + sSfuStr + ".sil") for sSfuStr in dFutures)
+    assert sorted(dFutures) == ["SFU_CTRL_ENG_DETAIL_GTFRM_V_SFCN_W64", "SFU_PHYS_TX_F_T_V_SFCN_W64"]
+    assert sfuCreation.getSfuErrorReport(dSfuOfModule, dFutures) == {"eng": 0, "tx": 0, "tx_again": 0}
+
+
+@pytest.mark.parametrize("dModule, sModelKind, fcnCreate", [
+    ({"context": "phys", "species": "drv", "family": "f", "type": "t", "modelSet": "open"}, sfuCreation.MODEL_OPEN, None),
+    ({"context": "phys", "species": "tx", "family": "f", "type": "t", "modelSet": "silver_dll_w64"},
+     sfuCreation.MODEL_SILVER_DLL, sfuCreation.createSFUforOpenSilver),
+    ({"context": "ctrl", "species": "mcm", "family": "sil", "type": "t", "modelSet": "fmu20"}, sfuCreation.MODEL_FMU, sfuCreation.createSFUforFMU),
+    ({"context": "phys", "species": "tx", "family": "f", "type": "t", "modelSet": "fmu10"}, sfuCreation.MODEL_FMU_CS, sfuCreation.createSFUforFMUcs),
+    ({"context": "ctrl", "species": "eng", "family": "detail", "type": "gtfrm", "modelSet": "sfcn_w64"}, sfuCreation.MODEL_GT, sfuCreation.createSFUforGT),
+    ({"context": "phys", "species": "tx", "family": "f", "type": "t", "modelSet": "sfcn_w32"}, sfuCreation.MODEL_SFCN, sfuCreation.createSFUforSFunction),
+])
+def test_getModelKind_dispatch(dModule, sModelKind, fcnCreate):
+    # generate_ini and the SFU generation share this dispatch
+    dModule = dict(dModule, variant="v")
+    assert sfuCreation.getModelKind(dModule) == sModelKind
+    oModuleSetup = ET.fromstring("<ModuleSetup name='m'><Module/></ModuleSetup>")
+    oModuleSetup[0].attrib.update(dModule)
+    oJob = sfuCreation.getSfuCreationJob(oModuleSetup, "cur", "Content", "SFUs")
+    assert (oJob[1] if oJob else None) is fcnCreate
+    if sModelKind == sfuCreation.MODEL_SFCN:
+        assert sfuCreation.isSfcnHandledAsOpen(dModule, "m", {"m": True})
+        assert sfuCreation.getSfuCreationJob(oModuleSetup, "cur", "Content", "SFUs", {"m": True}) is None
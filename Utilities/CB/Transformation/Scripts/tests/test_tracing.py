@@ -0,0 +1,78 @@
+import json
+import time
+
+import pytest
+
+from utilsFunctions import tracing
+
+
+@pytest.fixture
+def oTracer(monkeypatch):
+    monkeypatch.setattr(tracing, "oTracer", None)
+    return tracing.enableTracing()
+
+
+def test_span_is_noop_while_disabled(monkeypatch):
+    monkeypatch.setattr(tracing, "oTracer", None)
+    assert tracing.span("stage", a=1) is tracing.oNullSpan
+    assert tracing.getTracer() is None
+
+    @tracing.traced()
+    def add(a, b):
+        return a + b
+    assert add(1, b=2) == 3
+
+
+def test_nested_spans_self_time(oTracer):
+    with tracing.span("outer", level=1):
+        with tracing.span("inner") as oSpan:
+            oSpan.setAttributes(level=2)
+            time.sleep(0.02)
+    dSpans = {lSpan[0]: lSpan for lSpan in oTracer.lSpans}
+    sName, nStart, nDuration, nSelf, nThread, dAttributes = dSpans["outer"]
+    # the inner span is recorded first and its duration is not self time of the outer one
+    assert [lSpan[0] for lSpan in oTracer.lSpans] == ["inner", "outer"]
+    assert nDuration >= dSpans["inner"][2]
+    assert nSelf == nDuration - dSpans["inner"][2]
+    assert dSpans["inner"][3] == dSpans["inner"][2]
+    assert (dAttributes, dSpans["inner"][5]) == ({"level": 1}, {"level": 2})
+
+
+def test_traced_attribute_args(oTracer):
+    @tracing.traced("createSFU", dAttributeArgs={"species": "species_name", "modelSet": "model_set"})
+    def createSFU(species_name, model_set="fmu20"):
+        return species_name
+
+    assert createSFU("mcm") == "mcm"
+    createSFU(species_name="eng", model_set="silver_dll_w64")
+    assert [lSpan[5] for lSpan in oTracer.lSpans] == [{"species": "mcm"}, {"species": "eng", "modelSet": "silver_dll_w64"}]
+
+
+def test_trace_events_and_summary(oTracer, tmp_path):
+    for nCall in range(3):
+        with tracing.span("generate_ini", call=nCall):
+            pass
+    with tracing.span("posthook"):
+        time.sleep(0.01)
+
+    lEvents = oTracer.getTraceEvents()
+    assert [dEvent["ph"] for dEvent in lEvents].count("M") == 1
+    lComplete = [dEvent for dEvent in lEvents if dEvent["ph"] == "X"]
+    assert [dEvent["name"] for dEvent in lComplete] == ["generate_ini"] * 3 + ["posthook"]
+    assert lComplete[1]["args"] == {"call": "1"}
+
+    lSummary = oTracer.getSummary()
+    assert [lRow[0] for lRow in lSummary] == ["posthook", "generate_ini"]
+    assert lSummary[1][1] == 3
+    assert lSummary[0][2] == lSummary[0][3] == lSummary[0][4] >= 0.01
+
+    oTracer.sTraceFile = str(tmp_path / "trace.json")
+    oTracer.save()
+    with open(oTracer.sTraceFile) as oFile:
+        assert json.load(oFile)["traceEvents"] == json.loads(json.dumps(lEvents))
+
+
+def test_finishTracing_stops_recording(oTracer):
+    tracing.finishTracing()
+    assert tracing.getTracer() is None
+    assert tracing.span("stage") is tracing.oNullSpan
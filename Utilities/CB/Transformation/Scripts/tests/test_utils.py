@@ -0,0 +1,124 @@
+import os
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from utilsFunctions import utils
+
+sConfigurationXml = """<Configuration xmlns="http://www.daimler.com/DIVeModuleConfiguration" name="cfg">
+  <Interface>
+    <Signals/>
+    <LogSetup verbosity="3" sampleTime="0.1"/>
+  </Interface>
+  <MasterSolver maxCosimStepsize="0.01" timeEnd="10"/>
+  <Interface>
+    <LogSetup verbosity="9"/>
+  </Interface>
+</Configuration>
+"""
+
+
+def getLegacyAttributes(oRootElem, lTagList):
+    lFinalTagList = utils.xmlTagRecursiveGeneric(0, lTagList, oRootElem)
+    return dict(lFinalTagList[0].attrib) if lFinalTagList else None
+
+
+def test_compileXmlTagPath():
+    assert utils.compileXmlTagPath("Interface/LogSetup@verbosity") == (("Interface", "LogSetup"), "verbosity")
+    assert utils.compileXmlTagPath("/Interface/LogSetup/") == (("Interface", "LogSetup"), None)
+    assert utils.compileXmlTagPath([["Interface", 1], ["LogSetup", 1]]) == (("Interface", "LogSetup"), None)
+
+
+@pytest.mark.parametrize("lTagList", [
+    [["Interface", 1], ["LogSetup", 1]],
+    [["MasterSolver", 1]],
+    [["Interface", 1], ["Missing", 1]],
+    [["Interface", 1]],
+])
+def test_XmlQuery_matches_xmlTagRecursiveGeneric(lTagList):
+    oRootElem = ET.fromstring(sConfigurationXml)
+    dResults = utils.XmlQuery({"tag": lTagList}).run(oRootElem)
+    assert dResults["tag"] == getLegacyAttributes(oRootElem, lTagList)
+
+
+def test_queryXmlAttributes_batch(tmp_path):
+    sFileName = str(tmp_path / "cfg.xml")
+    with open(sFileName, "w") as oFile:
+        oFile.write(sConfigurationXml)
+    dResults = utils.queryXmlAttributes(sFileName, {"logSetup": "Interface/LogSetup",
+                                                    "verbosity": "Interface/LogSetup@verbosity",
+                                                    "stepSize": "MasterSolver@maxCosimStepsize",
+                                                    "missing": "MasterSolver@missing",
+                                                    "legacy": [["MasterSolver", 1]]})
+    assert dResults == {"logSetup": {"verbosity": "3", "sampleTime": "0.1"},
+                        "verbosity": "3",
+                        "stepSize": "0.01",
+                        "missing": None,
+                        "legacy": {"maxCosimStepsize": "0.01", "timeEnd": "10"}}
+    assert utils.getXmlQuery({"a": "MasterSolver"}) is utils.getXmlQuery({"a": "MasterSolver"})
+    assert utils.parseXmlInterfaceTagAttributes(sFileName, [["Interface", 1], ["LogSetup", 1]]) == dResults["logSetup"]
+
+
+def test_parseXmlInterfaceTagAttributes_keeps_legacy_matching(tmp_path):
+    sFileName = str(tmp_path / "cfg.xml")
+    with open(sFileName, "w") as oFile:
+        oFile.write(sConfigurationXml)
+    # tag names match as substrings, a missing tag raises an IndexError
+    assert utils.parseXmlInterfaceTagAttributes(sFileName, [["Interf", 1], ["Log", 1]]) == {"verbosity": "3", "sampleTime": "0.1"}
+    assert utils.queryXmlAttributes(sFileName, {"tag": [["Interf", 1], ["Log", 1]]})["tag"] is None
+    with pytest.raises(IndexError):
+        utils.parseXmlInterfaceTagAttributes(sFileName, [["Interface", 1], ["Missing", 1]])
+
+
+def writeXml(sFileName, sText, nMtime=None):
+    with open(sFileName, "w") as oFile:
+        oFile.write(sText)
+    if nMtime is not None:
+        os.utime(sFileName, (nMtime, nMtime))
+
+
+def test_XmlParseCache_hits_and_invalidation(tmp_path):
+    sFileName = str(tmp_path / "module.xml")
+    writeXml(sFileName, "<Module a='1'/>", 1000000)
+    oCache = utils.XmlParseCache()
+    oTree = oCache.parse(sFileName)
+    assert oCache.parse(sFileName) is oTree
+    assert oCache.getStatistics() == {"hits": 1, "misses": 1, "size": 1}
+    # same size, new modification time
+    writeXml(sFileName, "<Module a='2'/>", 2000000)
+    oTree = oCache.parse(sFileName)
+    assert oTree.getroot().get("a") == "2"
+    # same modification time, new size
+    writeXml(sFileName, "<Module a='33'/>", 2000000)
+    assert oCache.parse(sFileName).getroot().get("a") == "33"
+    assert oCache.getStatistics() == {"hits": 1, "misses": 3, "size": 1}
+    oCache.clear()
+    assert oCache.getStatistics() == {"hits": 0, "misses": 0, "size": 0}
+
+
+def test_XmlParseCache_evicts_least_recently_used(tmp_path):
+    lFileNames = [str(tmp_path / (sName + ".xml")) for sName in ("a", "b", "c")]
+    for sFileName in lFileNames:
+        writeXml(sFileName, "<Module/>")
+    oCache = utils.XmlParseCache(nMaxSize=2)
+    oTreeA = oCache.parse(lFileNames[0])
+    oTreeB = oCache.parse(lFileNames[1])
+    assert oCache.parse(lFileNames[0]) is oTreeA
+    # b is the least recently used file
+    oCache.parse(lFileNames[2])
+    assert oCache.getStatistics() == {"hits": 1, "misses": 3, "size": 2}
+    assert oCache.parse(lFileNames[0]) is oTreeA
+    assert oCache.parse(lFileNames[1]) is not oTreeB
+    assert oCache.getStatistics() == {"hits": 2, "misses": 4, "size": 2}
+
+
+def test_parseXmlFileCached_shares_the_parsed_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "oXmlParseCache", utils.XmlParseCache())
+    sFileName = str(tmp_path / "module.xml")
+    writeXml(sFileName, "<Module/>")
+    oRootElem = utils.parseXmlFileCached(sFileName)
+    assert utils.parseXmlFileCached(sFileName) is oRootElem
+    assert utils.parseXmlFileCached(sFileName, bGetRootElement=False).getroot() is oRootElem
+    assert utils.parseXmlFile(sFileName, bUseCache=True) is oRootElem
+    with pytest.raises(OSError):
+        utils.parseXmlFileCached(str(tmp_path / "missing.xml"))
@@ -0,0 +1,228 @@
+"""
+Build cache for incremental re-transformation.
+
+Every cached output file (SFU, configParams INI, SFU parameter INI) is stored
+together with a fingerprint of its inputs and its size and modification time
+after writing. When a configuration is transformed again, an output whose
+fingerprint is unchanged and whose file was not touched since is neither
+regenerated nor written. Fingerprints cover the configuration (module
+attributes, versionIds, DataSets), the templates and the size and modification
+time of the referenced Content files.
+
+Only the outputs of patchSFU (SFU and configParams INI) and generate_ini
+(SFU parameter INIs) are cached. INI files rewritten afterwards by
+globalParameters.patchGlobalsInIni are removed from the cache (forgetOutputs)
+and regenerated on every run: their fingerprint only describes the unpatched
+content, which cannot be recovered from the patched file. The final SIL, the
+island copies (see islandSync for the incremental island sync) and the
+posthook outputs are not cached.
+
+The cache is opt-in: it is only used if the environment variable
+'buildCacheFile' is set to the path of the cache file (e.g. buildCache.json
+next to the SIL). Hits and misses are counted per stage and logged at the end
+of the run.
+
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import threading
+
+oDispFileLogLogger = logging.getLogger("disp_file_log")
+
+nCacheVersion = 2
+dBuildCaches = {}
+oCachesLock = threading.Lock()
+
+
+def getFingerprint(*lInputs):
+    """
+    Return the fingerprint (sha256 hex digest) of the given inputs.
+
+    Example:
+        sFingerprint = getFingerprint(sTemplateText, sSpecies, sorted(lKeys))
+    """
+    oHash = hashlib.sha256(str(nCacheVersion).encode())
+    for oInput in lInputs:
+        sInput = oInput if isinstance(oInput, str) else repr(oInput)
+        oHash.update(str(len(sInput)).encode() + b":" + sInput.encode("utf-8", "surrogatepass"))
+    return oHash.hexdigest()
+
+
+def getFileStats(*lPaths):
+    """
+    Return [path, modification time, size] of every file or folder, [path, None, None] if it is missing.
+    The result is meant as input of getFingerprint.
+
+    Example:
+        sFingerprint = getFingerprint(dModuleAttributes, getFileStats(sModuleXml, sModelSetFolder))
+    """
+    lStats = []
+    for sPath in lPaths:
+        try:
+            oStat = os.stat(sPath)
+            lStats.append([sPath, oStat.st_mtime_ns, oStat.st_size])
+        except OSError:
+            lStats.append([sPath, None, None])
+    return lStats
+
+
+class BuildCache():
+    """
+    Fingerprints of the outputs of one SIL.
+
+    Parameters:
+        sCacheFile(string):     Path of the cache file.
+
+    Example:
+        oBuildCache = BuildCache("D:\\DIVe\\SiLs\\myConfig\\buildCache.json")
+        if not oBuildCache.isUpToDate("patchSFU", [sSilFile], sFingerprint):
+            ...  # write sSilFile
+            oBuildCache.update([sSilFile], sFingerprint)
+    """
+
+    def __init__(self, sCacheFile):
+        self.sCacheFile = sCacheFile
+        # absolute path -> [fingerprint, mtime, size]
+        self.dOutputs = {}
+        # stage -> [hits, misses]
+        self.dStatistics = {}
+        self.bDirty = False
+        self.oLock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.sCacheFile, "r") as oFile:
+                dCache = json.load(oFile)
+            if dCache.get("version") == nCacheVersion:
+                self.dOutputs = dCache["outputs"]
+        except (OSError, ValueError, KeyError):
+            self.dOutputs = {}
+
+    def save(self):
+        if not self.bDirty:
+            return
+        with self.oLock:
+            dCache = {"version": nCacheVersion, "outputs": dict(self.dOutputs)}
+        sTmpFile = self.sCacheFile + ".tmp"
+        try:
+            with open(sTmpFile, "w") as oFile:
+                json.dump(dCache, oFile)
+            os.replace(sTmpFile, self.sCacheFile)
+            self.bDirty = False
+        except OSError as e:
+            oDispFileLogLogger.debug("\tBuild cache could not be written: " + str(e))
+
+    def isUpToDate(self, sStage, lOutputFiles, sFingerprint):
+        """
+        Return True if all output files were written with this fingerprint and are unchanged since.
+        The result is counted as hit or miss of the stage.
+        """
+        bUpToDate = True
+        for sOutputFile in lOutputFiles:
+            sKey = os.path.abspath(sOutputFile)
+            lEntry = self.dOutputs.get(sKey)
+            if lEntry is None or lEntry[0] != sFingerprint:
+                bUpToDate = False
+                break
+            try:
+                oStat = os.stat(sKey)
+            except OSError:
+                bUpToDate = False
+                break
+            if lEntry[1] != oStat.st_mtime_ns or lEntry[2] != oStat.st_size:
+                bUpToDate = False
+                break
+        with self.oLock:
+            lStatistics = self.dStatistics.setdefault(sStage, [0, 0])
+            lStatistics[0 if bUpToDate else 1] += 1
+        return bUpToDate
+
+    def update(self, lOutputFiles, sFingerprint):
+        """
+        Store the fingerprint of freshly written output files.
+        """
+        dEntries = {}
+        for sOutputFile in lOutputFiles:
+            sKey = os.path.abspath(sOutputFile)
+            oStat = os.stat(sKey)
+            dEntries[sKey] = [sFingerprint, oStat.st_mtime_ns, oStat.st_size]
+        with self.oLock:
+            self.dOutputs.update(dEntries)
+            self.bDirty = True
+
+    def forget(self, lOutputFiles):
+        """
+        Remove output files from the cache, they are regenerated on the next run.
+        """
+        with self.oLock:
+            for sOutputFile in lOutputFiles:
+                if self.dOutputs.pop(os.path.abspath(sOutputFile), None) is not None:
+                    self.bDirty = True
+
+    def getStatistics(self):
+        """
+        Return stage -> {"hits": number, "misses": number}.
+        """
+        with self.oLock:
+            return {sStage: {"hits": nHits, "misses": nMisses} for sStage, (nHits, nMisses) in self.dStatistics.items()}
+
+    def logStatistics(self):
+        dStatistics = self.getStatistics()
+        if not dStatistics:
+            return
+        oDispFileLogLogger.info("\tbuild cache " + self.sCacheFile)
+        oDispFileLogLogger.info("\tstage                  hits   misses")
+        for sStage, dCounts in sorted(dStatistics.items()):
+            oDispFileLogLogger.info("\t%-20s %6d %8d" % (sStage[:20], dCounts["hits"], dCounts["misses"]))
+
+
+def getBuildCache(sSilFolder):
+    """
+    Return the shared build cache of a SIL, created on first use.
+
+    Parameters:
+        sSilFolder(string):     Folder of the SIL (containing Master and SFUs), a relative
+                                cache file path refers to it.
+
+    Example:
+        oBuildCache = getBuildCache(SilFileLoc)
+
+    Return:
+        BuildCache object, None if the cache is disabled (environment variable 'buildCacheFile' unset or "").
+    """
+    sCacheFile = os.environ.get('buildCacheFile', "")
+    if not sCacheFile:
+        return None
+    sCacheFile = os.path.join(sSilFolder, sCacheFile)
+    sKey = os.path.abspath(sCacheFile)
+    with oCachesLock:
+        if sKey not in dBuildCaches:
+            dBuildCaches[sKey] = BuildCache(sKey)
+        return dBuildCaches[sKey]
+
+
+def forgetOutputs(lOutputFiles):
+    """
+    Remove output files rewritten outside of the stage that generated them from all build caches.
+
+    Example:
+        forgetOutputs([sIniFile])   # sIniFile was patched after generate_ini wrote it
+    """
+    with oCachesLock:
+        lBuildCaches = list(dBuildCaches.values())
+    for oBuildCache in lBuildCaches:
+        oBuildCache.forget(lOutputFiles)
+
+
+def saveBuildCaches():
+    for oBuildCache in list(dBuildCaches.values()):
+        oBuildCache.logStatistics()
+        oBuildCache.save()
+
+
+atexit.register(saveBuildCaches)
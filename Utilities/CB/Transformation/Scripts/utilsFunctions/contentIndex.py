@@ -0,0 +1,174 @@
+"""
+Index of the DIVe Content folder for model file discovery.
+
+Directory listings below the Content folder are read once per run and shared by
+all transformation stages. Optionally the index is stored in a cache file
+(environment variable 'contentIndexCacheFile') and reused by later runs; a
+cached listing is only used as long as the modification time of its directory
+is unchanged.
+
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+
+oDispFileLogLogger = logging.getLogger("disp_file_log")
+
+nCacheVersion = 1
+dContentIndices = {}
+oIndicesLock = threading.Lock()
+
+
+class ContentIndex():
+    """
+    Cached directory listings below one Content folder.
+
+    Parameters:
+        sContentPath(string):   Path of the DIVe Content folder.
+
+    Keyword Arguments:
+        sCacheFile(string):     Path of the cache file, None to keep the index in memory only.
+
+    Example:
+        oContentIndex = ContentIndex("D:\\DIVe\\Content")
+        sFmuFile = oContentIndex.getMainModelFile("ctrl", "mcm", "sil", "m04", "std", "fmu20", ["fmu"])
+    """
+
+    def __init__(self, sContentPath, sCacheFile=None):
+        self.sContentPath = os.path.abspath(sContentPath)
+        self.sCacheFile = sCacheFile
+        # relative directory -> [mtime, files, subdirectories]
+        self.dDirs = {}
+        self.setValidated = set()
+        self.dQueries = {}
+        self.bDirty = False
+        self.oLock = threading.Lock()
+        if sCacheFile:
+            self.load()
+
+    def load(self):
+        try:
+            with open(self.sCacheFile, "r") as oFile:
+                dCache = json.load(oFile)
+            if dCache.get("version") == nCacheVersion and dCache.get("contentPath") == self.sContentPath:
+                self.dDirs = dCache["dirs"]
+        except (OSError, ValueError, KeyError):
+            self.dDirs = {}
+
+    def save(self):
+        if not self.sCacheFile or not self.bDirty:
+            return
+        dCache = {"version": nCacheVersion, "contentPath": self.sContentPath, "dirs": self.dDirs}
+        sTmpFile = self.sCacheFile + ".tmp"
+        try:
+            with open(sTmpFile, "w") as oFile:
+                json.dump(dCache, oFile)
+            os.replace(sTmpFile, self.sCacheFile)
+            self.bDirty = False
+        except OSError as e:
+            oDispFileLogLogger.debug("\tContent index cache could not be written: " + str(e))
+
+    def listDirectory(self, sRelDir):
+        """
+        Return (files, subdirectories) of a directory relative to the Content folder.
+        Both lists are sorted, a missing directory is returned as empty.
+        """
+        if sRelDir in self.setValidated:
+            return self.dDirs[sRelDir][1], self.dDirs[sRelDir][2]
+        sDir = os.path.join(self.sContentPath, sRelDir)
+        try:
+            nMtime = os.stat(sDir).st_mtime
+        except OSError:
+            nMtime = None
+        lEntry = self.dDirs.get(sRelDir)
+        if lEntry is None or lEntry[0] != nMtime:
+            lFiles = []
+            lSubDirs = []
+            if nMtime is not None:
+                for oEntry in os.scandir(sDir):
+                    if oEntry.is_dir():
+                        lSubDirs.append(oEntry.name)
+                    else:
+                        lFiles.append(oEntry.name)
+            lEntry = [nMtime, sorted(lFiles), sorted(lSubDirs)]
+            with self.oLock:
+                self.dDirs[sRelDir] = lEntry
+                self.bDirty = True
+        with self.oLock:
+            self.setValidated.add(sRelDir)
+        return lEntry[1], lEntry[2]
+
+    def findFile(self, sRelDir, lSuffixes):
+        """
+        Return the path relative to sRelDir of the first file ending with one of
+        lSuffixes. Files of the directory itself are preferred over files in
+        subdirectories. Returns "" if there is no such file.
+        """
+        lFiles, lSubDirs = self.listDirectory(sRelDir)
+        for sFile in lFiles:
+            if sFile.endswith(tuple(lSuffixes)):
+                return sFile
+        for sSubDir in lSubDirs:
+            sFile = self.findFile(os.path.join(sRelDir, sSubDir), lSuffixes)
+            if sFile:
+                return os.path.join(sSubDir, sFile)
+        return ""
+
+    def getMainModelFile(self, sContext, sSpecies, sFamily, sType, sVariant, sModelSet, lSuffixes):
+        """
+        Return the file name (relative to the model set folder) of the main model file
+        of a model set, e.g. the .fmu or .mexw64 file. Returns "" if there is none.
+        """
+        tKey = (sContext, sSpecies, sFamily, sType, sVariant, sModelSet, tuple(lSuffixes))
+        if tKey not in self.dQueries:
+            sRelDir = os.path.join(sContext, sSpecies, sFamily, sType, "Module", sVariant, sModelSet)
+            self.dQueries[tKey] = self.findFile(sRelDir, lSuffixes)
+        return self.dQueries[tKey]
+
+    def getModuleXml(self, sContext, sSpecies, sFamily, sType, sVariant):
+        """
+        Return the path of the module XML in the variant folder, "" if there is none.
+        """
+        tKey = (sContext, sSpecies, sFamily, sType, sVariant, "xml")
+        if tKey not in self.dQueries:
+            sRelDir = os.path.join(sContext, sSpecies, sFamily, sType, "Module", sVariant)
+            lFiles = [sFile for sFile in self.listDirectory(sRelDir)[0] if sFile.endswith(".xml")]
+            self.dQueries[tKey] = os.path.join(self.sContentPath, sRelDir, lFiles[0]) if lFiles else ""
+        return self.dQueries[tKey]
+
+
+def getContentIndex(sContentPath, sCacheFile=None):
+    """
+    Return the shared index of a Content folder, created on first use.
+
+    Parameters:
+        sContentPath(string):   Path of the DIVe Content folder.
+
+    Keyword Arguments:
+        sCacheFile(string):     Path of the cache file. Defaults to the environment
+                                variable 'contentIndexCacheFile' if set.
+
+    Example:
+        oContentIndex = getContentIndex(sPathDiveDbContent)
+
+    Return:
+        ContentIndex object.
+    """
+    sKey = os.path.abspath(sContentPath)
+    with oIndicesLock:
+        if sKey not in dContentIndices:
+            if sCacheFile is None:
+                sCacheFile = os.environ.get('contentIndexCacheFile', None)
+            dContentIndices[sKey] = ContentIndex(sKey, sCacheFile)
+        return dContentIndices[sKey]
+
+
+def saveContentIndices():
+    for oContentIndex in list(dContentIndices.values()):
+        oContentIndex.save()
+
+
+atexit.register(saveContentIndices)
@@ -0,0 +1,273 @@
+"""
+Span tracing of the transformation stages.
+
+Tracing is enabled by the environment variable 'transformationTraceFile' (or by
+enableTracing). Every traced stage records a span with its start, duration,
+thread and attributes (e.g. context, species and modelSet of a module); spans
+of one thread nest. At the end of the run the spans are written to the trace
+file in the Chrome trace event format (chrome://tracing, Perfetto) and a
+summary table per stage (calls, total, self and maximum time) is logged.
+
+While tracing is disabled span() returns a shared no-op context manager and
+traced functions are called directly.
+
+"""
+
+import atexit
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+
+oDispFileLogLogger = logging.getLogger("disp_file_log")
+
+oTracer = None
+oTracerLock = threading.Lock()
+
+
+class NullSpan():
+    """
+    Span used while tracing is disabled, does nothing.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def setAttributes(self, **dAttributes):
+        pass
+
+
+oNullSpan = NullSpan()
+
+
+class Span():
+    """
+    Span of a running stage, entered as context manager.
+
+    Parameters:
+        oTracer(Tracer):        Tracer recording the span.
+        sName(string):          Name of the stage.
+        dAttributes(dict):      Attributes of the span, shown as "args" in the trace.
+    """
+
+    def __init__(self, oTracer, sName, dAttributes):
+        self.oTracer = oTracer
+        self.sName = sName
+        self.dAttributes = dAttributes
+        self.nStart = 0
+        self.nChildTime = 0
+
+    def setAttributes(self, **dAttributes):
+        self.dAttributes.update(dAttributes)
+
+    def __enter__(self):
+        self.oTracer.getStack().append(self)
+        self.nStart = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *args):
+        nDuration = time.perf_counter_ns() - self.nStart
+        lStack = self.oTracer.getStack()
+        lStack.pop()
+        if lStack:
+            lStack[-1].nChildTime += nDuration
+        self.oTracer.record(self, nDuration)
+        return False
+
+
+class Tracer():
+    """
+    Recorded spans of one process.
+
+    Keyword Arguments:
+        sTraceFile(string):     Path of the Chrome trace file, None to keep the spans in memory only.
+
+    Example:
+        oTracer = Tracer("D:\\DIVe\\transformationTrace.json")
+        with oTracer.span("generate_ini"):
+            ...
+        oTracer.save()
+    """
+
+    def __init__(self, sTraceFile=None):
+        self.sTraceFile = sTraceFile
+        self.nPid = os.getpid()
+        self.nOrigin = time.perf_counter_ns()
+        self.oLocal = threading.local()
+        self.oLock = threading.Lock()
+        # [name, start, duration, self time, thread id, attributes]
+        self.lSpans = []
+        self.dThreadNames = {}
+
+    def getStack(self):
+        lStack = getattr(self.oLocal, "lStack", None)
+        if lStack is None:
+            lStack = self.oLocal.lStack = []
+        return lStack
+
+    def span(self, sName, **dAttributes):
+        return Span(self, sName, dAttributes)
+
+    def record(self, oSpan, nDuration):
+        nThread = threading.get_ident()
+        with self.oLock:
+            if nThread not in self.dThreadNames:
+                self.dThreadNames[nThread] = threading.current_thread().name
+            self.lSpans.append([oSpan.sName, oSpan.nStart - self.nOrigin, nDuration,
+                                nDuration - oSpan.nChildTime, nThread, oSpan.dAttributes])
+
+    def getTraceEvents(self):
+        """
+        Return the spans as list of Chrome trace events (complete events, times in microseconds).
+        """
+        with self.oLock:
+            lSpans = list(self.lSpans)
+            dThreadNames = dict(self.dThreadNames)
+        lEvents = [{"name": "thread_name", "ph": "M", "pid": self.nPid, "tid": nThread, "args": {"name": sThreadName}}
+                   for nThread, sThreadName in dThreadNames.items()]
+        for sName, nStart, nDuration, nSelf, nThread, dAttributes in lSpans:
+            lEvents.append({"name": sName, "cat": "transformation", "ph": "X", "pid": self.nPid, "tid": nThread,
+                            "ts": nStart / 1e3, "dur": nDuration / 1e3,
+                            "args": {sKey: str(oValue) for sKey, oValue in dAttributes.items()}})
+        return lEvents
+
+    def getSummary(self):
+        """
+        Return a list of [name, calls, total [s], self [s], max [s]] per span name, longest total first.
+        """
+        dSummary = {}
+        with self.oLock:
+            for sName, nStart, nDuration, nSelf, nThread, dAttributes in self.lSpans:
+                lRow = dSummary.setdefault(sName, [sName, 0, 0, 0, 0])
+                lRow[1] += 1
+                lRow[2] += nDuration
+                lRow[3] += nSelf
+                lRow[4] = max(lRow[4], nDuration)
+        return [[sName, nCalls, nTotal / 1e9, nSelf / 1e9, nMax / 1e9]
+                for sName, nCalls, nTotal, nSelf, nMax in sorted(dSummary.values(), key=lambda lRow: -lRow[2])]
+
+    def logSummary(self):
+        lSummary = self.getSummary()
+        if not lSummary:
+            return
+        oDispFileLogLogger.info("\tstage                              calls   total [s]    self [s]     max [s]")
+        for sName, nCalls, nTotal, nSelf, nMax in lSummary:
+            oDispFileLogLogger.info("\t%-32s %7d %11.3f %11.3f %11.3f" % (sName[:32], nCalls, nTotal, nSelf, nMax))
+
+    def save(self):
+        if not self.sTraceFile or self.nPid != os.getpid():
+            return
+        sTmpFile = self.sTraceFile + ".tmp"
+        try:
+            with open(sTmpFile, "w") as oFile:
+                json.dump({"traceEvents": self.getTraceEvents(), "displayTimeUnit": "ms"}, oFile)
+            os.replace(sTmpFile, self.sTraceFile)
+        except OSError as e:
+            oDispFileLogLogger.debug("\tTrace file could not be written: " + str(e))
+
+
+def enableTracing(sTraceFile=None):
+    """
+    Start recording spans in this process.
+
+    Keyword Arguments:
+        sTraceFile(string):     Path of the Chrome trace file written at exit, None to keep
+                                the spans in memory only.
+
+    Return:
+        Tracer object.
+    """
+    global oTracer
+    with oTracerLock:
+        if oTracer is None or oTracer.nPid != os.getpid():
+            oTracer = Tracer(sTraceFile)
+        return oTracer
+
+
+def getTracer():
+    """
+    Return the tracer of this process, None while tracing is disabled.
+    """
+    if oTracer is None or oTracer.nPid != os.getpid():
+        return None
+    return oTracer
+
+
+def span(sName, **dAttributes):
+    """
+    Context manager recording a span while tracing is enabled.
+
+    Parameters:
+        sName(string):          Name of the stage.
+
+    Keyword Arguments:
+        Attributes of the span, e.g. context, species or modelSet of a module.
+
+    Example:
+        with span("patchFmuUserConfig", fmu=fmu_name):
+            ...
+    """
+    if oTracer is None:
+        return oNullSpan
+    oCurrentTracer = getTracer()
+    if oCurrentTracer is None:
+        return oNullSpan
+    return oCurrentTracer.span(sName, **dAttributes)
+
+
+def traced(sName=None, dAttributeArgs=None):
+    """
+    Decorator recording a span for every call of a function while tracing is enabled.
+
+    Keyword Arguments:
+        sName(string):          Name of the stage, defaults to the function name.
+        dAttributeArgs(dict):   Span attribute -> name of the function argument holding its value.
+
+    Example:
+        @traced(dAttributeArgs={"context": "context_name", "species": "species_name", "modelSet": "model_set"})
+        def createSFUforFMU(sCurDir,sCbContentPath,model_set,model_var,type_name,family_name,species_name,context_name,sSfupath,sSfuStr):
+            ...
+    """
+    def decorator(fcn):
+        sSpanName = sName or fcn.__name__
+        oSignature = inspect.signature(fcn) if dAttributeArgs else None
+
+        @functools.wraps(fcn)
+        def wrapper(*args, **kwargs):
+            if oTracer is None:
+                return fcn(*args, **kwargs)
+            oCurrentTracer = getTracer()
+            if oCurrentTracer is None:
+                return fcn(*args, **kwargs)
+            dAttributes = {}
+            if oSignature is not None:
+                dArguments = oSignature.bind_partial(*args, **kwargs).arguments
+                dAttributes = {sKey: dArguments[sArg] for sKey, sArg in dAttributeArgs.items() if sArg in dArguments}
+            with oCurrentTracer.span(sSpanName, **dAttributes):
+                return fcn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def finishTracing():
+    """
+    Log the summary table and write the trace file of this process, recording stops.
+    """
+    global oTracer
+    oCurrentTracer = getTracer()
+    if oCurrentTracer is not None:
+        oTracer = None
+        oCurrentTracer.logSummary()
+        oCurrentTracer.save()
+
+
+if os.environ.get('transformationTraceFile', None):
+    enableTracing(os.environ['transformationTraceFile'])
+
+atexit.register(finishTracing)
@@ -9,6 +9,8 @@ mail: mira.rudani@daimler.com
 import logging
 import os
 import sys
+import threading
+from collections import OrderedDict
 
 import xml.etree.ElementTree as ET
 from supportFcn import checkFileLength
@@ -16,6 +18,8 @@ from transformation_constants import sTerminationErrorMessage
 
 oPrintToLogLogger = logging.getLogger("print_to_log")
 
+nXmlCacheSize = 256
+
 
 def xmlTagRecursiveGeneric(i, list_, tag):
     """
@@ -265,7 +269,85 @@ def CheckEmptyDirectory(sDirectoryPath, sErrorMessage=None):
     return True
 
 
-def parseXmlFile(sFileName, sErrorMessage="Error while parsing the XML", bGetRootElement=True):
+class XmlParseCache():
+    """
+    Least recently used cache of parsed XML files.
+
+    An entry is reused as long as modification time and size of the file are
+    unchanged. Parsed trees are shared between all callers and must not be modified.
+
+    Keyword Arguments:
+        nMaxSize(int):      Maximum number of cached files.
+
+    Example:
+        oCache = XmlParseCache(nMaxSize=64)
+        oTree = oCache.parse("D:\\Users\\test.xml")
+    """
+
+    def __init__(self, nMaxSize=nXmlCacheSize):
+        self.nMaxSize = nMaxSize
+        self.dTrees = OrderedDict()
+        self.nHits = 0
+        self.nMisses = 0
+        self.oLock = threading.Lock()
+
+    def parse(self, sFileName):
+        sKey = os.path.abspath(sFileName)
+        oStat = os.stat(sKey)
+        tStamp = (oStat.st_mtime, oStat.st_size)
+        with self.oLock:
+            tEntry = self.dTrees.get(sKey)
+            if tEntry is not None and tEntry[0] == tStamp:
+                self.dTrees.move_to_end(sKey)
+                self.nHits += 1
+                return tEntry[1]
+        oTree = ET.parse(sKey)
+        with self.oLock:
+            self.nMisses += 1
+            self.dTrees[sKey] = (tStamp, oTree)
+            self.dTrees.move_to_end(sKey)
+            while len(self.dTrees) > self.nMaxSize:
+                self.dTrees.popitem(last=False)
+        return oTree
+
+    def clear(self):
+        with self.oLock:
+            self.dTrees.clear()
+            self.nHits = 0
+            self.nMisses = 0
+
+    def getStatistics(self):
+        return {"hits": self.nHits, "misses": self.nMisses, "size": len(self.dTrees)}
+
+
+oXmlParseCache = XmlParseCache()
+
+
+def parseXmlFileCached(sFileName, bGetRootElement=True):
+    """
+    Parse given XML file at most once per modification time, using the shared XML cache.
+
+    Parameters:
+        sFileName(string):   Path(system file path) of xml file.
+
+    Keyword Arguments:
+        bGetRootElement(boolean):    Set it as True if want to get root element of xml file.
+                                        Set it as False if want to get parsed file object.
+
+    Example:
+        oModuleRootElem = parseXmlFileCached(sModuleXml)
+
+    Return:
+        Root element of xml file or parsed file object. Both are shared and must not be modified.
+
+    Error:
+        Errors of reading or parsing the file are raised to the caller.
+    """
+    oParsedFile = oXmlParseCache.parse(sFileName)
+    return oParsedFile.getroot() if bGetRootElement else oParsedFile
+
+
+def parseXmlFile(sFileName, sErrorMessage="Error while parsing the XML", bGetRootElement=True, bUseCache=False):
     """
     Parse given XML file using xml package.
 
@@ -276,6 +358,8 @@ def parseXmlFile(sFileName, sErrorMessage="Error while parsing the XML", bGetRoo
         sErrorMessage(string):        Error message to print if unable to parse given xml file.
         bGetRootElement(boolean):    Set it as True if want to get root element of xml file.
                                         Set it as False if want to get parsed file object.
+        bUseCache(boolean):          Set it as True to get the shared parsed file of the XML cache,
+                                        which must not be modified.
     Example:
         oConfigRootElem = parseXmlFile(
             sConfigurationXml, sErrorMessage="Error while parsing configuration xml file.")
@@ -292,6 +376,8 @@ def parseXmlFile(sFileName, sErrorMessage="Error while parsing the XML", bGetRoo
 
     """
     try:
+        if bUseCache:
+            return parseXmlFileCached(sFileName, bGetRootElement=bGetRootElement)
         oParsedFile = ET.parse(sFileName)
         return oParsedFile.getroot() if bGetRootElement else oParsedFile
     except Exception as e:
@@ -327,8 +413,132 @@ def parseXmlInterfaceTagAttributes(sFileName, lLogTagList, sErrorMessage="Error
         mail: mira.rudani@daimler.com
     """
 
+    # tag names match as substrings of the element tags, a missing tag raises an IndexError,
+    # see queryXmlAttributes for exact matching of many tag paths in one traversal
     oParsedFile = parseXmlFile(sFileName, sErrorMessage=sErrorMessage)
 
     dTagOfInterest = xmlTagRecursiveGeneric(
         0, lLogTagList, oParsedFile)[0]
     return dTagOfInterest.attrib
+
+
+def _localTagName(sTag):
+    return sTag.rsplit("}", 1)[-1] if isinstance(sTag, str) else ""
+
+
+def compileXmlTagPath(tagPath):
+    """
+    Convert a tag path into a tuple (tag names, attribute name).
+
+    Parameters:
+        tagPath(string or list):    "Interface/LogSetup" or "Interface/LogSetup@verbosity", or a list
+                                    of [tagname, count] like for parseXmlInterfaceTagAttributes.
+
+    Example:
+        tPath = compileXmlTagPath("Interface/LogSetup@verbosity")  # (("Interface", "LogSetup"), "verbosity")
+
+    Return:
+        Tuple (tuple of tag names below the root element, attribute name or None).
+    """
+    if isinstance(tagPath, str):
+        sPath, _, sAttribute = tagPath.partition("@")
+        return tuple(sTag for sTag in sPath.split("/") if sTag), sAttribute or None
+    return tuple(lTag[0] for lTag in tagPath), None
+
+
+class XmlQuery():
+    """
+    Batch of tag path queries answered in one traversal of a parsed XML file.
+
+    The paths are merged into a tree of tag names. Starting at the root element,
+    the children of every matched element are visited once and each path step
+    follows the first child whose tag name (without namespace) matches.
+
+    Parameters:
+        dQueries(dict):     Result key -> tag path (see compileXmlTagPath).
+
+    Example:
+        oQuery = XmlQuery({"logSetup": "Interface/LogSetup", "stepSize": "MasterSolver@maxCosimStepsize"})
+        dResults = oQuery.run(oConfigRootElem)
+    """
+
+    def __init__(self, dQueries):
+        # node: [tag name -> child node, [(result key, attribute name)]]
+        self.lTree = [{}, []]
+        self.lKeys = list(dQueries)
+        for sKey, tagPath in dQueries.items():
+            tTags, sAttribute = compileXmlTagPath(tagPath)
+            lNode = self.lTree
+            for sTag in tTags:
+                lNode = lNode[0].setdefault(sTag, [{}, []])
+            lNode[1].append((sKey, sAttribute))
+
+    def run(self, oRootElem):
+        """
+        Return result key -> attribute dictionary (copy) of the found element, the value of the
+        requested attribute, or None if the element or attribute does not exist.
+        """
+        dResults = dict.fromkeys(self.lKeys)
+        lPending = [(self.lTree, oRootElem)]
+        while lPending:
+            lNode, oElem = lPending.pop()
+            for sKey, sAttribute in lNode[1]:
+                dResults[sKey] = dict(oElem.attrib) if sAttribute is None else oElem.get(sAttribute)
+            if not lNode[0]:
+                continue
+            setMissing = set(lNode[0])
+            for oChild in oElem:
+                sTag = _localTagName(oChild.tag)
+                if sTag in setMissing:
+                    setMissing.discard(sTag)
+                    lPending.append((lNode[0][sTag], oChild))
+                    if not setMissing:
+                        break
+        return dResults
+
+
+dXmlQueries = {}
+
+
+def getXmlQuery(dQueries):
+    """
+    Return the compiled XmlQuery of a batch of queries, compiled once per process.
+    """
+    tKey = tuple((sKey, tagPath if isinstance(tagPath, str) else tuple(lTag[0] for lTag in tagPath))
+                 for sKey, tagPath in dQueries.items())
+    oQuery = dXmlQueries.get(tKey)
+    if oQuery is None:
+        oQuery = dXmlQueries[tKey] = XmlQuery(dQueries)
+    return oQuery
+
+
+def queryXmlAttributes(sFileName, dQueries, sErrorMessage="Error while parsing the XML", bUseCache=False):
+    """
+    Parse given XML file once and answer a batch of tag path queries in a single traversal.
+
+    Parameters:
+        sFileName(string):        Absolute path(system file path) of xml file.
+        dQueries(dict):           Result key -> tag path below the root element, "Tag/SubTag" for the
+                                    attributes of the element or "Tag/SubTag@attribute" for one value.
+                                    Lists of [tagname, count] like for parseXmlInterfaceTagAttributes
+                                    are accepted as well. Namespaces are ignored, tag names have to match
+                                    exactly (parseXmlInterfaceTagAttributes matches substrings).
+
+    Keyword Arguments:
+        sErrorMessage(string):    Error message to print if unable to parse given xml file.
+        bUseCache(boolean):       Set it as True to use the shared XML cache.
+
+    Example:
+        dSettings = queryXmlAttributes(sConfigurationXml, {"logSetup": "Interface/LogSetup",
+                                                           "stepSize": "MasterSolver@maxCosimStepsize"})
+
+    Return:
+        Dictionary result key -> attribute dictionary or attribute value, None if not found
+        (parseXmlInterfaceTagAttributes raises an IndexError instead).
+
+    Error:
+        If the file can not be parsed this function will log
+        the error message and terminate execution of the caller script.
+    """
+    oRootElem = parseXmlFile(sFileName, sErrorMessage=sErrorMessage, bUseCache=bUseCache)
+    return getXmlQuery(dQueries).run(oRootElem)